@@ -1,6 +1,6 @@
 import streamlit as st
 import random
-import base64
+from hieroglyphs.assets import get_manifest
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(
@@ -90,15 +90,9 @@ if 'user_answers' not in st.session_state:
 
 # --- HELPER FUNCTIONS ---
 def load_css():
-    """Inject custom CSS into the Streamlit app."""
-    with open("assets/style.css") as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
-
-def get_base64_of_bin_file(bin_file):
-    """Convert binary file to base64 string."""
-    with open(bin_file, 'rb') as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
+    """Inject custom CSS into the Streamlit app (read once per process by the asset manifest)."""
+    manifest = get_manifest(publish=st.get_option("server.enableStaticServing"))
+    st.markdown(f"<style>{manifest.text('assets/style.css')}</style>", unsafe_allow_html=True)
 
 # --- UI SECTIONS ---
 def hero_section():
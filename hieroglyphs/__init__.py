@@ -0,0 +1 @@
+"""Shared, Streamlit-free building blocks of the Egyptian Hieroglyphs Portal."""
@@ -0,0 +1,414 @@
+"""
+Model artifact registry.
+
+Model files live side by side under `model/<name>/<version>/<file>` and are
+described by `model/manifest.json`:
+
+    {
+      "InceptionV3": {
+        "default": "v1",
+        "versions": {
+          "v1": {"file": "InceptionV3_model.h5", "url": "https://...", "sha256": "...", "size": <bytes>}
+        }
+      }
+    }
+
+Downloads go to a `.part` file that is resumed with an HTTP Range request if a
+previous attempt was interrupted, checked against the length the server
+announced, then against the size and SHA-256 from the manifest (or, for an
+entry not pinned yet, those published by the download host), and only then
+atomically renamed into place, so a killed process or a dropped connection can
+never leave a truncated model where `load_model` would find it. A file is never
+trusted on its own hash.
+
+The manifest is only changed under a lock shared by every registry on the same
+directory, in this process and (where `fcntl` is available) in others, so the
+app's loader and a CLI fetching or registering at the same time cannot lose each
+other's entries. A file that was verified is recorded in `model/verified.json`
+with its size and modification time; while both are unchanged, later starts
+trust that record instead of hashing the whole model again.
+
+Air-gapped nodes pre-seed the model directory (e.g. with `register`) and run
+with `HIEROGLYPH_MODEL_OFFLINE=1`, which turns any missing or corrupt artifact
+into an immediate error instead of a download attempt.
+
+Usage:
+    python -m hieroglyphs.artifacts list
+    python -m hieroglyphs.artifacts fetch InceptionV3 [--version v1]
+    python -m hieroglyphs.artifacts verify InceptionV3 [--version v1]
+    python -m hieroglyphs.artifacts register InceptionV3 v2 path/to/model.h5 [--url URL] [--default]
+"""
+
+import argparse
+import contextlib
+import copy
+import hashlib
+import json
+import os
+import shutil
+import threading
+import urllib.error
+import urllib.request
+
+try:
+    import fcntl
+except ImportError:  # Windows: the in-process lock still serializes the app's threads
+    fcntl = None
+
+MODEL_ROOT = os.environ.get("HIEROGLYPH_MODEL_DIR", "model")
+OFFLINE = os.environ.get("HIEROGLYPH_MODEL_OFFLINE", "").lower() in ("1", "true", "yes")
+
+# Artifacts known out of the box. A file is only ever accepted against a digest that did
+# not come from the file itself: the `sha256` (and `size`) pinned here or in the manifest,
+# or, while they are None, the ones the download host publishes for the file (Hugging Face
+# sends the LFS object's SHA-256 and size with every resolve URL). A digest checked against
+# the published one is then pinned in the manifest.
+DEFAULT_MANIFEST = {
+    "InceptionV3": {
+        "default": "v1",
+        "versions": {
+            "v1": {
+                "file": "InceptionV3_model.h5",
+                "url": "https://huggingface.co/sonic222/Egyptian-Hieroglyphs/resolve/main/InceptionV3_model.h5",
+                "sha256": None,
+                "size": None,
+            },
+        },
+    },
+}
+
+CHUNK_SIZE = 1 << 20
+
+# One lock per registry directory, shared by every ModelRegistry instance on it
+_ROOT_LOCKS = {}
+_ROOT_LOCKS_GUARD = threading.Lock()
+
+
+class ArtifactError(RuntimeError):
+    """Raised when a model artifact is missing, corrupt or cannot be downloaded."""
+
+
+def sha256_of(path):
+    """Returns the hex SHA-256 digest of a file, read in 1 MB chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def published_digest(url, timeout=30):
+    """
+    Returns the `(sha256, size)` the host publishes for the file at `url`, or `(None, None)`.
+    Hugging Face answers a resolve URL with a redirect carrying the LFS object's SHA-256
+    and size in the X-Linked-Etag / X-Linked-Size headers; the redirect is not followed.
+    """
+    request = urllib.request.Request(url, method="HEAD")
+    try:
+        headers = urllib.request.build_opener(_NoRedirect).open(request, timeout=timeout).headers
+    except urllib.error.HTTPError as e:
+        if e.code not in (301, 302, 303, 307, 308):
+            return None, None
+        headers = e.headers
+    except OSError:
+        return None, None
+    sha256 = (headers.get("X-Linked-Etag") or "").strip('"').lower()
+    size = headers.get("X-Linked-Size")
+    if len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256):
+        return None, None
+    return sha256, int(size) if size and size.isdigit() else None
+
+
+def _total_length(response, offset):
+    # Full size of the file being downloaded, if the server says so
+    if response.status == 206:
+        total = response.headers.get("Content-Range", "").rpartition("/")[2]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get("Content-Length")
+    return int(length) if length and length.isdigit() else None
+
+
+class ModelRegistry:
+    """Resolves, downloads and verifies versioned model artifacts under `root`."""
+
+    def __init__(self, root=MODEL_ROOT, offline=OFFLINE):
+        self.root = root
+        self.offline = offline
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.verified_path = os.path.join(root, "verified.json")
+        with _ROOT_LOCKS_GUARD:
+            self._lock = _ROOT_LOCKS.setdefault(os.path.realpath(root), threading.Lock())
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Holds the registry lock of `root` across threads and, with `fcntl`, processes."""
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, ".lock"), "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                yield
+
+    # -----------------------------------------------
+    # Manifest
+    # -----------------------------------------------
+
+    def load_manifest(self):
+        """Returns the built-in manifest merged with `model/manifest.json` (the file wins)."""
+        manifest = copy.deepcopy(DEFAULT_MANIFEST)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                for name, entry in json.load(f).items():
+                    merged = manifest.setdefault(name, {"versions": {}})
+                    merged["versions"].update(entry.get("versions", {}))
+                    if entry.get("default"):
+                        merged["default"] = entry["default"]
+        return manifest
+
+    def save_manifest(self, manifest):
+        """Writes the manifest atomically."""
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def resolve(self, name, version=None):
+        """Returns `(version, entry)` for an artifact, using the default version if none is given."""
+        manifest = self.load_manifest()
+        if name not in manifest:
+            raise ArtifactError(f"Unknown model '{name}'. Known models: {', '.join(sorted(manifest))}")
+        version = version or manifest[name].get("default")
+        entry = manifest[name]["versions"].get(version)
+        if entry is None:
+            raise ArtifactError(f"Unknown version '{version}' of model '{name}'")
+        return version, entry
+
+    def path_for(self, name, version, entry):
+        return os.path.join(self.root, name, version, entry["file"])
+
+    # -----------------------------------------------
+    # Fetching
+    # -----------------------------------------------
+
+    def ensure(self, name, version=None):
+        """
+        Returns the local path of a verified artifact, fetching it if needed.
+
+        Lookup order: the versioned path, then a legacy `model/<file>` left by older
+        versions of the app (moved into the versioned layout once verified), then a
+        download (unless offline). Without a pinned or published digest nothing is
+        accepted: a legacy file is then ignored in favour of a fresh download.
+        """
+        with self._locked():
+            version, entry = self.resolve(name, version)
+            path = self.path_for(name, version, entry)
+            sha256, size = self._expected_digest(entry)
+
+            if os.path.exists(path):
+                if sha256 is None:
+                    raise ArtifactError(f"Model '{name}' {version} at {path} cannot be verified: no SHA-256 is "
+                                        f"pinned in {self.manifest_path} or published for its URL")
+                if self._verified_digest(path) != sha256:
+                    self._verify_or_quarantine(name, version, path, sha256, size)
+                    self._remember_verified(path, sha256)
+                self._pin(name, version, entry, sha256, size)
+                return path
+
+            legacy_path = os.path.join(self.root, entry["file"])
+            if os.path.exists(legacy_path) and sha256 is not None:
+                self._verify_or_quarantine(name, version, legacy_path, sha256, size)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(legacy_path, path)
+                self._remember_verified(path, sha256)
+                self._pin(name, version, entry, sha256, size)
+                return path
+
+            if self.offline:
+                raise ArtifactError(f"Model '{name}' {version} is not present at {path} and offline mode is on")
+            if not entry.get("url"):
+                raise ArtifactError(f"Model '{name}' {version} is not present at {path} and has no download URL")
+            if sha256 is None:
+                raise ArtifactError(f"Refusing to download model '{name}' {version}: no SHA-256 is pinned in "
+                                    f"{self.manifest_path} or published for {entry['url']}")
+
+            # Only a fully downloaded, verified file is ever renamed to `path`
+            part_path = path + ".part"
+            self._download(entry["url"], part_path, size)
+            try:
+                self._verify(name, version, part_path, sha256, size)
+            except ArtifactError:
+                os.remove(part_path)
+                raise
+            os.replace(part_path, path)
+            self._remember_verified(path, sha256)
+            self._pin(name, version, entry, sha256, size)
+            return path
+
+    def _expected_digest(self, entry):
+        """The `(sha256, size)` an artifact must have: pinned, else published by its download host."""
+        if entry.get("sha256"):
+            return entry["sha256"], entry.get("size")
+        if self.offline or not entry.get("url"):
+            return None, entry.get("size")
+        sha256, size = published_digest(entry["url"])
+        return sha256, entry.get("size") or size
+
+    def _pin(self, name, version, entry, sha256, size):
+        """Records a digest that a file was verified against (never one computed from the file alone)."""
+        if entry.get("sha256") == sha256 and entry.get("size") == size:
+            return
+        manifest = self.load_manifest()
+        manifest[name]["versions"][version] = dict(entry, sha256=sha256, size=size)
+        self.save_manifest(manifest)
+
+    def _download(self, url, part_path, size=None):
+        """
+        Downloads `url` into `part_path`, resuming from the bytes already there. A download
+        that ends short of the length announced by the server (or `size`) raises, keeping
+        `part_path` to resume from.
+        """
+        os.makedirs(os.path.dirname(part_path), exist_ok=True)
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+        request = urllib.request.Request(url)
+        if offset:
+            request.add_header("Range", f"bytes={offset}-")
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                # A server that ignores the Range header sends the whole file again
+                mode = "ab" if offset and response.status == 206 else "wb"
+                size = size or _total_length(response, offset)
+                with open(part_path, mode) as f:
+                    shutil.copyfileobj(response, f, CHUNK_SIZE)
+        except urllib.error.HTTPError as e:
+            # 416: the previous attempt already fetched every byte; size and checksum decide
+            if not (offset and e.code == 416):
+                raise ArtifactError(f"Download of {url} failed ({e}); rerun to resume from {part_path}") from e
+        except OSError as e:
+            raise ArtifactError(f"Download of {url} failed ({e}); rerun to resume from {part_path}") from e
+
+        # urllib does not raise when the connection closes early
+        received = os.path.getsize(part_path)
+        if size is not None and received < size:
+            raise ArtifactError(f"Download of {url} stopped after {received} of {size} bytes; "
+                                f"rerun to resume from {part_path}")
+
+    def _verified_digest(self, path):
+        """The digest `path` was last verified against, if its size and mtime have not changed since."""
+        try:
+            with open(self.verified_path) as f:
+                record = json.load(f).get(os.path.relpath(path, self.root))
+            stat = os.stat(path)
+        except (OSError, ValueError):
+            return None
+        if record and record.get("size") == stat.st_size and record.get("mtime_ns") == stat.st_mtime_ns:
+            return record.get("sha256")
+        return None
+
+    def _remember_verified(self, path, sha256):
+        """Records that `path`, as it is now, matched `sha256` (caller holds the lock)."""
+        try:
+            with open(self.verified_path) as f:
+                verified = json.load(f)
+        except (OSError, ValueError):
+            verified = {}
+        stat = os.stat(path)
+        verified[os.path.relpath(path, self.root)] = {"sha256": sha256, "size": stat.st_size,
+                                                      "mtime_ns": stat.st_mtime_ns}
+        tmp_path = self.verified_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(verified, f, indent=2)
+        os.replace(tmp_path, self.verified_path)
+
+    def _verify(self, name, version, path, sha256, size=None):
+        """Checks `path` against the expected size and SHA-256."""
+        if size is not None and os.path.getsize(path) != size:
+            raise ArtifactError(f"Size mismatch for model '{name}' {version}: expected {size} bytes, "
+                                f"got {os.path.getsize(path)}")
+        digest = sha256_of(path)
+        if digest != sha256:
+            raise ArtifactError(f"Checksum mismatch for model '{name}' {version}: expected {sha256}, got {digest}")
+
+    def _verify_or_quarantine(self, name, version, path, sha256, size=None):
+        """Verifies an existing file, moving it aside to `<path>.corrupt` if it fails."""
+        try:
+            self._verify(name, version, path, sha256, size)
+        except ArtifactError as e:
+            os.replace(path, path + ".corrupt")
+            raise ArtifactError(f"{e}. The file was moved to {path}.corrupt") from e
+
+    # -----------------------------------------------
+    # Pre-seeding
+    # -----------------------------------------------
+
+    def register(self, name, version, source_path, url=None, make_default=False):
+        """Copies a local model file, trusted by the caller, into the registry and pins its SHA-256 and size."""
+        entry = {"file": os.path.basename(source_path), "url": url, "sha256": sha256_of(source_path),
+                 "size": os.path.getsize(source_path)}
+        path = self.path_for(name, version, entry)
+        with self._locked():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".part"
+            shutil.copyfile(source_path, tmp_path)
+            os.replace(tmp_path, path)
+            self._remember_verified(path, entry["sha256"])
+
+            manifest = self.load_manifest()
+            model = manifest.setdefault(name, {"versions": {}})
+            model["versions"][version] = entry
+            if make_default or not model.get("default"):
+                model["default"] = version
+            self.save_manifest(manifest)
+        return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage versioned model artifacts.")
+    parser.add_argument("--root", default=MODEL_ROOT, help="model directory (default: %(default)s)")
+    parser.add_argument("--offline", action="store_true", default=OFFLINE, help="never download")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="list known artifacts and whether they are present")
+    for command in ("fetch", "verify"):
+        sub = commands.add_parser(command, help=f"{command} an artifact")
+        sub.add_argument("name")
+        sub.add_argument("--version")
+    register = commands.add_parser("register", help="copy a local model file into the registry")
+    register.add_argument("name")
+    register.add_argument("version")
+    register.add_argument("path")
+    register.add_argument("--url")
+    register.add_argument("--default", action="store_true", help="make this the default version")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root, offline=args.offline)
+    if args.command == "list":
+        for name, model in sorted(registry.load_manifest().items()):
+            for version, entry in sorted(model["versions"].items()):
+                present = os.path.exists(registry.path_for(name, version, entry))
+                default = " (default)" if version == model.get("default") else ""
+                print(f"{name} {version}{default}: {'present' if present else 'missing'} sha256={entry.get('sha256')}")
+    elif args.command == "fetch":
+        print(registry.ensure(args.name, args.version))
+    elif args.command == "verify":
+        version, entry = registry.resolve(args.name, args.version)
+        path = registry.path_for(args.name, version, entry)
+        if not os.path.exists(path):
+            raise SystemExit(f"{path} is missing")
+        sha256, size = registry._expected_digest(entry)
+        if sha256 is None:
+            raise SystemExit(f"{path}: no SHA-256 is pinned or published to verify it against")
+        registry._verify_or_quarantine(args.name, version, path, sha256, size)
+        print(f"{path}: OK")
+    elif args.command == "register":
+        print(registry.register(args.name, args.version, args.path, url=args.url, make_default=args.default))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Asset manifest: fingerprints `assets/` once per process and publishes the
+images through Streamlit's static file serving.
+
+Each image is written to `static/` as a display-sized JPEG under a
+content-hashed name, e.g. `static/Ra.3f2a9c1b7d4e.w480.jpg`, and referenced as
+`app/static/<name>?v=<hash>`. Tornado answers requests that carry a `v`
+argument with a ten-year `Cache-Control` header, and the name changes whenever
+the source file does, so repeat visitors download nothing and edited assets are
+picked up on the next start.
+
+Stylesheets are read into memory once. Streamlit serves non-image static files
+as `text/plain` with `nosniff`, which browsers refuse as stylesheets, so CSS is
+still inlined, just without touching the disk on every rerun.
+
+Static serving must be enabled (`server.enableStaticServing`, see
+`.streamlit/config.toml`); when it is not, `url()` returns None and callers
+fall back to sending the image bytes themselves.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from collections import namedtuple
+from functools import lru_cache
+from urllib.parse import quote
+
+from hieroglyphs.preprocessing import IMAGE_EXTENSIONS
+from hieroglyphs.thumbnails import THUMBNAIL_WIDTH, render_thumbnail
+
+ASSET_DIR = "assets"
+
+# Streamlit serves `<app dir>/static/<file>` at `app/static/<file>`
+STATIC_DIR = "static"
+STATIC_URL = "app/static"
+
+TEXT_EXTENSIONS = (".css",)
+
+Asset = namedtuple("Asset", ["path", "sha256", "static_name"])
+
+
+def _write_atomic(path, data):
+    # A temporary file unique to this writer, so app processes publishing at the same time never
+    # write into each other's files; os.replace makes whichever finishes last win whole
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".",
+                                     suffix=".part", delete=False) as f:
+        f.write(data)
+    os.chmod(f.name, 0o644)  # NamedTemporaryFile creates it private
+    os.replace(f.name, path)
+
+
+def _asset_key(path):
+    return os.path.normpath(path).replace(os.sep, "/")
+
+
+class AssetManifest:
+    """Content hashes, static file names and in-memory text of every file in `asset_dir`."""
+
+    def __init__(self, asset_dir=ASSET_DIR, static_dir=STATIC_DIR, width=THUMBNAIL_WIDTH):
+        self.asset_dir = asset_dir
+        self.static_dir = static_dir
+        self.width = width
+        self.assets = {}
+        self.published = False
+        self._text = {}
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.static_dir, "manifest.json")
+
+    def build(self, publish=True):
+        """Fingerprints every asset and, if `publish`, writes the missing static copies."""
+        for entry in sorted(os.scandir(self.asset_dir), key=lambda e: e.name):
+            if not entry.is_file():
+                continue
+            with open(entry.path, "rb") as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()
+            stem, extension = os.path.splitext(entry.name)
+            extension = extension.lower()
+
+            static_name = None
+            if extension in IMAGE_EXTENSIONS:
+                static_name = f"{stem}.{digest[:12]}.w{self.width}.jpg"
+            elif extension in TEXT_EXTENSIONS:
+                self._text[_asset_key(entry.path)] = data.decode("utf-8")
+            self.assets[_asset_key(entry.path)] = Asset(entry.path, digest, static_name)
+
+        if publish:
+            self._publish()
+        return self
+
+    def _publish(self):
+        os.makedirs(self.static_dir, exist_ok=True)
+        published = {asset.static_name for asset in self.assets.values() if asset.static_name}
+        for asset in self.assets.values():
+            target = os.path.join(self.static_dir, asset.static_name or "")
+            if asset.static_name and not os.path.isfile(target):
+                _write_atomic(target, render_thumbnail(asset.path, self.width))
+
+        # Drop copies of assets that changed or were removed since the previous build
+        try:
+            with open(self.manifest_path) as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = {}
+        for old in previous.values():
+            name = old.get("static_name")
+            if name and name not in published and os.path.isfile(os.path.join(self.static_dir, name)):
+                os.remove(os.path.join(self.static_dir, name))
+
+        manifest = {key: asset._asdict() for key, asset in self.assets.items()}
+        _write_atomic(self.manifest_path, json.dumps(manifest, indent=2).encode())
+        self.published = True
+
+    def url(self, path):
+        """Returns the long-cacheable static URL of an image asset, or None if it is not published."""
+        asset = self.assets.get(_asset_key(path))
+        if not self.published or asset is None or asset.static_name is None:
+            return None
+        return f"{STATIC_URL}/{quote(asset.static_name)}?v={asset.sha256[:12]}"
+
+    def text(self, path):
+        """Returns the contents of a text asset (e.g. a stylesheet) as read at build time."""
+        return self._text[_asset_key(path)]
+
+
+@lru_cache(maxsize=None)
+def get_manifest(asset_dir=ASSET_DIR, static_dir=STATIC_DIR, publish=True):
+    """Returns the process-wide manifest, building it on first use."""
+    return AssetManifest(asset_dir, static_dir).build(publish)
@@ -0,0 +1,110 @@
+"""
+Pluggable inference backends.
+
+Every backend takes a preprocessed float32 batch of shape `(n, 299, 299, 3)` and
+returns an `(n, n_classes)` array of softmax probabilities from `predict(batch)`:
+
+- `KerasBackend` runs the full-precision `.h5` / `.keras` model.
+- `TFLiteBackend` runs a `.tflite` model produced by `hieroglyphs.export`, e.g. the
+  int8 or float16 quantized variants that are cheaper to serve on CPU-only nodes.
+
+`load_backend(path)` picks the backend from the file extension. TensorFlow is only
+imported when a backend is created.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+
+class KerasBackend:
+    """Full-precision Keras model."""
+
+    name = "keras"
+
+    def __init__(self, path, num_threads=None):
+        import tensorflow as tf
+        from tensorflow.keras.models import load_model
+
+        if num_threads:
+            # Only takes effect before TensorFlow's runtime starts, i.e. for the first model of a process
+            tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+        self.path = path
+        self.model = load_model(path)
+        self.input_shape = tuple(self.model.input_shape[1:])
+
+    def predict(self, batch):
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+class TFLiteBackend:
+    """
+    TensorFlow Lite model, optionally quantized.
+
+    The interpreter is resized to the incoming batch size on demand. Integer
+    input/output tensors are (de)quantized with the scale and zero point stored
+    in the model. A TFLite interpreter is not thread-safe, so calls are serialized.
+    """
+
+    name = "tflite"
+
+    def __init__(self, path, num_threads=None):
+        import tensorflow as tf
+
+        self.path = path
+        self.interpreter = tf.lite.Interpreter(model_path=path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._lock = threading.Lock()
+        self._refresh_details()
+        self.input_shape = tuple(int(d) for d in self._input["shape"][1:])
+
+    def _refresh_details(self):
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        with self._lock:
+            if self._input["shape"][0] != len(batch):
+                self.interpreter.resize_tensor_input(self._input["index"], batch.shape)
+                self.interpreter.allocate_tensors()
+                self._refresh_details()
+
+            self.interpreter.set_tensor(self._input["index"], _quantize(batch, self._input))
+            self.interpreter.invoke()
+            return _dequantize(self.interpreter.get_tensor(self._output["index"]), self._output)
+
+
+def _quantize(values, details):
+    dtype = details["dtype"]
+    if dtype == np.float32:
+        return values
+    scale, zero_point = details["quantization"]
+    info = np.iinfo(dtype)
+    return np.clip(np.round(values / scale + zero_point), info.min, info.max).astype(dtype)
+
+
+def _dequantize(values, details):
+    if values.dtype == np.float32:
+        return values.copy()
+    scale, zero_point = details["quantization"]
+    return (values.astype(np.float32) - zero_point) * scale
+
+
+BACKENDS = {
+    ".h5": KerasBackend,
+    ".keras": KerasBackend,
+    ".tflite": TFLiteBackend,
+}
+
+
+def load_backend(path, num_threads=None):
+    """
+    Returns the backend matching the extension of the model file at `path`.
+    `num_threads` caps the CPU threads of a forward pass (default: TensorFlow's choice).
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in BACKENDS:
+        raise ValueError(f"No inference backend for '{extension}' model files ({path})")
+    return BACKENDS[extension](path, num_threads=num_threads)
@@ -0,0 +1,214 @@
+"""
+Inference latency and throughput benchmarks for the Translator's model.
+
+Each model variant is benchmarked in a fresh process, loaded through
+`hieroglyphs.inference.load_serving_model` exactly as the Translator's
+`get_model()` does, and measured for:
+
+- cold start: importing TensorFlow plus resolving and loading the model;
+- first call: the first prediction after loading (graph tracing, allocation);
+- single-image latency p50/p95/p99, both for the model call alone and end to
+  end as in `predict_image` (decode + preprocess + predict + calibrate + top-k);
+- throughput in images/s at batch sizes 1 to 64.
+
+Images are the bundled `assets/` pictures, a directory given with `--images`, or
+seeded synthetic noise (`--synthetic`). Models are resolved offline: nothing is
+downloaded unless `--allow-download` is given. Results are written as JSON, so runs
+can be compared across backends, thread settings, variants and releases.
+
+Usage:
+    python -m hieroglyphs.benchmark InceptionV3 InceptionV3-int8 InceptionV3-float16 --output bench.json
+    python -m hieroglyphs.benchmark InceptionV3 --threads 1 2 4 --batch-sizes 1 8 32 --synthetic
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+from hieroglyphs.cascade import CascadeBackend
+from hieroglyphs.preprocessing import IMAGE_EXTENSIONS
+
+BATCH_SIZES = (1, 2, 4, 8, 16, 32, 64)
+
+# Timed single-image predictions per latency measurement
+LATENCY_RUNS = 100
+
+# Each batch size is measured for at least this long (and at least MIN_BATCHES batches)
+MIN_SECONDS = 2.0
+MIN_BATCHES = 3
+
+
+def bundled_images(image_dir="assets"):
+    """Returns the encoded bytes of the images in `image_dir`, in name order."""
+    images = []
+    for file_name in sorted(os.listdir(image_dir)):
+        if file_name.lower().endswith(IMAGE_EXTENSIONS):
+            with open(os.path.join(image_dir, file_name), "rb") as f:
+                images.append(f.read())
+    return images
+
+
+def synthetic_images(count=16, size=(640, 480), seed=0):
+    """Returns `count` seeded random-noise JPEGs, so the decode path is exercised too."""
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        buffer = io.BytesIO()
+        Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)).save(buffer, format="JPEG")
+        images.append(buffer.getvalue())
+    return images
+
+
+def _percentiles(seconds):
+    ms = np.asarray(seconds) * 1000
+    return {"p50": float(np.percentile(ms, 50)), "p95": float(np.percentile(ms, 95)),
+            "p99": float(np.percentile(ms, 99)), "mean": float(ms.mean())}
+
+
+def _model_size(model):
+    # A cascade's own path is its JSON description; what it loads are its stages
+    paths = [stage.path for stage in model.stages] if isinstance(model, CascadeBackend) else [model.path]
+    return sum(os.path.getsize(path) for path in paths)
+
+
+def benchmark_model(name, version=None, num_threads=None, images=(), batch_sizes=BATCH_SIZES,
+                    latency_runs=LATENCY_RUNS, min_seconds=MIN_SECONDS):
+    """
+    Benchmarks one model variant in the current process; cold-start numbers are only
+    meaningful in a fresh process (as `run` arranges). Returns a result dict.
+    """
+    start = time.perf_counter()
+    import tensorflow as tf
+    imported_at = time.perf_counter()
+
+    from hieroglyphs.inference import calibrate, load_serving_model, load_temperature, top_k_predictions
+    from hieroglyphs.preprocessing import preprocess_image
+
+    model = load_serving_model(name, version, num_threads)
+    loaded_at = time.perf_counter()
+    temperature = load_temperature(name, version)
+    inputs = np.stack([preprocess_image(image, draft=True) for image in images])
+
+    first_start = time.perf_counter()
+    model.predict(inputs[:1])
+    first_call = time.perf_counter() - first_start
+
+    model_seconds, end_to_end_seconds = [], []
+    for run in range(latency_runs):
+        image = images[run % len(images)]
+        run_start = time.perf_counter()
+        batch = preprocess_image(image, draft=True)[np.newaxis]
+        predict_start = time.perf_counter()
+        preds = model.predict(batch)[0]
+        model_seconds.append(time.perf_counter() - predict_start)
+        top_k_predictions(calibrate(preds, temperature))
+        end_to_end_seconds.append(time.perf_counter() - run_start)
+
+    throughput = []
+    for batch_size in batch_sizes:
+        batch = inputs[np.arange(batch_size) % len(inputs)]
+        model.predict(batch)  # the first call at a new batch size may resize or retrace
+        batch_seconds = []
+        while len(batch_seconds) < MIN_BATCHES or sum(batch_seconds) < min_seconds:
+            batch_start = time.perf_counter()
+            model.predict(batch)
+            batch_seconds.append(time.perf_counter() - batch_start)
+        throughput.append({
+            "batch_size": batch_size,
+            "images_per_second": float(batch_size * len(batch_seconds) / sum(batch_seconds)),
+            "batch_ms_p50": float(np.percentile(batch_seconds, 50) * 1000),
+        })
+
+    return {
+        "model": name,
+        "version": version,
+        "backend": model.name,
+        "model_file": os.path.basename(model.path),
+        "model_size_mb": _model_size(model) / 2 ** 20,
+        "threads": num_threads,
+        "tensorflow": tf.__version__,
+        "cold_start_s": {
+            "import": imported_at - start,
+            "load": loaded_at - imported_at,
+            "total": loaded_at - start,
+        },
+        "first_call_ms": first_call * 1000,
+        "latency_ms": _percentiles(model_seconds),
+        "end_to_end_ms": _percentiles(end_to_end_seconds),
+        "throughput": throughput,
+    }
+
+
+def run(names, versions=(None,), threads=(None,), images=(), batch_sizes=BATCH_SIZES,
+        latency_runs=LATENCY_RUNS, min_seconds=MIN_SECONDS):
+    """Benchmarks every model/version/thread combination, each in its own fresh process."""
+    results = []
+    for name in names:
+        for version in versions:
+            for num_threads in threads:
+                with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+                    results.append(pool.submit(benchmark_model, name, version, num_threads, images,
+                                               batch_sizes, latency_runs, min_seconds).result())
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "images": len(images),
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold start, latency and throughput of the serving model.")
+    parser.add_argument("names", nargs="*", default=[os.environ.get("HIEROGLYPH_MODEL_NAME", "InceptionV3")],
+                        help="registered model names (default: the served model)")
+    parser.add_argument("--version", action="append", dest="versions", help="model version (repeatable)")
+    parser.add_argument("--threads", type=int, nargs="+", default=[None], help="thread settings to compare")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=list(BATCH_SIZES))
+    parser.add_argument("--latency-runs", type=int, default=LATENCY_RUNS)
+    parser.add_argument("--min-seconds", type=float, default=MIN_SECONDS, help="minimum time per batch size")
+    parser.add_argument("--images", default="assets", help="directory of sample images (default: %(default)s)")
+    parser.add_argument("--synthetic", action="store_true", help="use seeded random-noise images instead")
+    parser.add_argument("--allow-download", action="store_true", help="download models missing from the registry")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    if not args.allow_download:
+        # Inherited by the benchmark processes, whose registry then never touches the network
+        os.environ["HIEROGLYPH_MODEL_OFFLINE"] = "1"
+    images = synthetic_images() if args.synthetic else bundled_images(args.images)
+    if not images:
+        parser.error(f"No images in {args.images}; use --synthetic")
+
+    report = run(args.names, args.versions or [None], args.threads, images, args.batch_sizes,
+                 args.latency_runs, args.min_seconds)
+    for result in report["results"]:
+        print(f"{result['model']} ({result['backend']}, threads={result['threads'] or 'default'}): "
+              f"cold start {result['cold_start_s']['total']:.2f}s, first call {result['first_call_ms']:.0f} ms, "
+              f"p50/p95/p99 {result['latency_ms']['p50']:.1f}/{result['latency_ms']['p95']:.1f}/"
+              f"{result['latency_ms']['p99']:.1f} ms (end to end p50 {result['end_to_end_ms']['p50']:.1f} ms)")
+        for row in result["throughput"]:
+            print(f"  batch {row['batch_size']:>3}: {row['images_per_second']:>8.1f} images/s "
+                  f"({row['batch_ms_p50']:.1f} ms/batch)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
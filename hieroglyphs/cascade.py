@@ -0,0 +1,160 @@
+"""
+Confidence-gated model cascade.
+
+A cheap model answers every image first; only images whose top-1 confidence (or
+margin over the runner-up) falls below that stage's threshold are passed on to the
+next, heavier model. With `ensemble`, a later stage answers with the average of all
+the probabilities computed so far for the image instead of its own alone. Most
+uploads are clear-cut, so the cascade costs little more than the cheap model while
+the hard cases still get the heavy one.
+
+The cascade is described by `model/cascade.json`:
+
+    {
+      "stages": [{"model": "InceptionV3-int8"}, {"model": "InceptionV3"}, {"model": "Xception"}],
+      "thresholds": [0.9, 0.75],
+      "score": "confidence",
+      "ensemble": false,
+      "costs": [4.1, 11.8, 14.2]
+    }
+
+`thresholds` has one entry per stage except the last, `costs` (optional) is the
+per-image cost of each stage, e.g. its p50 latency. `HIEROGLYPH_MODEL_NAME=cascade`
+serves it everywhere a registered model is served. `pick_thresholds` chooses the
+thresholds from stored validation outputs (see `hieroglyphs.evaluation` and the
+notebook's cascade section).
+"""
+
+import itertools
+import json
+import os
+import threading
+
+import numpy as np
+
+CASCADE_MODEL_NAME = "cascade"
+CASCADE_PATH = os.path.join("model", "cascade.json")
+
+SCORES = ("confidence", "margin")
+
+
+def gate_scores(probs, score="confidence"):
+    """Top-1 probability, or its margin over the runner-up, per row."""
+    top2 = np.partition(probs, -2, axis=1)[:, -2:]
+    return top2[:, 1] if score == "confidence" else top2[:, 1] - top2[:, 0]
+
+
+def run_cascade(predictors, n, thresholds, score="confidence", ensemble=False):
+    """
+    Runs `n` images through the stages. `predictors[i](indices)` returns stage i's
+    probabilities for those images. Returns the final `(n, n_classes)` probabilities
+    and the index of the last stage each image reached.
+    """
+    if score not in SCORES:
+        raise ValueError(f"Unknown gate score '{score}', expected one of {SCORES}")
+    result = totals = None
+    reached = np.zeros(n, dtype=np.int64)
+    active = np.arange(n)
+    for stage, predict in enumerate(predictors):
+        probs = np.asarray(predict(active), dtype=np.float32)
+        if result is None:
+            result = np.empty((n, probs.shape[1]), dtype=np.float32)
+            totals = np.zeros_like(result)
+        reached[active] = stage
+        if ensemble:
+            totals[active] += probs
+            probs = totals[active] / np.float32(stage + 1)
+        result[active] = probs
+        if stage == len(predictors) - 1:
+            break
+        active = active[gate_scores(probs, score) < thresholds[stage]]
+        if not len(active):
+            break
+    return result, reached
+
+
+def baseline_cost(costs, ensemble=False):
+    """Per-image cost of not cascading: the last stage alone, or every stage for an ensemble."""
+    return float(np.sum(costs)) if ensemble else float(costs[-1])
+
+
+def simulate(stage_probs, labels, thresholds, costs, score="confidence", ensemble=False):
+    """Accuracy, mean per-image cost and stage usage of a cascade, from stored per-stage outputs."""
+    probs, reached = run_cascade([lambda idx, p=p: p[idx] for p in stage_probs], len(labels), thresholds,
+                                 score, ensemble)
+    mean_cost = float(np.cumsum(costs)[reached].mean())
+    return {
+        "thresholds": [float(t) for t in thresholds],
+        "accuracy": float(np.mean(probs.argmax(axis=1) == labels)),
+        "mean_cost": mean_cost,
+        "compute_saved": 1 - mean_cost / baseline_cost(costs, ensemble),
+        "stage_fractions": (np.bincount(reached, minlength=len(stage_probs)) / len(labels)).tolist(),
+    }
+
+
+def pick_thresholds(stage_probs, labels, costs, target_accuracy, score="confidence", ensemble=False,
+                    grid=np.linspace(0.0, 1.0, 41)):
+    """
+    Grid-searches the stage thresholds for the cheapest cascade reaching `target_accuracy`
+    on the given (validation) outputs. Returns its `simulate` dict, or the cheapest of the
+    most accurate cascades if none reaches the target.
+    """
+    best = most_accurate = None
+    for thresholds in itertools.product(grid, repeat=len(stage_probs) - 1):
+        candidate = simulate(stage_probs, labels, thresholds, costs, score, ensemble)
+        if candidate["accuracy"] >= target_accuracy and (best is None or candidate["mean_cost"] < best["mean_cost"]):
+            best = candidate
+        if most_accurate is None or (candidate["accuracy"], -candidate["mean_cost"]) > (
+                most_accurate["accuracy"], -most_accurate["mean_cost"]):
+            most_accurate = candidate
+    return best or most_accurate
+
+
+class CascadeBackend:
+    """Inference backend running a cascade of backends; `stats()` reports how far images got."""
+
+    name = "cascade"
+
+    def __init__(self, stages, thresholds, score="confidence", ensemble=False, costs=None, path=None):
+        if len(thresholds) != len(stages) - 1:
+            raise ValueError(f"A cascade of {len(stages)} stages needs {len(stages) - 1} thresholds")
+        self.stages = stages
+        self.thresholds = list(thresholds)
+        self.score = score
+        self.ensemble = ensemble
+        self.costs = costs
+        self.path = path
+        self.input_shape = stages[0].input_shape
+        self._stage_counts = np.zeros(len(stages), dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def predict(self, batch):
+        predictors = [lambda idx, stage=stage: stage.predict(batch[idx]) for stage in self.stages]
+        probs, reached = run_cascade(predictors, len(batch), self.thresholds, self.score, self.ensemble)
+        with self._lock:
+            self._stage_counts += np.bincount(reached, minlength=len(self.stages))
+        return probs
+
+    def stats(self):
+        """Images answered by each stage and, with `costs`, the compute saved per image."""
+        with self._lock:
+            counts = self._stage_counts.copy()
+        stats = {"images": int(counts.sum()), "answered_by_stage": counts.tolist()}
+        if self.costs and counts.sum():
+            mean_cost = float(np.cumsum(self.costs) @ counts / counts.sum())
+            stats["compute_saved"] = 1 - mean_cost / baseline_cost(self.costs, self.ensemble)
+        return stats
+
+
+def load_cascade(path=CASCADE_PATH, registry=None, num_threads=None):
+    """Loads the cascade described by `path`, resolving its stages through the model registry."""
+    from hieroglyphs.artifacts import ModelRegistry
+    from hieroglyphs.backends import load_backend
+
+    with open(path) as f:
+        config = json.load(f)
+    registry = registry or ModelRegistry()
+    stages = [load_backend(registry.ensure(stage["model"], stage.get("version")), num_threads)
+              for stage in config["stages"]]
+    return CascadeBackend(stages, config["thresholds"], config.get("score", "confidence"),
+                          config.get("ensemble", False), config.get("costs"), path)
@@ -0,0 +1,125 @@
+"""
+Gardiner sign catalogue: model output index -> Gardiner code -> name and meaning.
+
+The catalogue itself is data, not code: it lives in the versioned
+`data/gardiner_catalogue.json` (or the file named by `HIEROGLYPH_CATALOGUE`)
+and is parsed once per process by `load_catalogue`, however many Streamlit
+reruns and sessions use it. `label_map`, `gardiner_categories` and `code_to_info`
+keep their original shapes for existing callers.
+
+`glyph_table` is built once at import time: one resolved `GlyphRecord` per model
+output index, so turning a prediction into a name and description is a single
+list index instead of dictionary lookups, prefix parsing and string formatting
+on every call.
+"""
+
+import functools
+import json
+import logging
+import os
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_PATH = os.environ.get(
+    "HIEROGLYPH_CATALOGUE", os.path.join(os.path.dirname(__file__), "data", "gardiner_catalogue.json")
+)
+
+# Catalogue file format understood by this module
+CATALOGUE_VERSION = 1
+
+GlyphRecord = namedtuple("GlyphRecord", ["code", "name", "desc", "category"])
+
+
+@functools.lru_cache(maxsize=None)
+def load_catalogue(path=CATALOGUE_PATH):
+    """
+    Parses a catalogue file into `(label_map, gardiner_categories, code_to_info)`.
+
+    - `label_map`: model output index -> Gardiner code
+    - `gardiner_categories`: code prefix -> category name
+    - `code_to_info`: Gardiner code -> `(name, meaning)`
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != CATALOGUE_VERSION:
+        raise ValueError(f"{path} is catalogue version {data.get('version')}, expected {CATALOGUE_VERSION}")
+
+    label_map = dict(enumerate(data["labels"]))
+    code_to_info = {code: (sign["name"], sign["meaning"]) for code, sign in data["signs"].items()}
+    return label_map, data["categories"], code_to_info
+
+
+label_map, gardiner_categories, code_to_info = load_catalogue()
+
+
+def _build_record(class_idx):
+    """
+    Resolves a model output index to a `GlyphRecord`. Only used to build `glyph_table`.
+
+    This function implements a robust fallback system:
+    1. Tries to find a specific symbol match in `code_to_info`.
+    2. If not found, it uses the symbol's Gardiner code prefix to identify its category.
+    3. If the category or code is completely unknown, it returns a "Mystery Symbol" message.
+    """
+    # 1. Map prediction index to a Gardiner code
+    code = label_map.get(int(class_idx))
+
+    # 2. Determine the symbol's name and description with fallbacks
+    if code and code in code_to_info:
+        # Case 1: Perfect Match - The symbol is fully recognized.
+        name, desc = code_to_info[code]
+
+    elif code:
+        # Case 2: Category Match - The symbol's code is valid but not in our detailed list.
+        # We infer its meaning from the general Gardiner category.
+        prefix = ''.join(filter(str.isalpha, code))
+        category = gardiner_categories.get(prefix)
+
+        if category:
+            name = code  # Display the code itself as the name
+            desc = f"📖 Meaning: A hieroglyph from the '{category}' category. While this specific symbol is not in our detailed database, it belongs to signs representing '{category.lower()}'."
+        else:
+            # Fallback 1: The code's prefix is not a known Gardiner category.
+            name = "Mystery Symbol"
+            code = "Unclassified"
+            desc = "📖 Meaning: A rare or unclassified hieroglyph. Its category is not recognized in the standard Gardiner system."
+
+    else:
+        # Fallback 2: The model's output doesn't map to any known hieroglyph code.
+        name = "Mystery Symbol"
+        code = "Unknown"
+        desc = "📖 Meaning: A rare or unidentified hieroglyph from ancient Egypt. Our AI could not match it to a known symbol."
+
+    category = gardiner_categories.get(''.join(filter(str.isalpha, code)))
+    return GlyphRecord(code, name, desc, category)
+
+
+def validate_catalogue():
+    """Returns the `label_map` codes that have no entry in `code_to_info` (they fall back to their category)."""
+    return [code for code in label_map.values() if code not in code_to_info]
+
+
+# Dense, index-aligned table of every model output, resolved once at import time
+NUM_CLASSES = max(label_map) + 1
+glyph_table = [_build_record(class_idx) for class_idx in range(NUM_CLASSES)]
+UNKNOWN_GLYPH = _build_record(-1)
+
+_missing_codes = validate_catalogue()
+if _missing_codes:
+    logger.warning("label_map codes missing from code_to_info: %s", ", ".join(_missing_codes))
+
+
+def glyph_record(class_idx):
+    """Returns the `GlyphRecord` (code, name, desc, category) for a model output index."""
+    class_idx = int(class_idx)
+    return glyph_table[class_idx] if 0 <= class_idx < NUM_CLASSES else UNKNOWN_GLYPH
+
+
+def resolve_prediction(class_idx):
+    """
+    Maps a model output index to a `(code, name, desc)` triple.
+    Indices outside the model's outputs resolve to the "Mystery Symbol" fallback.
+    """
+    code, name, desc, _ = glyph_record(class_idx)
+    return code, name, desc
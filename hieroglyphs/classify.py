@@ -0,0 +1,198 @@
+"""
+Headless bulk classification of a directory tree of images.
+
+Uses the Translator's serving path (`load_serving_model`, the fast decode of
+`preprocess_image(..., draft=True)`, temperature calibration and catalogue
+resolution) without Streamlit:
+
+    directory walk -> process pool: decode + resize `batch_size` images per task
+    -> main process: normalize into one float32 buffer -> model.predict -> write rows
+
+At most `prefetch` decoded batches wait for the model at any time, so memory stays
+bounded however many images there are. Each result row is written and flushed as
+soon as its batch is done, as JSON lines or CSV. Images that were already written
+to the output file (including those that failed to decode) are skipped, so an
+interrupted nightly run picks up where it stopped; a row cut off by a crash is
+removed before resuming.
+
+Usage:
+    python -m hieroglyphs.classify photos/ --output catalogue.jsonl
+    python -m hieroglyphs.classify photos/ --output catalogue.csv --batch-size 64 --workers 8
+"""
+
+import argparse
+import csv
+import functools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from hieroglyphs.inference import DEFAULT_MODEL_NAME, TOP_K, calibrate, top_k_predictions
+from hieroglyphs.preprocessing import IMAGE_EXTENSIONS, MODEL_INPUT_SHAPE, load_resized
+
+CSV_COLUMNS = ["path", "code", "name", "confidence", "alternatives", "error"]
+
+# Progress is reported every this many images
+REPORT_EVERY = 1000
+
+
+def find_images(root):
+    """Returns the image files under `root`, relative to it, in a stable (sorted walk) order."""
+    found = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for file_name in sorted(files):
+            if file_name.lower().endswith(IMAGE_EXTENSIONS):
+                found.append(os.path.relpath(os.path.join(directory, file_name), root).replace(os.sep, "/"))
+    return found
+
+
+def _decode_batch(root, paths):
+    # Runs in a worker process; uint8 keeps the pickled result at a quarter of float32's size
+    images = np.zeros((len(paths), *MODEL_INPUT_SHAPE), dtype=np.uint8)
+    errors = [None] * len(paths)
+    for row, path in enumerate(paths):
+        try:
+            images[row] = load_resized(os.path.join(root, path), draft=True)
+        except Exception as e:
+            errors[row] = str(e) or type(e).__name__
+    return images, errors
+
+
+def _format_for(path):
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def _truncate_partial_row(output):
+    # A crash mid-write leaves a last line without its newline; drop it so appending stays well-formed
+    with open(output, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def completed_paths(output):
+    """Returns the image paths already present in an output file (empty if it does not exist)."""
+    if not os.path.exists(output):
+        return set()
+    _truncate_partial_row(output)
+    with open(output, newline="") as f:
+        if _format_for(output) == "csv":
+            return {row["path"] for row in csv.DictReader(f)}
+        return {json.loads(line)["path"] for line in f if line.strip()}
+
+
+class ResultWriter:
+    """Appends result rows to a JSON lines or CSV file, flushing after every batch."""
+
+    def __init__(self, output):
+        self.format = _format_for(output)
+        new_file = not os.path.exists(output) or os.path.getsize(output) == 0
+        self._file = open(output, "a", newline="")
+        if self.format == "csv":
+            self._csv = csv.DictWriter(self._file, CSV_COLUMNS)
+            if new_file:
+                self._csv.writeheader()
+
+    def write(self, rows):
+        for row in rows:
+            if self.format == "csv":
+                alternatives = ";".join(f"{c['code']}:{c['confidence']:.4f}" for c in row["alternatives"])
+                self._csv.writerow({**row, "alternatives": alternatives})
+            else:
+                self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def classify_tree(root, output, model, temperature=1.0, batch_size=32, k=TOP_K, workers=None, prefetch=None,
+                  log=print):
+    """
+    Classifies every image under `root` not yet in `output` with `model` (an inference
+    backend) and appends one row per image. Returns a summary dict.
+    """
+    done = completed_paths(output)
+    paths = [path for path in find_images(root) if path not in done]
+    log(f"{len(paths) + len(done)} images, {len(done)} already classified, {len(paths)} to go")
+
+    workers = workers or os.cpu_count()
+    prefetch = prefetch or 2 * workers
+    batch = np.empty((batch_size, *MODEL_INPUT_SHAPE), dtype=np.float32)
+    writer = ResultWriter(output)
+    classified = errors = 0
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(workers) as pool:
+            chunks = iter(range(0, len(paths), batch_size))
+            pending = deque()
+            while True:
+                # Keep the pool busy, but never more than `prefetch` decoded batches ahead of the model
+                while len(pending) < prefetch:
+                    first = next(chunks, None)
+                    if first is None:
+                        break
+                    chunk = paths[first:first + batch_size]
+                    pending.append((chunk, pool.submit(_decode_batch, root, chunk)))
+                if not pending:
+                    break
+
+                chunk, future = pending.popleft()
+                images, decode_errors = future.result()
+                ok = [row for row, error in enumerate(decode_errors) if error is None]
+                np.divide(images[ok], np.float32(255.0), out=batch[:len(ok)])
+                probs = model.predict(batch[:len(ok)]) if ok else []
+
+                rows = [{"path": path, "code": "Error", "name": "", "confidence": 0.0, "alternatives": [],
+                         "error": error} for path, error in zip(chunk, decode_errors)]
+                for row, raw_probs in zip(ok, probs):
+                    candidates = top_k_predictions(calibrate(raw_probs, temperature), k)
+                    code, name, _, confidence = candidates[0]
+                    rows[row].update({"code": code, "name": name, "confidence": confidence, "error": None,
+                                      "alternatives": [{"code": c, "confidence": p} for c, _, _, p in candidates[1:]]})
+                writer.write(rows)
+
+                previous = classified + errors
+                classified += len(ok)
+                errors += len(chunk) - len(ok)
+                if (classified + errors) // REPORT_EVERY > previous // REPORT_EVERY:
+                    elapsed = time.perf_counter() - start
+                    log(f"  {classified + errors}/{len(paths)} images ({(classified + errors) / elapsed:.0f} images/s)")
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    summary = {"classified": classified, "errors": errors, "skipped": len(done), "seconds": elapsed,
+               "images_per_second": (classified + errors) / elapsed if elapsed and paths else 0.0}
+    log(f"Classified {classified} images ({errors} errors) in {elapsed:.1f}s "
+        f"({summary['images_per_second']:.0f} images/s)")
+    return summary
+
+
+def main():
+    from hieroglyphs.inference import load_serving_model, load_temperature
+
+    parser = argparse.ArgumentParser(description="Classify every image under a directory with the Translator's model.")
+    parser.add_argument("root", help="directory searched recursively for .jpg/.jpeg/.png images")
+    parser.add_argument("--output", required=True, help="results file; .csv for CSV, anything else for JSON lines")
+    parser.add_argument("--model", default=os.environ.get("HIEROGLYPH_MODEL_NAME", DEFAULT_MODEL_NAME))
+    parser.add_argument("--version", default=os.environ.get("HIEROGLYPH_MODEL_VERSION"))
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--top-k", type=int, default=TOP_K, help="candidates per image (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="decode processes (default: one per CPU)")
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads of the model (default: TensorFlow's)")
+    args = parser.parse_args()
+
+    model = load_serving_model(args.model, args.version, args.threads)
+    classify_tree(args.root, args.output, model, load_temperature(args.model, args.version), args.batch_size, args.top_k, args.workers,
+                  log=functools.partial(print, file=sys.stderr, flush=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Near-duplicate detection with perceptual hashes and a BK-tree.
+
+Every image is reduced to a 64-bit difference hash (dHash): the grayscale image
+shrunk to 9x8 pixels, one bit per "is this pixel brighter than its left
+neighbour". Re-encoded, resized or slightly retouched copies of an image have
+hashes a few bits apart, so near-duplicates are pairs within a small Hamming
+distance (`radius`).
+
+Hashes are indexed in a BK-tree, a metric tree whose triangle-inequality pruning
+answers "everything within `radius` of this hash" by visiting a small fraction
+of the nodes, instead of comparing every pair of images.
+
+With `dihedral=True` a query also tries the 7 mirrored/rotated versions of the
+image, which catches the augmented copies `hieroglyphs.prepare` makes for small
+classes.
+
+`find_duplicates` clusters near-duplicates within one dataset, and `hieroglyphs.prepare
+--dedup-radius` uses it to prune them before the split. `leakage_report` finds images
+in val/test that are near-duplicates of images in an earlier split.
+
+Usage:
+    python -m hieroglyphs.dedup find egypt --radius 4
+    python -m hieroglyphs.dedup leakage prepared --radius 4 --dihedral --output leakage.json
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from hieroglyphs.training import list_split
+
+HASH_SIZE = 8
+
+# Default Hamming distance (out of 64 bits) below which two images count as near-duplicates
+DEFAULT_RADIUS = 4
+
+# Identity, mirror, the three rotations and their mirrors
+_DIHEDRAL = [
+    (), (Image.FLIP_LEFT_RIGHT,), (Image.ROTATE_90,), (Image.ROTATE_180,), (Image.ROTATE_270,),
+    (Image.ROTATE_90, Image.FLIP_LEFT_RIGHT), (Image.ROTATE_180, Image.FLIP_LEFT_RIGHT),
+    (Image.ROTATE_270, Image.FLIP_LEFT_RIGHT),
+]
+
+
+def _dhash(gray, hash_size=HASH_SIZE):
+    small = np.asarray(gray.resize((hash_size + 1, hash_size), Image.BILINEAR), dtype=np.int16)
+    return int.from_bytes(np.packbits(small[:, 1:] > small[:, :-1]).tobytes(), "big")
+
+
+def image_hashes(path, dihedral=False, hash_size=HASH_SIZE):
+    """
+    Returns the dHash of an image as a list: just the image's own hash, or with
+    `dihedral` the hashes of all 8 mirrored/rotated versions (own hash first).
+    """
+    with Image.open(path) as image:
+        image.draft("L", (64, 64))
+        # Shrink once; the transforms and the 9x8 resize then work on a tiny image
+        gray = image.convert("L").resize((32, 32), Image.BILINEAR)
+    variants = _DIHEDRAL if dihedral else _DIHEDRAL[:1]
+    hashes = []
+    for ops in variants:
+        transformed = gray
+        for op in ops:
+            transformed = transformed.transpose(op)
+        hashes.append(_dhash(transformed, hash_size))
+    return hashes
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes with Hamming distance."""
+
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, value, item):
+        self._size += 1
+        node = [value, [item], {}]  # hash, items with that hash, children by distance
+        if self._root is None:
+            self._root = node
+            return
+        current = self._root
+        while True:
+            distance = hamming(value, current[0])
+            if distance == 0:
+                current[1].append(item)
+                return
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def query(self, value, radius):
+        """Returns `(distance, item)` for every indexed item within `radius` of `value`."""
+        if self._root is None:
+            return []
+        found, stack = [], [self._root]
+        while stack:
+            node_value, items, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= radius:
+                found.extend((distance, item) for item in items)
+            # Triangle inequality: only children at distance d with |d - distance| <= radius can match
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return found
+
+
+def hash_images(paths, dihedral=False, workers=None):
+    """Hashes images on a process pool; returns a list of hash lists aligned with `paths`."""
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(image_hashes, paths, [dihedral] * len(paths), chunksize=32))
+
+
+def find_duplicates(paths, radius=DEFAULT_RADIUS, hashes=None, workers=None):
+    """
+    Groups near-duplicate images. Returns clusters of indices into `paths` with
+    more than one member; the first index of each cluster is the one to keep.
+    """
+    if hashes is None:
+        hashes = hash_images(paths, workers=workers)
+    parent = list(range(len(paths)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    tree = BKTree()
+    for index, (own, *_) in enumerate(hashes):
+        for _, other in tree.query(own, radius):
+            a, b = root(index), root(other)
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+        tree.add(own, index)
+
+    clusters = {}
+    for index in range(len(paths)):
+        clusters.setdefault(root(index), []).append(index)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def _label_of(path):
+    return os.path.basename(os.path.dirname(path))
+
+
+def leakage_report(split_dirs, radius=DEFAULT_RADIUS, dihedral=False, workers=None):
+    """
+    Finds images of later splits that are near-duplicates of images in earlier ones,
+    e.g. `{"train": ..., "val": ..., "test": ...}`: val is checked against train,
+    test against train and val. Returns one dict per leaked image.
+    """
+    tree = BKTree()
+    leaks = []
+    for split, split_dir in split_dirs.items():
+        paths, _ = list_split(split_dir)
+        hashes = hash_images(paths, dihedral, workers)
+        for path, variants in zip(paths, hashes):
+            best = None
+            for variant in variants:
+                for distance, match in tree.query(variant, radius):
+                    if best is None or distance < best[0]:
+                        best = (distance, match)
+            if best is not None:
+                distance, (match_split, match_path) = best
+                leaks.append({"split": split, "path": path, "duplicate_of": match_path,
+                              "duplicate_split": match_split, "distance": distance,
+                              "same_label": _label_of(path) == _label_of(match_path)})
+        for path, (own, *_) in zip(paths, hashes):
+            tree.add(own, (split, path))
+    return leaks
+
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--radius", type=int, default=DEFAULT_RADIUS, help="max Hamming distance (default: %(default)s)")
+    common.add_argument("--workers", type=int, default=None)
+    common.add_argument("--output", help="also write the result to this JSON file")
+
+    parser = argparse.ArgumentParser(description="Find near-duplicate images and train/val/test leakage.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    find_cmd = commands.add_parser("find", parents=[common],
+                                   help="cluster near-duplicates within a <dir>/<label>/<image> dataset")
+    find_cmd.add_argument("data_dir")
+
+    leakage_cmd = commands.add_parser("leakage", parents=[common],
+                                      help="near-duplicates across the splits of a prepared dataset")
+    leakage_cmd.add_argument("prepared_dir", help="directory with train/, val/ and test/")
+    leakage_cmd.add_argument("--dihedral", action="store_true", help="also match mirrored and rotated copies")
+    args = parser.parse_args()
+
+    if args.command == "find":
+        paths, _ = list_split(args.data_dir)
+        clusters = find_duplicates(paths, args.radius, workers=args.workers)
+        result = [[paths[i] for i in cluster] for cluster in clusters]
+        for cluster in result:
+            print(f"{cluster[0]}\n" + "".join(f"  = {path}\n" for path in cluster[1:]), end="")
+        print(f"{sum(len(c) - 1 for c in result)} duplicates in {len(result)} clusters among {len(paths)} images")
+
+    elif args.command == "leakage":
+        split_dirs = {split: os.path.join(args.prepared_dir, split) for split in ("train", "val", "test")
+                      if os.path.isdir(os.path.join(args.prepared_dir, split))}
+        result = leakage_report(split_dirs, args.radius, args.dihedral, args.workers)
+        for leak in result:
+            print(f"{leak['split']:>5} {leak['path']}  ~ {leak['duplicate_split']} {leak['duplicate_of']} "
+                  f"(distance {leak['distance']}{'' if leak['same_label'] else ', different label'})")
+        for split in list(split_dirs)[1:]:
+            leaked = sum(leak["split"] == split for leak in result)
+            total = len(list_split(split_dirs[split])[0])
+            print(f"{split}: {leaked}/{total} images ({leaked / max(total, 1):.1%}) duplicate an earlier split")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
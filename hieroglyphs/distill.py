@@ -0,0 +1,232 @@
+"""
+Knowledge distillation of the InceptionV3 classifier into a compact student model.
+
+InceptionV3 at 299x299 is far more network than 108 mostly high-contrast glyph
+classes need, and the balanced training images started out as 100x100 grayscale
+anyway. A student, either a small separable-convolution CNN or MobileNetV2, is
+trained at `STUDENT_INPUT_SIZE` pixels on the same label encoding. It learns from
+the hard labels and from the teacher's softened probabilities:
+
+    loss = alpha * CE(labels, student) + (1 - alpha) * T^2 * CE(teacher_T, student_T)
+
+Here `_T` means softmax(logits / T). The teacher is frozen, so its outputs come from
+one pass over the training split, stored and reused by `hieroglyphs.evaluation`. The
+log of those probabilities is the teacher's logits up to a per-row constant, so
+`inference.calibrate(probs, T)` gives exactly the softened targets. The teacher was
+trained with class weights, and its soft targets carry that balance over. Soft
+targets are those of the unaugmented image, so any augmentation of the student
+should stay mild.
+
+The student is a drop-in replacement. Its first layer resizes the usual
+`(n, 299, 299, 3)` batch down to `STUDENT_INPUT_SIZE`, and its last layer is a
+softmax. Once it is registered (e.g. as `InceptionV3-student`), it is served with
+`HIEROGLYPH_MODEL_NAME=InceptionV3-student`, like any other variant. It can also
+be quantized with `hieroglyphs.export convert --model InceptionV3-student`, or used
+as the first stage of a cascade (`hieroglyphs.cascade`).
+
+Usage:
+    python -m hieroglyphs.distill --train dataset_cache/train --val dataset_cache/val --test dataset_cache/test \\
+        --student SmallCNN --output InceptionV3_student.h5 --register InceptionV3-student --version v1
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from hieroglyphs.inference import DEFAULT_MODEL_NAME, calibrate
+from hieroglyphs.preprocessing import MODEL_INPUT_SHAPE
+
+# Side of the square images the student sees; the serving batch is resized to it inside the model
+STUDENT_INPUT_SIZE = 96
+
+# Student architectures: filters of the convolution blocks, or the width multiplier of MobileNetV2
+STUDENTS = {
+    "SmallCNN": {"filters": [32, 64, 128, 256]},
+    "MobileNetV2": {"alpha": 0.35},
+}
+
+# Softmax temperature of the soft targets, and the weight of the hard-label loss
+TEMPERATURE = 4.0
+ALPHA = 0.1
+
+
+def build_student(arch, n_classes, input_size=STUDENT_INPUT_SIZE, weights=None, input_shape=MODEL_INPUT_SHAPE):
+    """
+    Returns an uncompiled student taking the serving `input_shape` batch, resized to
+    `input_size` inside the model, to softmax probabilities. Its pre-softmax layer is named
+    "logits". `weights` ("imagenet" or None) only applies to MobileNetV2.
+    """
+    import keras
+
+    spec = STUDENTS[arch]
+    inputs = keras.Input(input_shape)
+    # Bilinear resizing is a TFLite builtin, so the student exports like the teacher
+    x = keras.layers.Resizing(input_size, input_size, interpolation="bilinear")(inputs)
+
+    if arch == "MobileNetV2":
+        x = keras.layers.Rescaling(2.0, offset=-1.0)(x)  # MobileNetV2 expects [-1, 1]
+        base = keras.applications.MobileNetV2(input_tensor=x, alpha=spec["alpha"], include_top=False,
+                                              weights=weights)
+        x = base.output
+    else:
+        first, *rest = spec["filters"]
+        x = keras.layers.Conv2D(first, 3, strides=2, padding="same", use_bias=False)(x)
+        x = keras.layers.BatchNormalization()(x)
+        x = keras.layers.ReLU()(x)
+        for filters in rest:
+            x = keras.layers.SeparableConv2D(filters, 3, padding="same", use_bias=False)(x)
+            x = keras.layers.BatchNormalization()(x)
+            x = keras.layers.ReLU()(x)
+            x = keras.layers.MaxPooling2D()(x)
+
+    x = keras.layers.GlobalAveragePooling2D()(x)
+    x = keras.layers.Dropout(0.3)(x)
+    logits = keras.layers.Dense(n_classes, name="logits")(x)
+    outputs = keras.layers.Activation("softmax")(logits)
+    return keras.Model(inputs, outputs, name=f"{arch}_student")
+
+
+def distillation_targets(labels, teacher_probs, temperature=TEMPERATURE):
+    """`(n, 2 * n_classes)` training targets: the one-hot labels next to the teacher's softened probabilities."""
+    n_classes = teacher_probs.shape[1]
+    one_hot = np.eye(n_classes, dtype=np.float32)[labels]
+    return np.concatenate([one_hot, calibrate(teacher_probs, temperature)], axis=1)
+
+
+def distillation_loss(n_classes, temperature=TEMPERATURE, alpha=ALPHA):
+    """Loss on the student's logits for `distillation_targets` (the T^2 keeps the soft term's gradients in scale)."""
+    import keras
+
+    def loss(targets, logits):
+        hard = keras.losses.categorical_crossentropy(targets[:, :n_classes], logits, from_logits=True)
+        soft = keras.losses.categorical_crossentropy(targets[:, n_classes:], logits / temperature, from_logits=True)
+        return alpha * hard + (1 - alpha) * temperature ** 2 * soft
+
+    return loss
+
+
+def _hard_accuracy(n_classes):
+    import keras
+
+    def accuracy(targets, logits):
+        return keras.metrics.categorical_accuracy(targets[:, :n_classes], logits)
+
+    return accuracy
+
+
+def distill(student, train_split, teacher_probs, validation=None, temperature=TEMPERATURE, alpha=ALPHA,
+            epochs=30, batch_size=32, learning_rate=1e-3, augment=False, callbacks=(), seed=42):
+    """
+    Trains `student` on a `ShardedSplit` against the teacher's probabilities for it.
+    `validation` is an optional `(split, teacher_probs)` pair. Returns the training history;
+    the student ends up compiled with categorical cross-entropy, like the notebook's models.
+    """
+    import keras
+
+    n_classes = teacher_probs.shape[1]
+    trainer = keras.Model(student.input, student.get_layer("logits").output)
+    trainer.compile(optimizer=keras.optimizers.Adam(learning_rate=learning_rate),
+                    loss=distillation_loss(n_classes, temperature, alpha), metrics=[_hard_accuracy(n_classes)])
+
+    train_ds = train_split.dataset(batch_size, training=True, augment=augment, seed=seed,
+                                   targets=distillation_targets(train_split.labels, teacher_probs, temperature))
+    val_ds = None
+    if validation is not None:
+        val_split, val_teacher_probs = validation
+        val_ds = val_split.dataset(batch_size,
+                                   targets=distillation_targets(val_split.labels, val_teacher_probs, temperature))
+    history = trainer.fit(train_ds, validation_data=val_ds, epochs=epochs, callbacks=list(callbacks), verbose=2)
+
+    student.compile(optimizer=keras.optimizers.Adam(learning_rate=learning_rate),
+                    loss="categorical_crossentropy", metrics=["accuracy"])
+    return history
+
+
+def comparison_table(evaluations):
+    """
+    Latency/accuracy rows for `hieroglyphs.evaluation.Evaluation`s on the same split, by model
+    name; the first is the reference (the teacher) for speedup and top-1 agreement.
+    """
+    rows, reference = [], None
+    for name, evaluation in evaluations.items():
+        metrics = evaluation.metrics()
+        reference = reference or (evaluation, metrics)
+        rows.append({
+            "model": name,
+            "accuracy": metrics["accuracy"],
+            "f1": metrics["f1"],
+            "agreement": float(np.mean(evaluation.predicted == reference[0].predicted)),
+            "latency_ms_p50": metrics["latency_ms_p50"],
+            "latency_ms_p95": metrics["latency_ms_p95"],
+            "images_per_second": metrics["images_per_second"],
+            "speedup": reference[1]["latency_ms_p50"] / metrics["latency_ms_p50"],
+        })
+    return rows
+
+
+def main():
+    from hieroglyphs.artifacts import ModelRegistry
+    from hieroglyphs.backends import load_backend
+    from hieroglyphs.evaluation import EVALUATION_DIR, evaluate_model
+    from hieroglyphs.shards import ShardedSplit
+
+    parser = argparse.ArgumentParser(description="Distill the served model into a compact student model.")
+    parser.add_argument("--teacher", default=DEFAULT_MODEL_NAME, help="registered teacher model (default: %(default)s)")
+    parser.add_argument("--teacher-version", default=None)
+    parser.add_argument("--student", choices=sorted(STUDENTS), default="SmallCNN")
+    parser.add_argument("--input-size", type=int, default=STUDENT_INPUT_SIZE, help="student resolution in pixels")
+    parser.add_argument("--imagenet", action="store_true", help="start MobileNetV2 from ImageNet weights")
+    parser.add_argument("--train", required=True, help="shard cache of the training split (hieroglyphs.shards)")
+    parser.add_argument("--val", help="shard cache of the validation split")
+    parser.add_argument("--test", help="shard cache of the test split, for the latency/accuracy comparison")
+    parser.add_argument("--eval-dir", default=EVALUATION_DIR, help="where teacher outputs and evaluations are stored")
+    parser.add_argument("--temperature", type=float, default=TEMPERATURE)
+    parser.add_argument("--alpha", type=float, default=ALPHA, help="weight of the hard-label loss")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--learning-rate", type=float, default=1e-3)
+    parser.add_argument("--augment", action="store_true", help="apply the training augmentation to the student")
+    parser.add_argument("--output", default="InceptionV3_student.h5", help="student model file (default: %(default)s)")
+    parser.add_argument("--register", metavar="NAME", help="also register the student, e.g. InceptionV3-student")
+    parser.add_argument("--version", help="registry version for --register")
+    args = parser.parse_args()
+    if args.register and not args.version:
+        parser.error("--register needs --version")
+
+    registry = ModelRegistry()
+    teacher = load_backend(registry.ensure(args.teacher, args.teacher_version))
+    train_split = ShardedSplit(args.train)
+    teacher_probs = evaluate_model(f"{args.teacher}-train", teacher, train_split, args.eval_dir).probs
+    validation = None
+    if args.val:
+        val_split = ShardedSplit(args.val)
+        validation = (val_split, evaluate_model(f"{args.teacher}-val", teacher, val_split, args.eval_dir).probs)
+
+    student = build_student(args.student, len(train_split.classes), args.input_size,
+                            "imagenet" if args.imagenet else None, train_split.input_shape)
+    print(f"{args.student} student: {student.count_params():,} parameters at {args.input_size}x{args.input_size}")
+    distill(student, train_split, teacher_probs, validation, args.temperature, args.alpha, args.epochs,
+            args.batch_size, args.learning_rate, args.augment)
+    student.save(args.output)
+    print(f"Saved {args.output} ({os.path.getsize(args.output) / 2 ** 20:.1f} MB)")
+    if args.register:
+        print(f"Registered {registry.register(args.register, args.version, args.output)}")
+
+    if args.test:
+        test_split = ShardedSplit(args.test)
+        student_name = args.register or os.path.splitext(os.path.basename(args.output))[0]
+        rows = comparison_table({
+            args.teacher: evaluate_model(args.teacher, teacher, test_split, args.eval_dir),
+            student_name: evaluate_model(student_name, load_backend(args.output), test_split, args.eval_dir),
+        })
+        print(f"{'Model':<24}{'Accuracy':>10}{'F1':>8}{'Agreement':>11}{'p50 ms':>9}{'p95 ms':>9}"
+              f"{'img/s':>9}{'Speedup':>9}")
+        for row in rows:
+            print(f"{row['model']:<24}{row['accuracy']:>10.2%}{row['f1']:>8.2%}{row['agreement']:>11.2%}"
+                  f"{row['latency_ms_p50']:>9.1f}{row['latency_ms_p95']:>9.1f}{row['images_per_second']:>9.1f}"
+                  f"{row['speedup']:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
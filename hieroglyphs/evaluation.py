@@ -0,0 +1,232 @@
+"""
+Evaluation harness: run each model over a split once, keep its outputs, derive every metric from them.
+
+The notebook used to call `model.evaluate(test_ds)` and then `model.predict(test_ds)`
+again for the confusion matrix and once more for the metrics table, three full
+passes over the test split per architecture. `evaluate_model` makes one pass over a
+`hieroglyphs.shards.ShardedSplit`, timing it, and stores the softmax outputs next to
+the labels in `<eval_dir>/<name>.npz`. An `Evaluation` loaded from that file answers
+accuracy, weighted precision/recall/F1, the confusion matrix, the per-class report
+and latency stats, so re-plotting or adding a metric never runs the model again.
+
+The models end in a softmax, so the stored outputs are probabilities; their logarithm
+is the logits up to a per-row constant (all that temperature scaling needs).
+
+A stored evaluation is reused while the split's fingerprint and the model are
+unchanged: the model file for backends loaded from disk, the weights for in-memory
+Keras models (so retraining one in the notebook is picked up without `force`).
+
+Usage:
+    python -m hieroglyphs.evaluation run InceptionV3_model.h5 dataset_cache/test --name InceptionV3
+    python -m hieroglyphs.evaluation report --eval-dir evaluation
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+EVALUATION_DIR = os.environ.get("HIEROGLYPH_EVALUATION_DIR", "evaluation")
+
+# Images timed one at a time for the single-image latency percentiles
+LATENCY_SAMPLES = 32
+
+
+def _model_key(model):
+    # Backends loaded from a file are identified by it, in-memory Keras models by their current
+    # weights, so outputs stored before a model was retrained are never reused for it
+    path = getattr(model, "path", None)
+    if isinstance(path, str) and os.path.isfile(path):
+        stat = os.stat(path)
+        return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    if hasattr(model, "get_weights"):
+        digest = hashlib.sha256()
+        for weights in model.get_weights():
+            digest.update(str(weights.shape).encode())
+            digest.update(np.ascontiguousarray(weights).tobytes())
+        return f"weights:{digest.hexdigest()}"
+    return ""
+
+
+def _predict_fn(model):
+    # Keras models (predict_on_batch skips the per-call tf.data setup of predict) or inference backends
+    return getattr(model, "predict_on_batch", None) or model.predict
+
+
+def _batch(split, indices):
+    return np.stack([split[i] for i in indices]).astype(np.float32) / 255.0
+
+
+class Evaluation:
+    """Stored outputs of one model on one split, and the metrics derived from them."""
+
+    def __init__(self, name, probs, labels, classes, batch_seconds, batch_sizes, single_seconds,
+                 split_fingerprint="", model_key=""):
+        self.name = name
+        self.probs = probs
+        self.labels = labels
+        self.classes = list(classes)
+        self.batch_seconds = batch_seconds
+        self.batch_sizes = batch_sizes
+        self.single_seconds = single_seconds
+        self.split_fingerprint = split_fingerprint
+        self.model_key = model_key
+
+    @property
+    def predicted(self):
+        return self.probs.argmax(axis=1)
+
+    @property
+    def accuracy(self):
+        return float(np.mean(self.predicted == self.labels))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".part", "wb") as f:
+            np.savez(f, name=self.name, probs=self.probs, labels=self.labels, classes=np.array(self.classes),
+                     batch_seconds=self.batch_seconds, batch_sizes=self.batch_sizes,
+                     single_seconds=self.single_seconds, split_fingerprint=self.split_fingerprint,
+                     model_key=self.model_key)
+        os.replace(path + ".part", path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(str(data["name"]), data["probs"], data["labels"], data["classes"].tolist(),
+                       data["batch_seconds"], data["batch_sizes"], data["single_seconds"],
+                       str(data["split_fingerprint"]), str(data["model_key"]))
+
+    def confusion_matrix(self):
+        from sklearn.metrics import confusion_matrix
+
+        return confusion_matrix(self.labels, self.predicted, labels=np.arange(len(self.classes)))
+
+    def report(self):
+        """Per-class precision/recall/F1/support, as `classification_report(output_dict=True)`."""
+        from sklearn.metrics import classification_report
+
+        present = np.union1d(self.labels, self.predicted)
+        return classification_report(self.labels, self.predicted, labels=present,
+                                      target_names=[self.classes[i] for i in present],
+                                      output_dict=True, zero_division=0)
+
+    def metrics(self):
+        """Accuracy, weighted precision/recall/F1 and latency stats as a flat dict."""
+        from sklearn.metrics import precision_recall_fscore_support
+
+        precision, recall, f1, _ = precision_recall_fscore_support(self.labels, self.predicted,
+                                                                   average="weighted", zero_division=0)
+        single_ms = self.single_seconds * 1000
+        return {
+            "model": self.name,
+            "images": len(self.labels),
+            "accuracy": self.accuracy,
+            "precision": float(precision),
+            "recall": float(recall),
+            "f1": float(f1),
+            "latency_ms_p50": float(np.percentile(single_ms, 50)),
+            "latency_ms_p95": float(np.percentile(single_ms, 95)),
+            "latency_ms_p99": float(np.percentile(single_ms, 99)),
+            "batch_ms_p50": float(np.percentile(self.batch_seconds * 1000, 50)),
+            "images_per_second": float(self.batch_sizes.sum() / self.batch_seconds.sum()),
+        }
+
+
+def evaluate_model(name, model, split, eval_dir=EVALUATION_DIR, batch_size=16, force=False):
+    """
+    Returns the `Evaluation` of `model` (a Keras model or an inference backend) on a
+    `ShardedSplit`, running it only if no matching evaluation is stored in `eval_dir`.
+    """
+    path = os.path.join(eval_dir, f"{name}.npz")
+    model_key = _model_key(model)
+    if not force and os.path.exists(path):
+        stored = Evaluation.load(path)
+        if stored.split_fingerprint == split.fingerprint and stored.model_key == model_key:
+            return stored
+
+    predict = _predict_fn(model)
+    # Warm-up, so one-off tracing/allocation is not counted
+    predict(_batch(split, [0]))
+
+    single = []
+    for index in range(min(LATENCY_SAMPLES, len(split))):
+        image = _batch(split, [index])
+        start = time.perf_counter()
+        predict(image)
+        single.append(time.perf_counter() - start)
+
+    outputs, batch_seconds, batch_sizes = [], [], []
+    for first in range(0, len(split), batch_size):
+        images = _batch(split, range(first, min(first + batch_size, len(split))))
+        start = time.perf_counter()
+        outputs.append(np.asarray(predict(images), dtype=np.float32))
+        batch_seconds.append(time.perf_counter() - start)
+        batch_sizes.append(len(images))
+
+    evaluation = Evaluation(name, np.concatenate(outputs), split.labels, split.classes, np.array(batch_seconds),
+                            np.array(batch_sizes), np.array(single), split.fingerprint, model_key)
+    evaluation.save(path)
+    return evaluation
+
+
+def load_evaluations(eval_dir=EVALUATION_DIR):
+    """Returns every stored evaluation in `eval_dir`, by model name."""
+    evaluations = {}
+    for file_name in sorted(os.listdir(eval_dir)):
+        if file_name.endswith(".npz"):
+            evaluation = Evaluation.load(os.path.join(eval_dir, file_name))
+            evaluations[evaluation.name] = evaluation
+    return evaluations
+
+
+def main():
+    from hieroglyphs.backends import load_backend
+    from hieroglyphs.shards import ShardedSplit
+
+    parser = argparse.ArgumentParser(description="Evaluate models once on a split and report metrics from stored outputs.")
+    parser.add_argument("--eval-dir", default=EVALUATION_DIR)
+    parser.add_argument("--output", help="also write the metrics to this JSON file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = commands.add_parser("run", help="run a model file over a shard cache and store its outputs")
+    run_cmd.add_argument("model_path")
+    run_cmd.add_argument("cache_dir", help="shard cache of the split (hieroglyphs.shards)")
+    run_cmd.add_argument("--name", help="evaluation name (default: the model file name)")
+    run_cmd.add_argument("--batch-size", type=int, default=16)
+    run_cmd.add_argument("--force", action="store_true", help="re-run even if a matching evaluation is stored")
+
+    report_cmd = commands.add_parser("report", help="metrics of the stored evaluations")
+    report_cmd.add_argument("--per-class", action="store_true", help="also print the per-class report")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        name = args.name or os.path.splitext(os.path.basename(args.model_path))[0]
+        evaluations = {name: evaluate_model(name, load_backend(args.model_path), ShardedSplit(args.cache_dir),
+                                            args.eval_dir, args.batch_size, args.force)}
+    else:
+        evaluations = load_evaluations(args.eval_dir)
+
+    rows = [evaluation.metrics() for evaluation in evaluations.values()]
+    print(f"{'Model':<24}{'Accuracy':>10}{'Precision':>11}{'Recall':>9}{'F1':>8}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'img/s':>9}")
+    for row in rows:
+        print(f"{row['model']:<24}{row['accuracy']:>10.2%}{row['precision']:>11.2%}{row['recall']:>9.2%}"
+              f"{row['f1']:>8.2%}{row['latency_ms_p50']:>9.1f}{row['latency_ms_p95']:>9.1f}"
+              f"{row['latency_ms_p99']:>9.1f}{row['images_per_second']:>9.1f}")
+    if args.command == "report" and args.per_class:
+        for name, evaluation in evaluations.items():
+            print(f"\n{name}")
+            for class_name, stats in evaluation.report().items():
+                if isinstance(stats, dict) and class_name in evaluation.classes:
+                    print(f"  {class_name:<8}{stats['precision']:>8.2f}{stats['recall']:>8.2f}"
+                          f"{stats['f1-score']:>8.2f}{stats['support']:>6.0f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Export the trained Keras model to quantized TensorFlow Lite for CPU-only serving.
+
+`convert` turns a registered Keras model (default: the `InceptionV3` artifact
+served by the Translator) into a `.tflite` file and registers it next to the
+original as `<name>-<quantization>`:
+
+- `float16`: weights stored as float16, roughly half the size, near-identical accuracy.
+- `int8`:    full integer quantization calibrated on a representative set drawn,
+             class-balanced and seeded, from the balanced training data.
+- `dynamic`: int8 weights with float activations, no calibration set needed.
+
+`compare` runs several registered models over the test split's shard cache and reports
+accuracy, agreement with the first model and latency, so a quantized variant
+can be checked against the H5 model before it is served.
+
+The Translator serves a variant when `HIEROGLYPH_MODEL_NAME` names it,
+e.g. `HIEROGLYPH_MODEL_NAME=InceptionV3-int8 streamlit run app.py`.
+
+Usage:
+    python -m hieroglyphs.export convert --quantization int8 --calibration-dir balanced_data
+    python -m hieroglyphs.export compare --test dataset_cache/test InceptionV3 InceptionV3-int8 InceptionV3-float16
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+
+import numpy as np
+
+from hieroglyphs.artifacts import ModelRegistry
+from hieroglyphs.backends import load_backend
+from hieroglyphs.evaluation import EVALUATION_DIR, evaluate_model
+from hieroglyphs.preprocessing import preprocess_image
+from hieroglyphs.shards import ShardedSplit
+from hieroglyphs.training import list_split
+
+QUANTIZATIONS = ("int8", "float16", "dynamic")
+
+
+def calibration_set(data_dir, samples_per_class=4, seed=42):
+    """Picks a seeded, class-balanced sample of image paths from the training data."""
+    paths, labels = list_split(data_dir)
+    rng = random.Random(seed)
+    selected = []
+    for label in np.unique(labels):
+        class_paths = [p for p, l in zip(paths, labels) if l == label]
+        selected.extend(rng.sample(class_paths, min(samples_per_class, len(class_paths))))
+    return selected
+
+
+def convert(model_path, quantization, calibration_paths=()):
+    """Converts a Keras model file to TFLite and returns the serialized model bytes."""
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if quantization == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        if not calibration_paths:
+            raise ValueError("int8 quantization needs a calibration set (--calibration-dir)")
+
+        def representative_dataset():
+            for path in calibration_paths:
+                yield [preprocess_image(path)[np.newaxis]]
+
+        # Integer kernels inside, float32 input/output so the backend interface stays the same
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    elif quantization != "dynamic":
+        raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATIONS}")
+
+    return converter.convert()
+
+
+def compare(names, split, registry=None, batch_size=16, eval_dir=EVALUATION_DIR):
+    """
+    Evaluates registered models on a test `ShardedSplit`, streaming it batch by batch
+    through `hieroglyphs.evaluation.evaluate_model` (outputs are stored and reused while
+    the model file is unchanged). The first model is the reference for agreement.
+    """
+    registry = registry or ModelRegistry()
+    rows, reference = [], None
+    for name in names:
+        backend = load_backend(registry.ensure(name))
+        evaluation = evaluate_model(name, backend, split, eval_dir, batch_size)
+        if reference is None:
+            reference = evaluation.predicted
+        metrics = evaluation.metrics()
+        rows.append({
+            "model": name,
+            "backend": backend.name,
+            "accuracy": metrics["accuracy"],
+            "latency_ms_p50": metrics["latency_ms_p50"],
+            "latency_ms_p95": metrics["latency_ms_p95"],
+            "images_per_second": metrics["images_per_second"],
+            "model_size_mb": os.path.getsize(backend.path) / 2 ** 20,
+            "agreement": float(np.mean(evaluation.predicted == reference)),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export quantized TFLite models and compare them with the H5 model.")
+    parser.add_argument("--root", default=None, help="model directory (default: the registry default)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert_cmd = commands.add_parser("convert", help="convert a registered Keras model to TFLite")
+    convert_cmd.add_argument("--model", default="InceptionV3", help="registered source model (default: %(default)s)")
+    convert_cmd.add_argument("--version", help="source model version (default: the manifest default)")
+    convert_cmd.add_argument("--quantization", choices=QUANTIZATIONS, default="int8")
+    convert_cmd.add_argument("--calibration-dir", help="balanced training data, <dir>/<label>/<image>")
+    convert_cmd.add_argument("--samples-per-class", type=int, default=4)
+    convert_cmd.add_argument("--seed", type=int, default=42)
+
+    compare_cmd = commands.add_parser("compare", help="accuracy vs. latency of registered models on the test split")
+    compare_cmd.add_argument("names", nargs="+", help="registered model names; the first is the reference")
+    compare_cmd.add_argument("--test", required=True, help="shard cache of the test split (hieroglyphs.shards)")
+    compare_cmd.add_argument("--eval-dir", default=EVALUATION_DIR, help="where the models' outputs are stored")
+    compare_cmd.add_argument("--batch-size", type=int, default=16)
+    compare_cmd.add_argument("--output", help="also write the comparison to this JSON file")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root) if args.root else ModelRegistry()
+
+    if args.command == "convert":
+        version, _ = registry.resolve(args.model, args.version)
+        source_path = registry.ensure(args.model, version)
+        calibration_paths = []
+        if args.calibration_dir:
+            calibration_paths = calibration_set(args.calibration_dir, args.samples_per_class, args.seed)
+        tflite_model = convert(source_path, args.quantization, calibration_paths)
+
+        stem = os.path.splitext(os.path.basename(source_path))[0]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_path = os.path.join(tmp_dir, f"{stem}.{args.quantization}.tflite")
+            with open(tmp_path, "wb") as f:
+                f.write(tflite_model)
+            path = registry.register(f"{args.model}-{args.quantization}", version, tmp_path)
+        print(f"Saved {path} ({len(tflite_model) / 2 ** 20:.1f} MB)")
+
+    elif args.command == "compare":
+        rows = compare(args.names, ShardedSplit(args.test), registry, args.batch_size, args.eval_dir)
+        print(f"{'Model':<24}{'Accuracy':>10}{'Agreement':>11}{'p50 ms':>9}{'p95 ms':>9}{'img/s':>9}{'MB':>8}")
+        for row in rows:
+            print(f"{row['model']:<24}{row['accuracy']:>10.2%}{row['agreement']:>11.2%}"
+                  f"{row['latency_ms_p50']:>9.1f}{row['latency_ms_p95']:>9.1f}"
+                  f"{row['images_per_second']:>9.1f}{row['model_size_mb']:>8.1f}")
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Frozen-backbone feature caching and head-only training.
+
+Every model in the notebook freezes its ImageNet backbone and only trains the
+dense head on top, yet `fit` still runs the whole convolutional stack on every
+image in every epoch. Here the backbone runs once per architecture and dataset:
+its pooled outputs are cached on disk, and the head trains on those vectors, so
+an epoch (or a whole learning-rate sweep) costs a few matrix products per image
+instead of a forward pass through InceptionV3/Xception/VGG16.
+
+- `cached_features(arch, split)` returns the backbone embeddings of a
+  `hieroglyphs.shards.ShardedSplit`, computing them on first use. The cache file
+  is keyed by architecture, backbone weights and the split's fingerprint, so a
+  changed dataset or weights file never reuses stale features.
+- `build_head` / `train_head` build and fit the notebook's head for an
+  architecture on cached features.
+- `attach_head` puts the trained head back on the backbone, giving the same
+  single functional model as the notebook's `build_*_model`, ready to be saved,
+  registered and served or exported to TFLite.
+
+Cached features are computed without augmentation; use the streaming pipeline
+(`hieroglyphs.training`) when augmentation matters more than epoch cost.
+
+Usage:
+    python -m hieroglyphs.features --arch InceptionV3 --train dataset_cache/train --val dataset_cache/val \\
+        --epochs 20 --output InceptionV3_model.h5 --register InceptionV3 --version 2
+"""
+
+import argparse
+import hashlib
+import os
+import time
+
+import numpy as np
+
+from hieroglyphs.preprocessing import MODEL_INPUT_SHAPE
+
+FEATURE_CACHE_DIR = os.environ.get("HIEROGLYPH_FEATURE_CACHE_DIR", "feature_cache")
+
+# Backbone, pooling and dense head of each notebook model: (units, dropout) per hidden layer
+ARCHITECTURES = {
+    "InceptionV3": {"pooling": "avg", "hidden": [(512, 0.5)], "l2": 0.01},
+    "Xception": {"pooling": "avg", "hidden": [(1024, 0.5)], "l2": 0.01},
+    "VGG16": {"pooling": "flatten", "hidden": [(4096, 0.5), (4096, 0.5)], "l2": None},
+}
+
+
+def _weights_tag(weights):
+    if weights is None or weights == "imagenet":
+        return str(weights).lower()
+    with open(weights, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def build_backbone(arch, weights="imagenet", input_shape=MODEL_INPUT_SHAPE):
+    """
+    Returns the frozen backbone of `arch` with its pooling layer, mapping images to feature vectors.
+    `weights` is "imagenet", None, or the path of a weights file (as the notebook does for Xception).
+    """
+    import keras
+
+    spec = ARCHITECTURES[arch]
+    application = getattr(keras.applications, arch)
+    base = application(weights=weights if weights in ("imagenet", None) else None,
+                       include_top=False, input_shape=input_shape)
+    if weights not in ("imagenet", None):
+        base.load_weights(weights)
+    base.trainable = False
+
+    pooling = keras.layers.GlobalAveragePooling2D() if spec["pooling"] == "avg" else keras.layers.Flatten()
+    return keras.Model(base.input, pooling(base.output), name=f"{arch}_backbone")
+
+
+def cached_features(arch, split, backbone=None, weights="imagenet", cache_dir=FEATURE_CACHE_DIR, batch_size=32):
+    """
+    Returns the `(n, feature_dim)` backbone embeddings of a `ShardedSplit`, memory-mapped
+    from the cache, running `backbone` (built on demand) only if they are not cached yet.
+    """
+    path = os.path.join(cache_dir, f"{arch}-{_weights_tag(weights)}-{split.fingerprint[:16]}.npy")
+    if not os.path.exists(path):
+        backbone = backbone or build_backbone(arch, weights, split.input_shape)
+        features = backbone.predict(split.dataset(batch_size), verbose=0)
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(path + ".part", "wb") as f:
+            np.save(f, features.astype(np.float32))
+        os.replace(path + ".part", path)
+    return np.load(path, mmap_mode="r")
+
+
+def build_head(arch, feature_dim, n_classes, learning_rate=1e-4):
+    """The notebook's dense head for `arch` as a standalone model over feature vectors."""
+    import keras
+
+    spec = ARCHITECTURES[arch]
+    regularizer = keras.regularizers.l2(spec["l2"]) if spec["l2"] else None
+    inputs = keras.Input((feature_dim,))
+    x = inputs
+    for units, dropout in spec["hidden"]:
+        x = keras.layers.Dense(units, activation="relu", kernel_regularizer=regularizer)(x)
+        x = keras.layers.Dropout(dropout)(x)
+    outputs = keras.layers.Dense(n_classes, activation="softmax", kernel_regularizer=regularizer)(x)
+
+    head = keras.Model(inputs, outputs, name=f"{arch}_head")
+    head.compile(optimizer=keras.optimizers.Adam(learning_rate=learning_rate),
+                 loss="sparse_categorical_crossentropy", metrics=["accuracy"])
+    return head
+
+
+def train_head(arch, features, labels, n_classes, validation=None, epochs=20, batch_size=32,
+               learning_rate=1e-4, callbacks=()):
+    """Fits a fresh head on cached features; returns `(head, history)`."""
+    head = build_head(arch, features.shape[1], n_classes, learning_rate)
+    history = head.fit(np.asarray(features), labels, batch_size=batch_size, epochs=epochs, shuffle=True,
+                       validation_data=(np.asarray(validation[0]), validation[1]) if validation else None,
+                       callbacks=list(callbacks), verbose=2)
+    return head, history
+
+
+def attach_head(backbone, head, learning_rate=1e-4):
+    """
+    Returns one functional model, backbone followed by the head's layers, with the same
+    structure as the notebook's `build_*_model` and compiled the same way.
+    """
+    import keras
+
+    x = backbone.output
+    for layer in head.layers[1:]:
+        x = layer(x)
+    model = keras.Model(backbone.input, x)
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate=learning_rate),
+                  loss="categorical_crossentropy", metrics=["accuracy"])
+    return model
+
+
+def main():
+    from hieroglyphs.shards import ShardedSplit
+
+    parser = argparse.ArgumentParser(description="Train a classifier head on cached frozen-backbone features.")
+    parser.add_argument("--arch", choices=sorted(ARCHITECTURES), default="InceptionV3")
+    parser.add_argument("--weights", default="imagenet", help='"imagenet", "none" or a backbone weights file')
+    parser.add_argument("--train", required=True, help="shard cache of the training split (hieroglyphs.shards)")
+    parser.add_argument("--val", help="shard cache of the validation split")
+    parser.add_argument("--cache-dir", default=FEATURE_CACHE_DIR)
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--learning-rate", type=float, default=1e-4)
+    parser.add_argument("--output", help="save the full model (backbone + trained head) to this file")
+    parser.add_argument("--register", metavar="NAME", help="also register the full model in the model registry")
+    parser.add_argument("--version", help="registry version for --register")
+    args = parser.parse_args()
+    weights = None if args.weights.lower() == "none" else args.weights
+
+    train_split = ShardedSplit(args.train)
+    val_split = ShardedSplit(args.val) if args.val else None
+    backbone = build_backbone(args.arch, weights, train_split.input_shape)
+
+    start = time.perf_counter()
+    train_features = cached_features(args.arch, train_split, backbone, weights, args.cache_dir, args.batch_size)
+    validation = None
+    if val_split is not None:
+        validation = (cached_features(args.arch, val_split, backbone, weights, args.cache_dir, args.batch_size),
+                      val_split.labels)
+    print(f"Features {train_features.shape} ready in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    head, _ = train_head(args.arch, train_features, train_split.labels, len(train_split.classes), validation,
+                         args.epochs, args.batch_size, args.learning_rate)
+    elapsed = time.perf_counter() - start
+    print(f"Trained the head in {elapsed:.1f}s ({elapsed / args.epochs * 1000:.0f} ms/epoch)")
+
+    if args.output or args.register:
+        model = attach_head(backbone, head, args.learning_rate)
+        output = args.output or f"{args.arch}_model.h5"
+        model.save(output)
+        print(f"Saved {output}")
+        if args.register:
+            from hieroglyphs.artifacts import ModelRegistry
+
+            if not args.version:
+                parser.error("--register needs --version")
+            print(f"Registered {ModelRegistry().register(args.register, args.version, output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Prediction helpers shared by the Translator page and the inference server:
+model loading, temperature calibration, top-k resolution and the prediction cache.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from hieroglyphs.artifacts import ArtifactError, ModelRegistry
+from hieroglyphs.backends import load_backend
+from hieroglyphs.catalogue import glyph_record
+
+DEFAULT_MODEL_NAME = "InceptionV3"
+
+# Number of candidate signs returned for each prediction
+TOP_K = 3
+
+# Maximum number of predictions kept in memory by a PredictionCache
+PREDICTION_CACHE_SIZE = 1024
+
+# Temperature-scaling parameters fitted offline on the validation split, per model (see egypt.ipynb)
+CALIBRATION_PATH = os.path.join("model", "calibration.json")
+
+
+def load_serving_model(name=DEFAULT_MODEL_NAME, version=None, num_threads=None):
+    """
+    Resolves a registered model (downloading and verifying it if needed) and loads it
+    into the matching inference backend (Keras for .h5, TFLite for .tflite).
+    The name "cascade" loads the model cascade of `model/cascade.json` (see hieroglyphs.cascade).
+    """
+    from hieroglyphs.cascade import CASCADE_MODEL_NAME, load_cascade
+
+    if name == CASCADE_MODEL_NAME:
+        return load_cascade(num_threads=num_threads)
+    return load_backend(ModelRegistry().ensure(name, version), num_threads)
+
+
+def load_temperature(name=DEFAULT_MODEL_NAME, version=None, path=CALIBRATION_PATH, registry=None):
+    """
+    Returns the softmax temperature fitted for model `name` at `version` (default: the
+    registry's default version), or 1.0 (no calibration) if none was fitted for it.
+
+    `path` maps model names to the version they were fitted on:
+
+        {"InceptionV3": {"version": "v1", "temperature": 1.42}}
+
+    A temperature only fits the model it was fitted on, so a quantized variant, a student
+    or a retrained version is served uncalibrated until its own temperature is saved.
+    """
+    if not os.path.exists(path):
+        return 1.0
+    with open(path) as f:
+        calibration = json.load(f)
+    try:
+        version, entry = (registry or ModelRegistry()).resolve(name, version)
+        file_name = entry["file"]
+    except ArtifactError:
+        file_name = None  # not a registered artifact, e.g. the cascade
+
+    if "temperature" in calibration:
+        # Older single-model files: {"model": <model file name>, "temperature": T}
+        return float(calibration["temperature"]) if calibration.get("model") == file_name else 1.0
+    fitted = calibration.get(name)
+    if fitted is None or fitted.get("version") != version:
+        return 1.0
+    return float(fitted["temperature"])
+
+
+def save_temperature(name, version, temperature, path=CALIBRATION_PATH):
+    """Records the temperature fitted for model `name` at `version`, keeping those of other models."""
+    calibration = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            calibration = json.load(f)
+        if "temperature" in calibration:
+            calibration = {}  # an older single-model file is replaced
+    calibration[name] = {"version": version, "temperature": float(temperature)}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".part", "w") as f:
+        json.dump(calibration, f, indent=2)
+    os.replace(path + ".part", path)
+
+
+def calibrate(probs, temperature=1.0):
+    """
+    Applies temperature scaling to softmax outputs.
+
+    The model only exposes probabilities, but `log(probs)` equals the logits up to a
+    per-row constant, so softmax(log(probs) / T) is exactly temperature scaling.
+    """
+    probs = np.asarray(probs, dtype=np.float32)
+    if temperature == 1.0:
+        return probs
+    logits = np.log(np.clip(probs, 1e-12, 1.0)) / np.float32(temperature)
+    logits -= logits.max(axis=-1, keepdims=True)
+    scaled = np.exp(logits)
+    return scaled / scaled.sum(axis=-1, keepdims=True)
+
+
+def top_k_predictions(probs, k=TOP_K):
+    """Returns the `k` most likely `(code, name, desc, probability)` tuples, best first."""
+    top_idx = np.argsort(probs)[::-1][:k]
+    return [(*glyph_record(idx)[:3], float(probs[idx])) for idx in top_idx]
+
+
+class PredictionCache:
+    """
+    Content-addressed cache of model predictions, keyed by the SHA-256 of the image bytes.
+
+    Each entry holds the full softmax vector together with the resolved
+    `(code, name, desc, confidence)` tuple. The in-memory tier is a bounded LRU;
+    when `cache_dir` is given, entries are also written there as `.npz` files so
+    they survive restarts and can be shared by several app processes.
+    The cache is shared by every session, so all access goes through a lock.
+    """
+
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for(data):
+        """Returns the cache key for raw image bytes."""
+        return hashlib.sha256(data).hexdigest()
+
+    def get(self, key):
+        """Returns `(probs, result)` for `key`, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = self._load_from_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key, probs, result):
+        """Stores the softmax vector and resolved result for `key`."""
+        code, name, desc, confidence = result
+        entry = (np.asarray(probs, dtype=np.float32), (code, name, desc, float(confidence)))
+        with self._lock:
+            self._remember(key, entry)
+        self._save_to_disk(key, entry)
+
+    def stats(self):
+        """Returns the hit/miss counters and current in-memory size."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def _remember(self, key, entry):
+        # Caller must hold the lock
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def _load_from_disk(self, key):
+        if not self.cache_dir or not os.path.isfile(self._disk_path(key)):
+            return None
+        try:
+            with np.load(self._disk_path(key)) as data:
+                result = tuple(str(x) for x in data["result"])
+                return data["probs"], (result[0], result[1], result[2], float(data["confidence"]))
+        except Exception:
+            # A corrupt or partially written entry is just treated as a miss
+            return None
+
+    def _save_to_disk(self, key, entry):
+        if not self.cache_dir:
+            return
+        probs, (code, name, desc, confidence) = entry
+        tmp_path = self._disk_path(key) + f".{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, probs=probs, result=np.array([code, name, desc]), confidence=confidence)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
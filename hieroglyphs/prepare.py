@@ -0,0 +1,254 @@
+"""
+Dataset preparation: balance the raw dataset and write the train/val/test splits.
+
+Replaces the notebook's balancing and split cells, which converted, resized and
+re-saved one image at a time and then copied every file again into the split
+folders. Preparation here is two stages:
+
+1. Plan (single process, cheap): list every class in sorted order, downsample
+   classes above `target_count`, plan augmented copies (mirror / 90° rotations)
+   for classes below it, and assign every output image to a split. All random
+   choices come from a per-class `random.Random(f"{seed}:{label}")`, so the plan,
+   and therefore the split, is identical on every machine.
+2. Execute: a process pool decodes, converts to grayscale, resizes and encodes
+   each planned image straight into `<output>/<split>/<label>/`.
+
+Outputs are written to a temporary name and renamed when complete, and planned
+images that already exist are skipped, so an interrupted run resumes where it
+stopped. The plan is stored in `<output>/prepare_plan.json`; running again with
+different settings is refused unless `--force` clears the previous output.
+
+An original and its augmented copies are kept in the same split, and
+`--dedup-radius` prunes near-duplicate source images (see `hieroglyphs.dedup`)
+before anything is planned, so the test split does not grade the model on
+copies of training images.
+
+Usage:
+    python -m hieroglyphs.prepare egypt prepared --target-count 25 --seed 42
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from hieroglyphs.dedup import find_duplicates, hash_images
+from hieroglyphs.preprocessing import IMAGE_EXTENSIONS
+from hieroglyphs.training import list_classes, list_split
+
+SPLITS = ("train", "val", "test")
+
+# Progress is reported every this many images
+REPORT_EVERY = 500
+
+
+def _class_images(folder):
+    return sorted(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def _split_counts(n, val_size, test_size):
+    # Same rounding as the notebook's two train_test_split calls
+    n_holdout = math.ceil(n * (val_size + test_size))
+    n_test = math.ceil(n_holdout * test_size / (val_size + test_size))
+    return n - n_holdout, n_holdout - n_test, n_test
+
+
+def min_groups(val_size, test_size):
+    """Distinct originals a class needs for its splits to be made of whole original+augmented groups."""
+    return math.ceil(1 / min(val_size, test_size))
+
+
+def find_duplicate_sources(data_dir, radius, workers=None):
+    """Returns the raw images that are near-duplicates of another image of the same class (all but one per cluster)."""
+    paths, labels = list_split(data_dir)
+    hashes = hash_images(paths, workers=workers)
+    duplicates = set()
+    for label in np.unique(labels):
+        indices = np.flatnonzero(labels == label)
+        for cluster in find_duplicates([paths[i] for i in indices], radius, [hashes[i] for i in indices]):
+            duplicates.update(paths[indices[i]] for i in cluster[1:])
+    return duplicates
+
+
+def plan_dataset(data_dir, target_count=25, val_size=0.15, test_size=0.15, seed=42, exclude=()):
+    """
+    Returns the list of planned images as `(split, label, source path, output name, mirror, rotation)`,
+    in a deterministic order. Source paths in `exclude` (e.g. pruned duplicates) are left out.
+    """
+    tasks = []
+    for label in list_classes(data_dir):
+        folder = os.path.join(data_dir, label)
+        images = [image for image in _class_images(folder) if os.path.join(folder, image) not in exclude]
+        if not images:
+            continue
+        rng = random.Random(f"{seed}:{label}")
+
+        # 1. Downsample, or keep every original and top the class up with augmented copies
+        if len(images) > target_count:
+            planned = [(image, image, False, 0) for image in sorted(rng.sample(images, target_count))]
+        else:
+            planned = [(image, image, False, 0) for image in images]
+            sources = []
+            for index in range(len(images), target_count):
+                # Cycle through the originals in a shuffled order, so no image is augmented twice before all were
+                if not sources:
+                    sources = rng.sample(images, len(images))
+                source = sources.pop()
+                mirror = rng.random() < 0.5
+                rotation = rng.choice([90, 180, 270]) if rng.random() < 0.5 else 0
+                planned.append((source, f"aug_{index}_{source}", mirror, rotation))
+
+        # 2. Stratified split: every class contributes the same proportions. An original and its
+        #    augmented copies are near-duplicates, so they go to the same split whenever the class
+        #    has enough distinct originals for whole groups to approximate the proportions
+        groups = {}
+        for item in planned:
+            groups.setdefault(item[0], []).append(item)
+        quota = dict(zip(SPLITS, _split_counts(len(planned), val_size, test_size)))
+        if len(groups) >= min_groups(val_size, test_size):
+            # Largest groups first, each to the split furthest below its quota
+            group_order = sorted(rng.sample(sorted(groups), len(groups)), key=lambda g: -len(groups[g]))
+            assigned = dict.fromkeys(SPLITS, 0)
+            for source in group_order:
+                split = max(SPLITS, key=lambda s: quota[s] - assigned[s])
+                assigned[split] += len(groups[source])
+                for _, name, mirror, rotation in groups[source]:
+                    tasks.append((split, label, os.path.join(folder, source), name, mirror, rotation))
+        else:
+            rng.shuffle(planned)
+            for position, (source, name, mirror, rotation) in enumerate(planned):
+                split = ("train" if position < quota["train"] else
+                         "val" if position < quota["train"] + quota["val"] else "test")
+                tasks.append((split, label, os.path.join(folder, source), name, mirror, rotation))
+    return tasks
+
+
+def process_image(source, target, size=100, mirror=False, rotation=0):
+    """
+    Converts an image to grayscale, optionally mirrors/rotates it, resizes it and
+    saves it as JPEG (whatever the extension of `target`, as the notebook did).
+    """
+    with Image.open(source) as image:
+        image = image.convert("L")
+        if mirror:
+            image = ImageOps.mirror(image)
+        if rotation:
+            image = image.rotate(rotation)
+        image = image.resize((size, size))
+        tmp_path = target + ".part"
+        image.save(tmp_path, format="JPEG")
+    os.replace(tmp_path, target)
+
+
+def _run_task(args):
+    source, target, size, mirror, rotation = args
+    try:
+        process_image(source, target, size, mirror, rotation)
+        return None
+    except Exception as e:
+        return f"{source}: {e}"
+
+
+def _plan_fingerprint(tasks, settings, data_dir):
+    # Sources are hashed relative to the dataset, so moving or remounting it keeps the plan
+    digest = hashlib.sha256(json.dumps(settings, sort_keys=True).encode())
+    for split, label, source, *rest in tasks:
+        digest.update(repr((split, label, os.path.relpath(source, data_dir).replace(os.sep, "/"), *rest)).encode())
+    return digest.hexdigest()
+
+
+def prepare_dataset(data_dir, output_dir, target_count=25, size=100, val_size=0.15, test_size=0.15,
+                    seed=42, workers=None, force=False, dedup_radius=None, log=print):
+    """
+    Plans and writes the balanced splits; returns a summary dict. See the module docstring.
+    With `dedup_radius`, near-duplicate raw images are pruned (per class) before planning.
+    """
+    settings = {"target_count": target_count, "size": size, "val_size": val_size, "test_size": test_size,
+                "seed": seed, "dedup_radius": dedup_radius}
+    exclude = set()
+    if dedup_radius is not None:
+        exclude = find_duplicate_sources(data_dir, dedup_radius, workers)
+        log(f"Pruned {len(exclude)} near-duplicate source images (radius {dedup_radius})")
+    tasks = plan_dataset(data_dir, target_count, val_size, test_size, seed, exclude)
+    fingerprint = _plan_fingerprint(tasks, settings, data_dir)
+
+    plan_path = os.path.join(output_dir, "prepare_plan.json")
+    if os.path.exists(plan_path):
+        with open(plan_path) as f:
+            previous = json.load(f)
+        if previous.get("fingerprint") != fingerprint:
+            if not force:
+                raise RuntimeError(f"{output_dir} was prepared with different settings or source files; "
+                                   "use --force to discard it")
+            for split in SPLITS:
+                shutil.rmtree(os.path.join(output_dir, split), ignore_errors=True)
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(plan_path, "w") as f:
+        json.dump({"fingerprint": fingerprint, "settings": settings, "images": len(tasks)}, f, indent=2)
+
+    # Resume: everything that was fully written by an earlier run is skipped
+    pending = []
+    for split, label, source, name, mirror, rotation in tasks:
+        target = os.path.join(output_dir, split, label, name)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            pending.append((source, target, size, mirror, rotation))
+    log(f"{len(tasks)} images planned, {len(tasks) - len(pending)} already done, {len(pending)} to write")
+
+    errors = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers) as pool:
+        for done, error in enumerate(pool.map(_run_task, pending, chunksize=16), start=1):
+            if error:
+                errors.append(error)
+            if done % REPORT_EVERY == 0:
+                log(f"  {done}/{len(pending)} images ({done / (time.perf_counter() - start):.0f} images/s)")
+    elapsed = time.perf_counter() - start
+
+    for error in errors:
+        log(f"Error processing {error}")
+    summary = {
+        "planned": len(tasks),
+        "duplicates_pruned": len(exclude),
+        "written": len(pending) - len(errors),
+        "skipped": len(tasks) - len(pending),
+        "errors": len(errors),
+        "seconds": elapsed,
+        "images_per_second": len(pending) / elapsed if elapsed and pending else 0.0,
+        "splits": {split: sum(task[0] == split for task in tasks) for split in SPLITS},
+    }
+    log(f"Wrote {summary['written']} images in {elapsed:.1f}s ({summary['images_per_second']:.0f} images/s); "
+        + ", ".join(f"{split}: {count}" for split, count in summary["splits"].items()))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Balance the raw dataset and write reproducible train/val/test splits.")
+    parser.add_argument("data_dir", help="raw dataset, <dir>/<label>/<image>")
+    parser.add_argument("output_dir", help="receives <output>/{train,val,test}/<label>/<image>")
+    parser.add_argument("--target-count", type=int, default=25, help="images per class (default: %(default)s)")
+    parser.add_argument("--size", type=int, default=100, help="output width and height (default: %(default)s)")
+    parser.add_argument("--val-size", type=float, default=0.15)
+    parser.add_argument("--test-size", type=float, default=0.15)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="discard output prepared with other settings")
+    parser.add_argument("--dedup-radius", type=int, default=None,
+                        help="prune near-duplicate source images within this Hamming distance (e.g. 4)")
+    args = parser.parse_args()
+
+    prepare_dataset(args.data_dir, args.output_dir, args.target_count, args.size, args.val_size,
+                    args.test_size, args.seed, args.workers, args.force, args.dedup_radius)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Image preprocessing shared by the Translator page, the export tooling and offline scripts.
+
+Everything here matches the notebook's training-time preprocessing,
+`load_img(path, target_size=(299, 299))` followed by `img_to_array(img) / 255.0`,
+but only needs Pillow and NumPy.
+
+Serving uses the fast path (`draft=True`): a large JPEG, e.g. a 12-megapixel phone
+photo, is decoded by libjpeg at 1/2, 1/4 or 1/8 scale, the smallest that is still at
+least 299x299, instead of fully decoding it only to throw almost every pixel away.
+That is several times faster and needs a fraction of the memory. The reduced decode
+averages 8x8 blocks where the full decode + nearest-neighbour resize picks single
+pixels, so the fast path is not bit-identical for such images; images already at the
+model's size (like the training crops) decode exactly as before.
+
+Every decode first checks the file size and the pixel count from the image header
+against `MAX_IMAGE_BYTES` / `MAX_IMAGE_PIXELS`, so a decompression bomb is rejected
+with `ImageTooLargeError` before any pixel memory is allocated.
+"""
+
+import io
+import os
+
+import numpy as np
+from PIL import Image
+
+# Input shape expected by the trained InceptionV3 model (height, width, channels)
+MODEL_INPUT_SHAPE = (299, 299, 3)
+
+IMAGE_EXTENSIONS = ('.jpg', '.png', '.jpeg')
+
+# Largest accepted encoded image, and largest decoded image (a 50-megapixel phone photo fits)
+MAX_IMAGE_BYTES = 20 * 2 ** 20
+MAX_IMAGE_PIXELS = 64_000_000
+
+
+class ImageTooLargeError(ValueError):
+    """The image file or its decoded size exceeds the configured limits."""
+
+
+def _source_size(img_source):
+    if isinstance(img_source, memoryview):
+        return img_source.nbytes
+    if isinstance(img_source, (bytes, bytearray)):
+        return len(img_source)
+    if hasattr(img_source, "seek"):
+        position = img_source.tell()
+        size = img_source.seek(0, os.SEEK_END) - position
+        img_source.seek(position)
+        return size
+    return os.path.getsize(img_source)
+
+
+def open_image(img_source, max_bytes=MAX_IMAGE_BYTES, max_pixels=MAX_IMAGE_PIXELS):
+    """
+    Opens an image (path, file-like or bytes-like) lazily, after checking its file size
+    and header dimensions against the limits; only the header has been read on return.
+    """
+    size = _source_size(img_source)
+    if size > max_bytes:
+        raise ImageTooLargeError(f"Image file is {size / 2 ** 20:.1f} MB, the limit is {max_bytes / 2 ** 20:.0f} MB")
+    if isinstance(img_source, (bytes, bytearray, memoryview)):
+        img_source = io.BytesIO(img_source)
+    img = Image.open(img_source)
+    width, height = img.size
+    if width * height > max_pixels:
+        img.close()
+        raise ImageTooLargeError(f"Image is {width}x{height} pixels, the limit is {max_pixels / 1e6:.0f} megapixels")
+    return img
+
+
+def read_image_bytes(img_source):
+    """Returns the encoded bytes of a path, file-like object or bytes-like image source."""
+    if isinstance(img_source, (bytes, bytearray, memoryview)):
+        return bytes(img_source)
+    if hasattr(img_source, "read"):
+        return img_source.read()
+    with open(img_source, "rb") as f:
+        return f.read()
+
+
+def load_resized(img_source, input_shape=MODEL_INPUT_SHAPE, draft=False):
+    """
+    Decodes an image to a uint8 RGB array of `input_shape`, before normalization.
+
+    `img_source` may be a file path, a file-like object, or raw encoded bytes
+    (`bytes`, `bytearray` or `memoryview`, e.g. `uploaded_file.getbuffer()`).
+    In-memory sources are decoded directly, without writing anything to disk.
+    Matches Keras' `load_img(..., target_size=(299, 299))` (RGB, nearest-neighbour
+    resize) without needing TensorFlow to be imported. With `draft`, large JPEGs
+    use the reduced-resolution decode described in the module docstring.
+    """
+    target_size = input_shape[1], input_shape[0]
+    with open_image(img_source) as img:
+        if draft:
+            # No-op unless the JPEG is at least twice the target size in both dimensions
+            img.draft("RGB", target_size)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        if img.size != target_size:
+            img = img.resize(target_size, Image.NEAREST)
+        return np.asarray(img, dtype=np.uint8)
+
+
+def preprocess_image(img_source, input_shape=MODEL_INPUT_SHAPE, draft=False, out=None):
+    """
+    Loads an image as a normalized float32 array of `input_shape` (299x299x3 by default),
+    i.e. `load_resized(img_source) / 255`. Accepts the same sources as `load_resized`.
+    `out` is an optional preallocated float32 array (e.g. one row of a batch) to write
+    into instead of allocating a new one.
+    """
+    return np.divide(load_resized(img_source, input_shape, draft), np.float32(255.0), out=out, dtype=np.float32)
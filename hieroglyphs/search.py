@@ -0,0 +1,150 @@
+"""
+Indexed, typo-tolerant search over the sign catalogue and the page galleries.
+
+`SearchIndex` is built once from `SearchEntry` documents and answers a query
+without scanning them:
+
+- an inverted index maps every token to the entries (and weighted fields) it
+  occurs in,
+- a sorted vocabulary answers prefix matches ("tut" -> "tutankhamun") by bisection,
+- a trigram index over the vocabulary proposes candidates for misspelled tokens
+  ("ramsis" -> "ramses"), scored by trigram overlap.
+
+Every query token must match each returned entry. Entries are ranked by the sum
+of the best match per query token: exact > prefix > fuzzy, scaled by the field
+the match came from (a Gardiner code or name counts more than the meaning text).
+The work per query depends on the vocabulary touched by the query, not on the
+number of entries, so it stays well under a millisecond for thousands of signs.
+"""
+
+import bisect
+import heapq
+import re
+import unicodedata
+from collections import namedtuple
+
+from hieroglyphs.catalogue import code_to_info, gardiner_categories
+
+SearchEntry = namedtuple("SearchEntry", ["kind", "key", "fields"])
+
+# Relative importance of a match in each field
+FIELD_WEIGHTS = {"code": 3.0, "name": 2.0, "phonetic": 2.0, "category": 1.0, "meaning": 0.5}
+
+EXACT_MATCH, PREFIX_MATCH, FUZZY_MATCH = 1.0, 0.7, 0.5
+
+# Minimum trigram (Dice) similarity for a vocabulary token to count as a typo of the query token
+MIN_FUZZY_SIMILARITY = 0.4
+
+# Cap on the typo candidates kept per query token, most similar first
+MAX_FUZZY_EXPANSIONS = 64
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_PHONETIC_RE = re.compile(r"\*([^*]+)\*")
+
+
+def tokenize(text):
+    """Lower-cases, strips accents and splits text into alphanumeric tokens."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return _TOKEN_RE.findall(text.encode("ascii", "ignore").decode())
+
+
+def _trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Inverted, prefix and trigram index over a list of `SearchEntry` documents."""
+
+    def __init__(self, entries, field_weights=FIELD_WEIGHTS):
+        self.entries = list(entries)
+        self._postings = {}  # token -> {entry index: best field weight}
+        for doc_id, entry in enumerate(self.entries):
+            for field, text in entry.fields.items():
+                weight = field_weights.get(field, 1.0)
+                for token in tokenize(text):
+                    postings = self._postings.setdefault(token, {})
+                    postings[doc_id] = max(postings.get(doc_id, 0.0), weight)
+
+        self._vocabulary = sorted(self._postings)
+        self._token_trigrams = {token: _trigrams(token) for token in self._vocabulary}
+        self._trigram_tokens = {}
+        for token, grams in self._token_trigrams.items():
+            for gram in grams:
+                self._trigram_tokens.setdefault(gram, []).append(token)
+
+    def _expand(self, token):
+        """Returns `{vocabulary token: match factor}` for one query token."""
+        matches = {}
+        if token in self._postings:
+            matches[token] = EXACT_MATCH
+
+        # Every token with the prefix: they sort between `token` and its successor string
+        start = bisect.bisect_left(self._vocabulary, token)
+        end = bisect.bisect_left(self._vocabulary, token[:-1] + chr(ord(token[-1]) + 1), start)
+        for candidate in self._vocabulary[start:end]:
+            matches.setdefault(candidate, PREFIX_MATCH)
+
+        # Typo tolerance only kicks in for tokens that match nothing as typed
+        if not matches and len(token) >= 3:
+            grams = _trigrams(token)
+            shared = {}
+            for gram in grams:
+                for candidate in self._trigram_tokens.get(gram, ()):
+                    shared[candidate] = shared.get(candidate, 0) + 1
+            for candidate, count in shared.items():
+                similarity = 2 * count / (len(grams) + len(self._token_trigrams[candidate]))
+                if similarity >= MIN_FUZZY_SIMILARITY:
+                    matches[candidate] = FUZZY_MATCH * similarity
+            if len(matches) > MAX_FUZZY_EXPANSIONS:
+                matches = dict(heapq.nlargest(MAX_FUZZY_EXPANSIONS, matches.items(), key=lambda item: item[1]))
+        return matches
+
+    def search(self, query, kind=None, limit=None):
+        """
+        Returns the `(entry, score)` pairs matching every token of `query`, best first.
+        `kind` restricts the results to one kind of entry (e.g. "sign" or "pharaoh").
+        """
+        scores = None
+        for token in tokenize(query):
+            token_scores = {}
+            for candidate, factor in self._expand(token).items():
+                for doc_id, weight in self._postings[candidate].items():
+                    score = factor * weight
+                    if score > token_scores.get(doc_id, 0.0):
+                        token_scores[doc_id] = score
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {doc_id: scores[doc_id] + s for doc_id, s in token_scores.items() if doc_id in scores}
+            if not scores:
+                return []
+        if scores is None:
+            return []
+
+        if kind is not None:
+            scores = {doc_id: score for doc_id, score in scores.items() if self.entries[doc_id].kind == kind}
+        # Best score first; ties keep the order the entries were indexed in
+        ranked = heapq.nsmallest(limit, scores, key=lambda doc_id: (-scores[doc_id], doc_id)) if limit \
+            else sorted(scores, key=lambda doc_id: (-scores[doc_id], doc_id))
+        return [(self.entries[doc_id], scores[doc_id]) for doc_id in ranked]
+
+
+def catalogue_entries():
+    """One "sign" entry per catalogue code: code, name, meaning, phonetic values and category."""
+    entries = []
+    for code, (name, meaning) in code_to_info.items():
+        entries.append(SearchEntry("sign", code, {
+            "code": code,
+            "name": name,
+            "meaning": meaning,
+            # Phonetic values are written in italics in the catalogue, e.g. "a phonetic sign for *b*"
+            "phonetic": " ".join(_PHONETIC_RE.findall(meaning)),
+            "category": gardiner_categories.get("".join(filter(str.isalpha, code)), ""),
+        }))
+    return entries
+
+
+def gallery_entries(kind, items):
+    """Entries for a page gallery given as `{title: (image path, description)}`."""
+    return [SearchEntry(kind, title, {"name": title, "meaning": desc}) for title, (_, desc) in items.items()]
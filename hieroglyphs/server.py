@@ -0,0 +1,294 @@
+"""
+Standalone HTTP inference server with dynamic request batching.
+
+Concurrent requests are queued and fused into one forward pass of up to
+`max_batch_size` images. The batcher waits at most `max_wait_ms` after the
+first queued image for others to join, so a lone request pays at most that
+much extra latency while a burst is served in a handful of model calls.
+
+Endpoints:
+    POST /predict?k=3   body: the encoded image bytes (JPEG/PNG)
+                        -> {"predictions": [{"code", "name", "desc", "confidence"}, ...]}
+    GET  /health        -> {"status": "ok", "model": ...}
+    GET  /metrics       -> throughput, queue depth, batch sizes and cache counters
+
+The Streamlit page uses the server instead of its in-process model when
+`HIEROGLYPH_INFERENCE_URL` is set (e.g. `http://127.0.0.1:8502`), so the model
+tier can be scaled separately from the UI tier.
+
+Usage:
+    python -m hieroglyphs.server [--port 8502] [--max-batch-size 32] [--max-wait-ms 10]
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from hieroglyphs.catalogue import NUM_CLASSES
+from hieroglyphs.inference import (
+    DEFAULT_MODEL_NAME,
+    PREDICTION_CACHE_SIZE,
+    TOP_K,
+    PredictionCache,
+    calibrate,
+    load_serving_model,
+    load_temperature,
+    top_k_predictions,
+)
+from hieroglyphs.preprocessing import MAX_IMAGE_BYTES, MODEL_INPUT_SHAPE, preprocess_image
+
+# Largest accepted request body
+MAX_UPLOAD_BYTES = MAX_IMAGE_BYTES
+
+
+class DynamicBatcher:
+    """Fuses concurrently submitted images into batched forward passes on one worker thread."""
+
+    def __init__(self, model, max_batch_size=32, max_wait_ms=10):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self._images = 0
+        self._batches = 0
+        self._batch_sizes = {}
+        threading.Thread(target=self._run, name="dynamic-batcher", daemon=True).start()
+
+    def submit(self, image_array):
+        """Queues one preprocessed image; the returned Future resolves to its softmax vector."""
+        future = Future()
+        self._queue.put((image_array, future))
+        return future
+
+    def _collect(self):
+        # Block for the first item, then top the batch up until it is full or the wait expires
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                probs = self.model.predict(np.stack([image for image, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), row in zip(batch, probs):
+                future.set_result(row)
+
+            with self._lock:
+                self._images += len(batch)
+                self._batches += 1
+                self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+
+    def metrics(self):
+        with self._lock:
+            uptime = time.monotonic() - self._started_at
+            return {
+                "uptime_seconds": uptime,
+                "queue_depth": self._queue.qsize(),
+                "images": self._images,
+                "batches": self._batches,
+                "mean_batch_size": self._images / self._batches if self._batches else 0.0,
+                "images_per_second": self._images / uptime if uptime else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+
+class InferenceService:
+    """Decoding, caching, batching and label resolution behind the HTTP handler."""
+
+    def __init__(self, model, batcher, temperature=1.0, cache=None, model_name=DEFAULT_MODEL_NAME):
+        self.model = model
+        self.batcher = batcher
+        self.temperature = temperature
+        self.cache = cache or PredictionCache()
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._latency_total = 0.0
+
+    def predict(self, data, k=TOP_K):
+        """Returns the top-k `(code, name, desc, confidence)` tuples for encoded image bytes."""
+        start = time.perf_counter()
+        try:
+            key = PredictionCache.key_for(data)
+            cached = self.cache.get(key)
+            if cached is not None:
+                probs = cached[0]
+            else:
+                # Decoding happens on the request thread, so it runs in parallel across requests
+                probs = self.batcher.submit(preprocess_image(data, draft=True)).result()
+                self.cache.put(key, probs, top_k_predictions(calibrate(probs, self.temperature), k=1)[0])
+            return top_k_predictions(calibrate(probs, self.temperature), k)
+        except Exception:
+            with self._lock:
+                self._errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._requests += 1
+                self._latency_total += time.perf_counter() - start
+
+    def metrics(self):
+        with self._lock:
+            requests = {
+                "requests": self._requests,
+                "errors": self._errors,
+                "mean_latency_ms": self._latency_total / self._requests * 1000 if self._requests else 0.0,
+            }
+        metrics = {"model": self.model_name, **requests, **self.batcher.metrics(), "cache": self.cache.stats()}
+        if self.model.name == "cascade":
+            metrics["cascade"] = self.model.stats()
+        return metrics
+
+
+def make_handler(service):
+    class InferenceHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == "/health":
+                self._send_json(200, {"status": "ok", "model": service.model_name})
+            elif path == "/metrics":
+                self._send_json(200, service.metrics())
+            else:
+                self._send_json(404, {"error": f"Unknown endpoint {path}"})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != "/predict":
+                self._send_json(404, {"error": f"Unknown endpoint {url.path}"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+            except ValueError:
+                length = None
+            if length is None or not 0 < length <= MAX_UPLOAD_BYTES:
+                too_large = length is not None and length > MAX_UPLOAD_BYTES
+                self._send_json(413 if too_large else 400, {"error": f"Expected an image body of at most {MAX_UPLOAD_BYTES // 2 ** 20} MB"})
+                return
+            try:
+                k = int(parse_qs(url.query).get("k", [TOP_K])[0])
+            except ValueError:
+                k = None
+            if k is None or not 1 <= k <= NUM_CLASSES:
+                self._send_json(400, {"error": f"k must be an integer between 1 and {NUM_CLASSES}"})
+                return
+            try:
+                candidates = service.predict(self.rfile.read(length), k)
+            except Exception as e:
+                self._send_json(422, {"error": str(e)})
+                return
+            self._send_json(200, {"predictions": [
+                {"code": code, "name": name, "desc": desc, "confidence": confidence}
+                for code, name, desc, confidence in candidates
+            ]})
+
+        def log_message(self, format, *args):
+            # Per-request access logs would dominate the output under load; /metrics has the numbers
+            pass
+
+    return InferenceHandler
+
+
+class InferenceHTTPServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 resets connections during exactly the bursts the batcher is for
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class InferenceClient:
+    """Minimal client for the server, used by the Translator page."""
+
+    def __init__(self, url, timeout=60):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def predict_top_k(self, data, k=TOP_K):
+        """Returns the top-k `(code, name, desc, confidence)` tuples for encoded image bytes."""
+        request = urllib.request.Request(
+            f"{self.url}/predict?k={k}", data=bytes(data), headers={"Content-Type": "application/octet-stream"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.load(response)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.load(e).get("error", str(e))
+            except ValueError:
+                message = str(e)
+            raise RuntimeError(message) from e
+        return [(p["code"], p["name"], p["desc"], p["confidence"]) for p in payload["predictions"]]
+
+    def health(self):
+        with urllib.request.urlopen(f"{self.url}/health", timeout=self.timeout) as response:
+            return json.load(response)
+
+    def metrics(self):
+        with urllib.request.urlopen(f"{self.url}/metrics", timeout=self.timeout) as response:
+            return json.load(response)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve hieroglyph predictions over HTTP with dynamic batching.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--model", default=os.environ.get("HIEROGLYPH_MODEL_NAME", DEFAULT_MODEL_NAME))
+    parser.add_argument("--version", default=os.environ.get("HIEROGLYPH_MODEL_VERSION"))
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--cache-size", type=int, default=PREDICTION_CACHE_SIZE)
+    parser.add_argument("--cache-dir", default=os.environ.get("HIEROGLYPH_PREDICTION_CACHE_DIR"))
+    args = parser.parse_args()
+
+    model = load_serving_model(args.model, args.version)
+    model.predict(np.zeros((1, *MODEL_INPUT_SHAPE), dtype=np.float32))  # warm-up
+
+    cache_dir = os.path.join(args.cache_dir, args.model, args.version or "default") if args.cache_dir else None
+    service = InferenceService(
+        model,
+        DynamicBatcher(model, args.max_batch_size, args.max_wait_ms),
+        temperature=load_temperature(args.model, args.version),
+        cache=PredictionCache(args.cache_size, cache_dir),
+        model_name=args.model,
+    )
+    server = InferenceHTTPServer((args.host, args.port), make_handler(service))
+    print(f"Serving {args.model} on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Preprocessed dataset cache: decoded, resized, label-encoded samples in
+memory-mappable `.npy` shards.
+
+`build_cache(split_dir, cache_dir)` decodes every image of a
+`<split>/<label>/<image>` directory once (with `preprocessing.load_resized`,
+the serving path's decoder) into uint8 shards of `shard_size` images:
+
+    <cache_dir>/manifest.json
+    <cache_dir>/shard-00000.npy    (n, 299, 299, 3) uint8
+    <cache_dir>/shard-00001.npy
+    ...
+
+The manifest keys samples by the SHA-256 of their source file. Rebuilding after
+the split changed only decodes files whose content is new; unchanged files
+(even if renamed or moved to another class) reuse their shard rows, and shards
+no sample references any more are deleted. Files whose size and mtime match the
+manifest are not even re-hashed.
+
+`ShardedSplit` reads a cache back: `files`, `labels` and `classes` in the
+order `list_split` returns them, random access to images through memory-mapped
+shards, and `dataset()` to feed the `hieroglyphs.training` pipeline.
+
+Usage:
+    python -m hieroglyphs.shards build train cache/train
+    python -m hieroglyphs.shards info cache/train
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from hieroglyphs.preprocessing import MODEL_INPUT_SHAPE, load_resized
+from hieroglyphs.training import list_classes, list_split
+
+# Cache format understood by this module
+CACHE_VERSION = 1
+
+# Images per shard: about 270 MB of uint8 299x299x3 images
+SHARD_SIZE = 1024
+
+
+def _sha256_of_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(cache_dir):
+    """Returns the manifest of a cache directory, or None if there is no usable cache."""
+    try:
+        with open(os.path.join(cache_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("version") == CACHE_VERSION else None
+
+
+def _save_manifest(cache_dir, manifest):
+    path = os.path.join(cache_dir, "manifest.json")
+    with open(path + ".part", "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".part", path)
+
+
+def build_cache(split_dir, cache_dir, shard_size=SHARD_SIZE, input_shape=MODEL_INPUT_SHAPE, workers=None):
+    """
+    Creates or incrementally updates the shard cache of a split directory.
+    Returns `(manifest, stats)`, with the number of images decoded and reused.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    previous = load_manifest(cache_dir)
+    if previous is not None and previous["input_shape"] != list(input_shape):
+        for name in previous["shards"]:
+            os.remove(os.path.join(cache_dir, name))
+        previous = None
+    previous_files = previous["files"] if previous else {}
+    shards = previous["shards"] if previous else {}
+
+    # 1. Hash the sources, trusting the previous hash when size and mtime are unchanged
+    classes = list_classes(split_dir)
+    paths, labels = list_split(split_dir)
+    files = {}
+    for path, label in zip(paths, labels):
+        key = os.path.relpath(path, split_dir).replace(os.sep, "/")
+        stat = os.stat(path)
+        old = previous_files.get(key)
+        if old and old["size"] == stat.st_size and old["mtime_ns"] == stat.st_mtime_ns:
+            sha256 = old["sha256"]
+        else:
+            sha256 = _sha256_of_file(path)
+        files[key] = {"sha256": sha256, "label": int(label), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    # 2. Decode only the content that is not in a shard yet, one new shard at a time
+    stored = {sha256 for shard in shards.values() for sha256 in shard}
+    missing = {}
+    for key, entry in files.items():
+        if entry["sha256"] not in stored:
+            missing.setdefault(entry["sha256"], os.path.join(split_dir, key))
+    missing = list(missing.items())
+
+    next_index = max((int(name[6:11]) for name in shards), default=-1) + 1
+    with ThreadPoolExecutor(workers) as pool:
+        for start in range(0, len(missing), shard_size):
+            chunk = missing[start:start + shard_size]
+            name = f"shard-{next_index:05d}.npy"
+            next_index += 1
+            tmp_path = os.path.join(cache_dir, name + ".part")
+            images = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint8, shape=(len(chunk), *input_shape))
+            for row, image in enumerate(pool.map(lambda item: load_resized(item[1], input_shape), chunk)):
+                images[row] = image
+            images.flush()
+            del images
+            os.replace(tmp_path, os.path.join(cache_dir, name))
+            shards[name] = [sha256 for sha256, _ in chunk]
+
+    # 3. Drop shards nothing refers to any more
+    referenced = {entry["sha256"] for entry in files.values()}
+    for name in [name for name, hashes in shards.items() if not referenced.intersection(hashes)]:
+        os.remove(os.path.join(cache_dir, name))
+        del shards[name]
+
+    manifest = {
+        "version": CACHE_VERSION,
+        "input_shape": list(input_shape),
+        "classes": classes,
+        "shards": shards,
+        "files": files,
+    }
+    _save_manifest(cache_dir, manifest)
+    stats = {
+        "images": len(files),
+        "decoded": len(missing),
+        "reused": sum(entry["sha256"] in stored for entry in files.values()),
+    }
+    return manifest, stats
+
+
+class ShardedSplit:
+    """Read side of a shard cache; samples are in `list_split` order."""
+
+    def __init__(self, cache_dir):
+        manifest = load_manifest(cache_dir)
+        if manifest is None:
+            raise FileNotFoundError(f"No dataset cache in {cache_dir}; run `python -m hieroglyphs.shards build` first")
+        self.cache_dir = cache_dir
+        self.classes = manifest["classes"]
+        self.input_shape = tuple(manifest["input_shape"])
+
+        location = {}
+        self._shards = []
+        for shard_id, (name, hashes) in enumerate(sorted(manifest["shards"].items())):
+            self._shards.append(name)
+            for row, sha256 in enumerate(hashes):
+                location[sha256] = (shard_id, row)
+
+        # Source files relative to the split directory, e.g. "A1/0.jpg"
+        self.files = list(manifest["files"])
+        # Identifies the samples (content, label and order), e.g. to key caches derived from this split
+        digest = hashlib.sha256(json.dumps(manifest["input_shape"]).encode())
+        for entry in manifest["files"].values():
+            digest.update(f"{entry['sha256']}:{entry['label']}\n".encode())
+        self.fingerprint = digest.hexdigest()
+        self.labels = np.array([entry["label"] for entry in manifest["files"].values()], dtype=np.int64)
+        self.locations = np.array([location[entry["sha256"]] for entry in manifest["files"].values()],
+                                  dtype=np.int64).reshape(-1, 2)
+        self._mapped = {}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def _shard(self, shard_id):
+        if shard_id not in self._mapped:
+            self._mapped[shard_id] = np.load(os.path.join(self.cache_dir, self._shards[shard_id]), mmap_mode="r")
+        return self._mapped[shard_id]
+
+    def __getitem__(self, index):
+        """Returns the uint8 image of sample `index`."""
+        shard_id, row = self.locations[index]
+        return self._shard(shard_id)[row]
+
+    def _order(self, shuffle, rng):
+        # Shuffled epochs visit shards in random order and rows in random order within each,
+        # so reads stay local to one memory-mapped file at a time
+        if not shuffle:
+            return np.arange(len(self))
+        groups = [np.flatnonzero(self.locations[:, 0] == shard_id) for shard_id in range(len(self._shards))]
+        rng.shuffle(groups)
+        return np.concatenate([rng.permutation(group) for group in groups] or [np.arange(0)])
+
+    def dataset(self, batch_size=32, training=False, augment=False, shuffle_buffer=256, seed=None, targets=None):
+        """
+        Returns the same `(images, one_hot_labels)` pipeline as `training.make_dataset`, read from the shards.
+        `targets` is an optional `(n, d)` float array of per-sample target vectors (e.g. distillation
+        soft labels, see `hieroglyphs.distill`) to yield instead of the one-hot labels.
+        """
+        import tensorflow as tf
+
+        from hieroglyphs.training import batch_and_augment
+
+        rng = np.random.default_rng(seed)
+        if targets is not None:
+            targets = np.asarray(targets, dtype=np.float32)
+
+        def samples():
+            for index in self._order(training, rng):
+                yield self[index], self.labels[index] if targets is None else targets[index]
+
+        dataset = tf.data.Dataset.from_generator(samples, output_signature=(
+            tf.TensorSpec(self.input_shape, tf.uint8),
+            tf.TensorSpec((), tf.int64) if targets is None else tf.TensorSpec(targets.shape[1:], tf.float32),
+        ))
+        if training:
+            dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+        return batch_and_augment(dataset, len(self.classes), batch_size, training, augment, seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and inspect preprocessed dataset shard caches.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_cmd = commands.add_parser("build", help="create or incrementally update the cache of a split")
+    build_cmd.add_argument("split_dir", help="<split>/<label>/<image> directory")
+    build_cmd.add_argument("cache_dir")
+    build_cmd.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    build_cmd.add_argument("--workers", type=int, default=None)
+
+    info_cmd = commands.add_parser("info", help="summarize a cache")
+    info_cmd.add_argument("cache_dir")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        manifest, stats = build_cache(args.split_dir, args.cache_dir, args.shard_size, workers=args.workers)
+        elapsed = time.perf_counter() - start
+        print(f"{stats['images']} images in {len(manifest['shards'])} shards: "
+              f"{stats['decoded']} decoded, {stats['reused']} reused ({elapsed:.1f}s)")
+
+    elif args.command == "info":
+        split = ShardedSplit(args.cache_dir)
+        counts = np.bincount(split.labels, minlength=len(split.classes))
+        print(f"{len(split)} images, {len(split.classes)} classes, {len(split._shards)} shards, "
+              f"input shape {split.input_shape}")
+        for class_name, count in zip(split.classes, counts):
+            print(f"  {class_name:<8}{count:>6}")
+
+
+if __name__ == "__main__":
+    main()
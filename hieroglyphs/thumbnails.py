@@ -0,0 +1,78 @@
+"""
+Shared cache of display-sized, JPEG-encoded thumbnails for the gallery assets.
+
+Each asset is decoded once (using JPEG draft mode, so large photos are decoded
+at reduced resolution), downsampled to the display width and re-encoded. The
+encoded bytes are kept in an LRU bounded by total size and are invalidated when
+the source file's modification time or size changes.
+"""
+
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+# Width the gallery columns are rendered at (3 columns in the wide layout, with headroom for HiDPI)
+THUMBNAIL_WIDTH = 480
+
+# Upper bound on the total size of the encoded thumbnails kept in memory
+THUMBNAIL_CACHE_BYTES = 16 * 2 ** 20
+
+
+def render_thumbnail(path, width=THUMBNAIL_WIDTH, quality=85):
+    """Decodes an image, downsizes it to at most `width` pixels wide and returns it as JPEG bytes."""
+    with Image.open(path) as img:
+        # Let the JPEG decoder skip detail we are about to throw away
+        img.draft("RGB", (width, width))
+        img = img.convert("RGB")
+        if img.width > width:
+            img.thumbnail((width, img.height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=quality, optimize=True)
+        return buffer.getvalue()
+
+
+class ThumbnailCache:
+    """Size-bounded LRU of encoded thumbnails keyed by `(path, width)` and validated by mtime."""
+
+    def __init__(self, max_bytes=THUMBNAIL_CACHE_BYTES, width=THUMBNAIL_WIDTH, quality=85):
+        self.max_bytes = max_bytes
+        self.width = width
+        self.quality = quality
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """Returns the encoded JPEG thumbnail of `path`, decoding the file only if it changed."""
+        stat = os.stat(path)
+        key = (os.path.abspath(path), self.width)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        data = render_thumbnail(path, self.width, self.quality)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[1])
+            self._entries[key] = (stamp, data)
+            self._size += len(data)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+        return data
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "bytes": self._size}
@@ -0,0 +1,192 @@
+"""
+Streaming `tf.data` input pipeline for training and evaluating the classifiers.
+
+The notebook used to load every split with `load_img` in a Python loop and
+stack it into `X_train` / `X_val` / `X_test` float32 arrays, about 1 MB of RAM
+per image before training even started. `make_dataset` instead streams
+`(path, label)` pairs from disk:
+
+    shuffle paths -> parallel read + decode + resize -> [cache] -> batch
+    -> normalize + one-hot -> [augment] -> prefetch
+
+so memory is bounded by the shuffle buffer and a few batches in flight,
+whatever the dataset size. That makes it practical to train on the full,
+unbalanced dataset (`split_dataset` + `class_weights`) instead of the
+25-images-per-class downsample.
+
+Images are decoded with Pillow's IDCT, resized with nearest-neighbour
+interpolation and scaled to [0, 1], the preprocessing of
+`load_img(path, target_size=(299, 299))` / 255 and
+`hieroglyphs.preprocessing.preprocess_image` (on some downscales TensorFlow
+rounds a fraction of a percent of source-pixel picks differently).
+TensorFlow is only imported when a dataset is built.
+"""
+
+import os
+
+import numpy as np
+
+from hieroglyphs.preprocessing import IMAGE_EXTENSIONS, MODEL_INPUT_SHAPE
+
+# On-the-fly augmentation, the ranges of the notebook's ImageDataGenerator
+# (its shear_range=0.2 is in degrees, too small to be worth a layer)
+AUGMENTATION = {
+    "rotation": 20 / 360,
+    "translation": 0.2,
+    "zoom": 0.2,
+    "horizontal_flip": True,
+}
+
+
+def list_classes(split_dir):
+    """Returns the sorted class folder names of a `<split>/<label>/<image>` directory."""
+    return sorted(d for d in os.listdir(split_dir) if os.path.isdir(os.path.join(split_dir, d)))
+
+
+def list_split(split_dir):
+    """
+    Returns `(paths, labels)` for a `<split>/<label>/<image>` directory.
+    Labels are indices into the sorted folder names, the same encoding
+    `LabelEncoder` produced in the notebook.
+    """
+    paths, labels = [], []
+    for label, class_name in enumerate(list_classes(split_dir)):
+        folder = os.path.join(split_dir, class_name)
+        for image in sorted(os.listdir(folder)):
+            if image.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(folder, image))
+                labels.append(label)
+    return paths, np.array(labels)
+
+
+def split_dataset(data_dir, val_size=0.15, test_size=0.15, seed=42):
+    """
+    Splits a `<data>/<label>/<image>` directory into stratified train/val/test
+    `(paths, labels)` pairs without copying any files. Classes with too few
+    images to stratify keep them all in the training split, and a class with a
+    single held-out image puts it in the validation split.
+    """
+    from sklearn.model_selection import train_test_split
+
+    paths, labels = list_split(data_dir)
+    counts = np.bincount(labels)
+    rare = np.isin(labels, np.flatnonzero(counts < 3))
+    paths = np.array(paths)
+
+    train_paths, temp_paths, train_labels, temp_labels = train_test_split(
+        paths[~rare], labels[~rare], test_size=val_size + test_size, stratify=labels[~rare], random_state=seed
+    )
+    # Stratify val/test too; a lone held-out image of a class cannot be, and goes to val
+    single = np.isin(temp_labels, np.flatnonzero(np.bincount(temp_labels) < 2))
+    val_paths, test_paths, val_labels, test_labels = train_test_split(
+        temp_paths[~single], temp_labels[~single], test_size=test_size / (val_size + test_size),
+        stratify=temp_labels[~single], random_state=seed
+    )
+    val_paths = np.concatenate([val_paths, temp_paths[single]])
+    val_labels = np.concatenate([val_labels, temp_labels[single]])
+    train_paths = np.concatenate([train_paths, paths[rare]])
+    train_labels = np.concatenate([train_labels, labels[rare]])
+    return (
+        (train_paths.tolist(), train_labels),
+        (val_paths.tolist(), val_labels),
+        (test_paths.tolist(), test_labels),
+    )
+
+
+def class_weights(labels, n_classes=None):
+    """Balanced `class_weight` for `model.fit`, so an unbalanced split trains like a balanced one."""
+    counts = np.bincount(labels, minlength=n_classes or 0)
+    weights = len(labels) / (len(counts) * np.maximum(counts, 1))
+    return {label: float(weight) for label, weight in enumerate(weights)}
+
+
+def _decode(path, input_shape):
+    import tensorflow as tf
+
+    channels = input_shape[2]
+    contents = tf.io.read_file(path)
+    # INTEGER_ACCURATE is the IDCT Pillow uses, so JPEG pixels match the serving path exactly
+    image = tf.cond(
+        tf.io.is_jpeg(contents),
+        lambda: tf.io.decode_jpeg(contents, channels=channels, dct_method="INTEGER_ACCURATE"),
+        lambda: tf.io.decode_image(contents, channels=channels, expand_animations=False),
+    )
+    image.set_shape([None, None, channels])
+    image = tf.image.resize(image, input_shape[:2], method="nearest")
+    # Kept as uint8 until after caching: a quarter of the size of the float32 image
+    return tf.cast(image, tf.uint8)
+
+
+def augmentation_layers(options=AUGMENTATION, seed=None):
+    """Keras preprocessing layers applying `options` to a batch of images."""
+    import keras
+
+    layers = [
+        keras.layers.RandomRotation(options["rotation"], fill_mode="nearest", seed=seed),
+        keras.layers.RandomTranslation(options["translation"], options["translation"], fill_mode="nearest", seed=seed),
+        keras.layers.RandomZoom(options["zoom"], fill_mode="nearest", seed=seed),
+    ]
+    if options.get("horizontal_flip"):
+        layers.append(keras.layers.RandomFlip("horizontal", seed=seed))
+    return keras.Sequential(layers)
+
+
+def make_dataset(paths, labels, n_classes, batch_size=32, training=False, augment=False,
+                 cache=None, shuffle_buffer=2048, input_shape=MODEL_INPUT_SHAPE, seed=None):
+    """
+    Returns a batched `tf.data.Dataset` of `(images, one_hot_labels)`.
+
+    - `training`: reshuffle the file order every epoch and allow batches to be
+      assembled out of order for throughput. Otherwise the order is exactly
+      `paths`, so predictions line up with `labels`.
+    - `augment`: apply the notebook's random rotation/shift/zoom/flip per batch.
+    - `cache`: `None` to decode every epoch, a file path to cache the decoded,
+      resized images on disk after the first epoch, or `""` to cache them in RAM
+      (only sensible for small datasets).
+    """
+    import tensorflow as tf
+
+    autotune = tf.data.AUTOTUNE
+    dataset = tf.data.Dataset.from_tensor_slices((list(paths), np.asarray(labels, dtype=np.int32)))
+    if training and cache is None:
+        # Shuffling paths is cheap; with a cache the shuffle has to happen after it instead
+        dataset = dataset.shuffle(min(len(paths), shuffle_buffer), seed=seed, reshuffle_each_iteration=True)
+
+    dataset = dataset.map(
+        lambda path, label: (_decode(path, input_shape), label),
+        num_parallel_calls=autotune,
+        deterministic=not training,
+    )
+    if cache is not None:
+        dataset = dataset.cache(cache)
+        if training:
+            dataset = dataset.shuffle(min(len(paths), shuffle_buffer), seed=seed, reshuffle_each_iteration=True)
+
+    return batch_and_augment(dataset, n_classes, batch_size, training, augment, seed)
+
+
+def batch_and_augment(dataset, n_classes, batch_size=32, training=False, augment=False, seed=None):
+    """
+    The tail of the pipeline shared by every source of `(uint8 image, label)` samples:
+    batch -> normalize + one-hot -> [augment] -> prefetch.
+    Float labels are taken to be target vectors already (e.g. distillation soft labels)
+    and passed through as they are.
+    """
+    import tensorflow as tf
+
+    autotune = tf.data.AUTOTUNE
+    dataset = dataset.batch(batch_size, num_parallel_calls=autotune, deterministic=not training)
+
+    def to_inputs(images, batch_labels):
+        targets = tf.one_hot(batch_labels, n_classes) if batch_labels.dtype.is_integer else batch_labels
+        return tf.cast(images, tf.float32) / 255.0, targets
+
+    dataset = dataset.map(to_inputs, num_parallel_calls=autotune, deterministic=not training)
+    if augment:
+        layers = augmentation_layers(seed=seed)
+        dataset = dataset.map(
+            lambda images, batch_labels: (layers(images, training=True), batch_labels),
+            num_parallel_calls=autotune,
+            deterministic=not training,
+        )
+    return dataset.prefetch(autotune)
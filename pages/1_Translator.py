@@ -1,9 +1,24 @@
+import time
+
+# Wall-clock reference for the time-to-first-paint measurement below
+PAGE_START = time.perf_counter()
+
 import streamlit as st
 import numpy as np
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing.image import load_img, img_to_array
 import os
-import gdown
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from hieroglyphs.inference import (
+    DEFAULT_MODEL_NAME, PREDICTION_CACHE_SIZE, TOP_K,
+    PredictionCache, calibrate, load_serving_model, load_temperature, top_k_predictions,
+)
+from hieroglyphs.inscription import READING_DIRECTIONS, annotate, load_photo, read_inscription
+from hieroglyphs.preprocessing import MODEL_INPUT_SHAPE, preprocess_image, read_image_bytes
+from hieroglyphs.search import SearchIndex, catalogue_entries, gallery_entries
+from hieroglyphs.server import InferenceClient
+from hieroglyphs.assets import get_manifest
+from hieroglyphs.thumbnails import ThumbnailCache
 
 # ===============================================
 # 1. PAGE CONFIG & CSS STYLING
@@ -11,10 +26,13 @@ import gdown
 
 st.set_page_config(page_title="Egyptian Hieroglyphs Portal", layout="wide")
 
+# Assets are fingerprinted once per process; images are served from app/static/ when
+# static serving is enabled (see hieroglyphs.assets and .streamlit/config.toml)
+asset_manifest = get_manifest(publish=st.get_option("server.enableStaticServing"))
+
 # Function to load and inject CSS
 def load_css(file_name):
-    with open(file_name) as f:
-        st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+    st.markdown(f"<style>{asset_manifest.text(file_name)}</style>", unsafe_allow_html=True)
 
 # Load the custom CSS
 load_css("assets/css.css")
@@ -23,471 +41,324 @@ load_css("assets/css.css")
 # 2. MODEL LOADING (Your original code)
 # ===============================================
 
-# Use st.cache_resource to load the model only once
-@st.cache_resource
+# Model artifacts are resolved, downloaded and checksum-verified by hieroglyphs.artifacts.
+# HIEROGLYPH_MODEL_NAME selects a variant such as the quantized "InceptionV3-int8"
+# exported by hieroglyphs.export or the distilled "InceptionV3-student" (hieroglyphs.distill);
+# HIEROGLYPH_MODEL_VERSION pins a non-default version.
+MODEL_NAME = os.environ.get("HIEROGLYPH_MODEL_NAME", DEFAULT_MODEL_NAME)
+MODEL_VERSION = os.environ.get("HIEROGLYPH_MODEL_VERSION")
+
+# When set (e.g. http://127.0.0.1:8502), predictions come from the standalone
+# inference server (python -m hieroglyphs.server) instead of an in-process model
+INFERENCE_URL = os.environ.get("HIEROGLYPH_INFERENCE_URL")
+
 def get_model():
-    MODEL_DIR = "model"
-    MODEL_FILE = "InceptionV3_model.h5"
-    MODEL_PATH = os.path.join(MODEL_DIR, MODEL_FILE)
-    
-    if not os.path.exists(MODEL_PATH):
-        with st.spinner("Downloading AI model for the first time..."):
-            os.makedirs(MODEL_DIR, exist_ok=True)
-            url = "https://huggingface.co/sonic222/Egyptian-Hieroglyphs/resolve/main/InceptionV3_model.h5"
-            gdown.download(url, MODEL_PATH, quiet=False)
-    
-    model = load_model(MODEL_PATH)
+    """
+    Downloads the model on first use and loads it into a matching inference backend
+    (Keras for .h5, TFLite for .tflite; see hieroglyphs.backends).
+    TensorFlow is imported by the backend rather than at the top of the page,
+    so the page can render before the (slow) TensorFlow import has finished.
+    """
+    model = load_serving_model(MODEL_NAME, MODEL_VERSION)
     return model
 
-model = get_model()
+
+class ModelLoader:
+    """
+    Loads and warms up the model in a background thread.
+
+    Warm-up runs one dummy 299x299 prediction, so graph tracing and tensor
+    allocation happen here instead of on the first visitor's upload. `timings` records the load, warm-up and total
+    time-to-ready in seconds once loading has finished.
+    """
+
+    def __init__(self):
+        self.model = None
+        self.error = None
+        self.timings = {}
+        self._ready = threading.Event()
+        self._started_at = time.perf_counter()
+        threading.Thread(target=self._load, name="model-warmup", daemon=True).start()
+
+    def _load(self):
+        try:
+            model = get_model()
+            loaded_at = time.perf_counter()
+
+            dummy = np.zeros((1, *MODEL_INPUT_SHAPE), dtype=np.float32)
+            model.predict(dummy)
+            ready_at = time.perf_counter()
+
+            self.timings = {
+                "load": loaded_at - self._started_at,
+                "warmup": ready_at - loaded_at,
+                "ready": ready_at - self._started_at,
+            }
+            self.model = model
+        except Exception as e:
+            self.error = e
+        finally:
+            self._ready.set()
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def get(self, timeout=None):
+        """Returns the warmed-up model, waiting for it if needed."""
+        if not self._ready.wait(timeout):
+            raise TimeoutError("The AI model is still warming up")
+        if self.error is not None:
+            raise RuntimeError(f"The AI model failed to load: {self.error}") from self.error
+        return self.model
+
+
+# Use st.cache_resource so the model is loaded only once per process
+@st.cache_resource
+def get_model_loader():
+    return ModelLoader()
+
+@st.cache_resource
+def get_inference_client():
+    return InferenceClient(INFERENCE_URL)
+
+# Either a remote inference server or a local model; the local model is never loaded when the server is used
+inference_client = get_inference_client() if INFERENCE_URL else None
+model_loader = None if inference_client else get_model_loader()
+
+# Number of images sent to the model in a single forward pass in batch mode
+BATCH_SIZE = 32
+
+# Optional directory for the on-disk prediction cache tier (disabled when unset)
+PREDICTION_CACHE_DIR = os.environ.get("HIEROGLYPH_PREDICTION_CACHE_DIR")
+
+# Temperature-scaling parameter fitted offline for the served model (see egypt.ipynb)
+temperature = st.cache_resource(load_temperature)(MODEL_NAME, MODEL_VERSION)
 
 # ===============================================
 # 3. DATA DICTIONARIES (Your original code)
 # ===============================================
 
-label_map = {
-    # A: Man and his Occupations
-    0: "A1",    # Man, Seated
-    1: "A2",    # Man with Hand to Mouth
-    2: "A13",   # Man with a Stick
-    3: "A17",   # Child, Seated
-    4: "A21",   # Man Striking
-    5: "A40",   # God, Seated
-
-    # B: Woman and her Occupations
-    6: "B1",    # Woman, Seated
-    7: "B3",    # Pregnant Woman
-    8: "B7",    # Woman Nursing Child
-
-    # C: Anthropomorphic Deities
-    9: "C1",    # Osiris, Seated
-    10: "C2",   # Ptah, Seated
-    11: "C3",   # Ra with Falcon Head
-
-    # D: Parts of the Human Body
-    12: "D1",   # Head in Profile
-    13: "D2",   # Eye of Horus (Udjat)
-    14: "D4",   # Human Eye
-    15: "D10",  # Pupil of the Eye
-    16: "D21",  # Mouth
-    17: "D36",  # Forearm
-    18: "D46",  # Hand
-    19: "D58",  # Leg and Foot
-
-    # E: Mammals
-    20: "E1",   # Bull
-    21: "E6",   # Calf
-    22: "E9",   # Lion, Recumbent
-    23: "E23",  # Jackal (Anubis)
-    24: "E34",  # Hare
-
-    # F: Parts of Mammals
-    25: "F9",   # Djed Pillar
-    26: "F13",  # Horn
-    27: "F20",  # Tongue of an Ox
-    28: "F31",  # Animal Hide
-    29: "F35",  # Heart
-
-    # G: Birds
-    30: "G1",   # Egyptian Vulture
-    31: "G5",   # Falcon (Horus)
-    32: "G17",  # Owl
-    33: "G25",  # Quail Chick, standing
-    34: "G39",  # Duck
-    35: "G43",  # Quail Chick
-
-    # H: Parts of Birds
-    36: "H6",   # Feather of Ma'at
-
-    # I: Amphibious Animals, Reptiles
-    37: "I9",   # Cobra (Uraeus)
-    38: "I10",  # Horned Viper
-    39: "I12",  # Tadpole
-
-    # K: Fish and Parts of Fish
-    40: "K1",   # Tilapia Fish
-    41: "K5",   # Catfish
-
-    # L: Invertebrata and Lesser Animals
-    42: "L1",   # Scarab Beetle (Kheper)
-    43: "L2",   # Bee
-
-    # M: Trees and Plants
-    44: "M1",   # Papyrus Clump
-    45: "M8",   # Lotus Flower on a Long Stem
-    46: "M9",   # Lotus Flower (Same as M8, but often used)
-    47: "M17",  # Reed Leaf
-    48: "M23",  # Sedge Plant
-
-    # N: Sky, Earth, Water
-    49: "N1",   # Sky
-    50: "N5",   # Sun (Ra)
-    51: "N14",  # Ankh
-    52: "N17",  # Land, Flat Alluvial
-    53: "N23",  # Irrigation Canal
-    54: "N25",  # Hill Country or Desert
-    55: "N29",  # Hill or Slope
-    56: "N35",  # Water (Ripple)
-
-    # O: Buildings and Parts of Buildings
-    57: "O1",   # House or Building
-    58: "O4",   # Courtyard
-    59: "O28",  # Pyramid
-    60: "O34",  # Gate or Door
-    61: "O42",  # Shrine
-
-    # P: Ships and Parts of Ships
-    62: "P1",   # Boat on Water
-    63: "P5",   # Sail
-
-    # Q: Domestic and Funerary Furniture
-    64: "Q1",   # Seat or Stool
-    65: "Q3",   # Throne or Chair
-    66: "Q6",   # Headrest
-
-    # R: Temple Furniture and Sacred Emblems
-    67: "R1",   # Ra (Sun God) - Note: Often represented by N5
-    68: "R4",   # Offering Table
-    69: "R8",   # Standard of a God (Neter)
-    70: "R11",  # Was Scepter
-    71: "R12",  # Shen Ring
-
-    # S: Crowns, Dress, Staves
-    72: "S1",   # White Crown (Hedjet)
-    73: "S3",   # Red Crown (Deshret)
-    74: "S5",   # Double Crown (Pschent)
-    75: "S29",  # Folded Cloth
-    76: "S34",  # Sandal
-    77: "S40",  # Was Scepter
-    78: "S42",  # Crook & Flail
-
-    # T: Warfare, Hunting, Butchery
-    79: "T3",   # Mace (Hedj)
-    80: "T7",   # Bow
-    81: "T11",  # Arrow
-    82: "T14",  # Dagger
-
-    # U: Agriculture, Crafts, Professions
-    83: "U1",   # Sickle
-    84: "U6",   # Hoe
-    85: "U13",  # Plough
-    86: "U23",  # Adze
-    87: "U30",  # Kiln
-
-    # V: Rope, Fiber, Baskets
-    88: "V1",   # Coil of Rope
-    89: "V13",  # Wick of Twisted Flax
-    90: "V28",  # Flax / Rope
-    91: "V30",  # Basket
-    92: "V31",  # Basket with Handle
-
-    # W: Vessels of Stone and Earthenware
-    93: "W9",   # Alabaster Basin
-    94: "W11",  # Cup
-    95: "W24",  # Water Pot
-
-    # X: Loaves and Cakes
-    96: "X1",   # Bread Loaf
-    97: "X4",   # Offering Slice of Bread
-    98: "X8",   # Offering Cake on a Mat
-
-    # Y: Writings, Games, Music
-    99: "Y1",   # Papyrus Scroll, Tied
-    100: "Y5",  # Scribe's Kit
-
-    # Z: Strokes, Geometrical Figures
-    101: "Z1",  # Single Stroke
-    102: "Z2",  # Plural Strokes
-    103: "Z4",  # Diagonal Strokes
-    104: "Z7",  # Enclosure
-
-    # Aa: Unclassified
-    105: "Aa1", # Pedestal or Support
-    106: "Aa11",# Heart and Windpipe (Nefer)
-    107: "Aa15",# Spine and Ribs
-}
-
-gardiner_categories = {
-    "A": "Man and his occupations", "B": "Woman and her occupations", "C": "Anthropomorphic deities",
-    "D": "Parts of the human body", "E": "Mammals", "F": "Parts of mammals", "G": "Birds",
-    "H": "Parts of birds", "I": "Amphibious animals, reptiles", "K": "Fish and parts of fish",
-    "L": "Invertebrates and small plants", "M": "Trees and plants", "N": "Sky, earth, water",
-    "O": "Buildings, parts of buildings", "P": "Domestic and funerary furniture", "Q": "Vessels of stone and earthenware",
-    "R": "Temple furniture and sacred emblems", "S": "Crowns, dress, staves, weapons", "T": "Warfare, hunting, butchery",
-    "U": "Agriculture, crafts, professions", "V": "Rope, fiber, baskets, bags", "W": "Vessels of wood, stone, metal",
-    "X": "Loaves, cakes, offerings", "Y": "Writing, games, music", "Z": "Strokes, signs, geometrical figures",
-    "Aa": "Unclassified signs"
-}
+# The sign catalogue lives in hieroglyphs/data/gardiner_catalogue.json and is loaded once per process by hieroglyphs/catalogue.py
+from hieroglyphs.catalogue import code_to_info
 
-code_to_info = {
-    # ===============================================
-    # A: Man and his Occupations
-    # ===============================================
-    "A1": ("Man, Seated ( determinaive for 'I', 'man')", "📖 Meaning: Represents a man and is used as a determinative for words related to men, their roles (like 'father' or 'priest'), and personal names. It signifies identity and humanity."),
-    "A2": ("Man with Hand to Mouth", "📖 Meaning: A determinative for actions involving the mouth, such as eating, drinking, speaking, and thinking. It visualizes the source of sensory input and expression."),
-    "A13": ("Man with a Stick", "📖 Meaning: Represents a man of authority or an elder. Used as a determinative for officials, nobles, and respected figures, symbolizing leadership and social standing."),
-    "A17": ("Child, Seated with Finger to Mouth", "📖 Meaning: Represents a child, youth, or heir. The finger-to-mouth gesture was a conventional sign of childhood in ancient Egyptian art. It signifies youthfulness and lineage."),
-    "A21": ("Man Striking with a Stick", "📖 Meaning: A determinative for words involving effort, strength, or violence. It conveys the idea of power, control, and forceful action, often used in contexts of command or labor."),
-    "A40": ("God, Seated", "📖 Meaning: Represents a deity. This sign is used as a determinative for the names of gods, indicating divine status. The seated posture denotes authority and presence."),
-
-    # ===============================================
-    # B: Woman and her Occupations
-    # ===============================================
-    "B1": ("Woman, Seated", "📖 Meaning: The counterpart to A1, this is the determinative for 'woman' and related concepts like 'mother', 'wife', or 'goddess'. It signifies femininity and female identity."),
-    "B3": ("Pregnant Woman", "📖 Meaning: Used as a determinative for words related to pregnancy, conception, and childbirth. It is a clear symbol of creation, fertility, and the continuation of life."),
-    "B7": ("Woman Nursing a Child", "📖 Meaning: A determinative for words like 'nurse' or 'guardian'. It symbolizes nourishment, care, and the maternal bond, highlighting the protective role of women."),
-
-    # ===============================================
-    # C: Anthropomorphic Deities
-    # ===============================================
-    "C1": ("Osiris, Seated", "📖 Meaning: Represents Osiris, the god of the afterlife, resurrection, and fertility. He is typically shown mummified, holding the crook and flail, symbols of divine authority and kingship."),
-    "C2": ("Ptah, Seated in a Shrine", "📖 Meaning: Represents Ptah, the creator god of Memphis, patron of craftsmen. He is shown as a mummified man holding a scepter, symbolizing his role in creation and craftsmanship."),
-    "C3": ("Ra with Falcon Head and Sun-Disk", "📖 Meaning: Represents Ra (or Re), the ancient Egyptian sun god. The falcon head and solar disk symbolize his celestial power, sovereignty, and role as the creator of the world."),
-
-    # ===============================================
-    # D: Parts of the Human Body
-    # ===============================================
-    "D1": ("Head in Profile", "📖 Meaning: Represents the concept of 'head' and is used phonetically for the sound *tp*. It signifies the top, chief, or beginning of something, embodying leadership and primacy."),
-    "D2": ("Eye of Horus (Udjat)", "📖 Meaning: Symbol of protection, health, and healing. Named after the myth where Horus lost his eye fighting Seth. Widely used as a powerful amulet to ward off evil."),
-    "D4": ("Human Eye (👁️)", "📖 Meaning: Represents the eye and the act of seeing. It is used as a determinative for words related to sight, looking, and observation. Phonetically, it stands for the sound *iri*."),
-    "D10": ("Pupil of the Eye", "📖 Meaning: A determinative for the pupil, or the center of something. It signifies focus, precision, and the core of an issue."),
-    "D21": ("Mouth (👄)", "📖 Meaning: Represents the mouth and is used as a phonetic sign for the sound *r*. It is one of the most common uniliteral (single-sound) signs in the hieroglyphic alphabet."),
-    "D36": ("Forearm (ꜥ)", "📖 Meaning: A phonetic sign for the sound *ꜥ* (ayin). It represents the forearm and actions performed with it, such as working or giving."),
-    "D46": ("Hand (✋)", "📖 Meaning: A phonetic sign for the sound *d*. It represents the hand and is used in words related to actions, giving, and taking."),
-    "D58": ("Leg and Foot (🦶)", "📖 Meaning: A phonetic sign for the sound *b*. It is used as a determinative for words related to walking, movement, and place."),
-
-    # ===============================================
-    # E: Mammals
-    # ===============================================
-    "E1": ("Bull (🐂)", "📖 Meaning: Represents strength, power, and fertility. The bull was a symbol of the pharaoh's might and was associated with several gods, including Apis and Mnevis."),
-    "E6": ("Calf", "📖 Meaning: A phonetic sign for the sound *iw*. It symbolizes youth, innocence, and potential."),
-    "E9": ("Lion, Recumbent (🦁)", "📖 Meaning: A phonetic sign for the sound *rw*. The lion symbolized royalty, power, and ferocity, often guarding temples and tombs."),
-    "E23": ("Jackal, Seated (Anubis)", "📖 Meaning: Represents the jackal god Anubis, who presided over mummification and the afterlife. The sign is a determinative for jackals and deities associated with the dead."),
-    "E34": ("Hare (🐇)", "📖 Meaning: A phonetic sign for *wn* (wen). The hare was associated with speed, keen senses, and the concept of 'to exist' or 'to be'."),
-
-    # ===============================================
-    # F: Parts of Mammals
-    # ===============================================
-    "F9": ("Djed Pillar", "📖 Meaning: Symbol of stability and endurance. Originally representing the backbone of the god Osiris, it came to signify the eternal and unchanging aspects of the universe."),
-    "F13": ("Horn ( horns)", "📖 Meaning: A phonetic sign for *db*. Horns symbolized power, divinity, and protection in ancient Egypt."),
-    "F20": ("Tongue of an Ox", "📖 Meaning: Represents the tongue and is a determinative for words related to taste and speech. Phonetically, it represents the sound *ns*."),
-    "F31": ("Animal Hide", "📖 Meaning: Represents leather, skin, and hides. It is also used phonetically for the sound *ꜣb*."),
-    "F35": ("Heart (❤️)", "📖 Meaning: Symbol of life, intelligence, and emotion. The Egyptians believed the heart was the seat of the mind and would be weighed against the feather of Ma'at in the afterlife."),
-
-    # ===============================================
-    # G: Birds
-    # ===============================================
-    "G1": ("Egyptian Vulture (Vulture  vultures)", "📖 Meaning: A phonetic sign for the sound *ꜣ* (aleph). It is one of the foundational letters of the Egyptian alphabet."),
-    "G5": ("Falcon (Horus)", "📖 Meaning: Represents the god Horus, a primary deity associated with the sky, kingship, and protection. The falcon symbolized divine power and royalty."),
-    "G17": ("Owl (🦉)", "📖 Meaning: A phonetic sign for the sound *m*. This common uniliteral sign is often seen in the words for 'in', 'with', and 'from'."),
-    "G25": ("Quail Chick, standing", "📖 Meaning: Represents a quail chick. It is used as a determinative for young birds."),
-    "G39": ("Duck", "📖 Meaning: Represents a pintail duck and is used as a generic determinative for birds. It also appears in the phrase *sꜣ rꜥ* ('Son of Ra'), a core part of the pharaoh's royal titulary."),
-    "G43": ("Quail Chick (🐥)", "📖 Meaning: A phonetic sign for the sound *w*. It is another of the most common uniliteral signs in the Egyptian alphabet."),
-
-    # ===============================================
-    # H: Parts of Birds
-    # ===============================================
-    "H6": ("Feather of Ma'at (🪶)", "📖 Meaning: Symbol of truth, justice, balance, and cosmic order. In the judgment of the dead, the deceased's heart was weighed against this feather. If the heart was lighter, they achieved eternal life."),
-
-    # ===============================================
-    # I: Amphibious Animals, Reptiles
-    # ===============================================
-    "I9": ("Cobra (Uraeus) (🐍)", "📖 Meaning: The Uraeus is a symbol of royalty, divinity, and divine authority. Worn on the pharaoh's brow, it was believed to protect them by spitting fire at their enemies."),
-    "I10": ("Horned Viper (🐍)", "📖 Meaning: A phonetic sign for the sound *f*. It represents the horned viper, a snake native to the Egyptian desert."),
-    "I12": ("Tadpole (🐸)", "📖 Meaning: Represents the number 100,000. Due to the vast number of tadpoles that appeared in the Nile, it became a symbol for a huge, uncountable quantity."),
-
-    # ===============================================
-    # K: Fish and Parts of Fish
-    # ===============================
-    "K1": ("Tilapia Fish (🐟)", "📖 Meaning: Associated with fertility, rebirth, and the sun. The tilapia was observed carrying its eggs in its mouth, which Egyptians connected to self-creation."),
-    "K5": ("Catfish", "📖 Meaning: A phonetic sign for *nꜥr*. The catfish was a common fish in the Nile and a source of food."),
-
-    # ===============================================
-    # L: Invertebrata and Lesser Animals
-    # ===============================================
-    "L1": ("Scarab Beetle (Kheper)", "📖 Meaning: Symbol of creation, renewal, and rebirth. The beetle rolling a ball of dung was seen as an earthly parallel to the sun god Ra rolling the sun across the sky each day."),
-    "L2": ("Bee (🐝)", "📖 Meaning: Symbolized the King of Lower Egypt (*bjt*). It was also associated with royalty, diligence, and the production of honey, a valuable commodity."),
-
-    # ===============================================
-    # M: Trees and Plants
-    # ===============================================
-    "M1": ("Papyrus Clump", "📖 Meaning: Symbolized the land of Lower Egypt (the Nile Delta). Papyrus was a vital resource, used for everything from writing material to building boats."),
-    "M8": ("Lotus Flower on a Long Stem", "📖 Meaning: A phonetic sign for *sšn*. The lotus symbolized creation, rebirth, and purity. It closes at night and opens in the morning, mirroring the cycle of the sun."),
-    "M17": ("Reed Leaf (🌱)", "📖 Meaning: A phonetic sign for the sound *j* or *i*. It is one of the most common single-sound signs and often used as the pronoun 'I'."),
-    "M23": ("Sedge Plant", "📖 Meaning: Symbolized the land of Upper Egypt. This sign was part of the *nsw-bjt* title, representing the pharaoh's rule over a unified 'Two Lands' of Upper and Lower Egypt."),
-
-    # ===============================================
-    # N: Sky, Earth, Water
-    # ===============================================
-    "N1": ("Sky Petal", "📖 Meaning: Represents the sky or heavens. As a determinative, it is used in words like 'sky', 'night', and 'rain'. It depicts the sky as a solid ceiling held up over the earth."),
-    "N5": ("Sun (Ra) (☀️)", "📖 Meaning: Represents the sun and the god Ra. It is a determinative for words related to the sun, light, and time (e.g., 'day'). It is central to Egyptian cosmology and religion."),
-    "N14": ("Ankh (☥)", "📖 Meaning: Symbol of eternal life, often simply translated as 'life'. Ancient Egyptians carried it in statues and inscriptions as a sign of immortality and divine protection."),
-    "N17": ("Land, Flat Alluvial", "📖 Meaning: A determinative for 'land' or 'earth'. It represents a flat piece of fertile land, crucial for agriculture along the Nile."),
-    "N23": ("Irrigation Canal", "📖 Meaning: Represents a channel or canal, and is used phonetically for the sound *mr* (as in 'pyramid'). It signifies the managed landscape of Egypt."),
-    "N25": ("Hill Country or Desert", "📖 Meaning: Represents foreign lands, the desert, or hilly terrain outside the fertile Nile valley. It is a determinative for places considered 'other' than Egypt."),
-    "N29": ("Hill or Slope", "📖 Meaning: A phonetic sign for the sound *q*. It represents an incline or a slope."),
-    "N35": ("Water (Ripple)", "📖 Meaning: A phonetic sign for the sound *n*. As a determinative, three of these signs represent 'water' or 'lake', symbolizing the life-giving Nile."),
-
-    # ===============================================
-    # O: Buildings and Parts of Buildings
-    # ===============================================
-    "O1": ("House or Building (🏠)", "📖 Meaning: A determinative for 'house', 'temple', or 'palace'. Phonetically, it stands for *pr* (per), meaning 'house'."),
-    "O4": ("Courtyard", "📖 Meaning: A phonetic sign for *h*. It represents a rectangular courtyard or enclosure as seen from above."),
-    "O28": ("Pyramid (△)", "📖 Meaning: Represents a pyramid or tomb. It is a determinative for such structures and related concepts."),
-    "O34": ("Gate or Door", "📖 Meaning: A phonetic sign for *s*. It represents a door bolt, and by extension, security and passage."),
-    "O42": ("Shrine", "📖 Meaning: Represents a shrine or sacred enclosure. It is a determinative for holy places and temples."),
-
-    # ===============================================
-    # P: Ships and Parts of Ships
-    # ===============================================
-    "P1": ("Boat on Water (⛵)", "📖 Meaning: A determinative for boats, ships, and the act of traveling by water. Boats were essential for transport, trade, and religious processions on the Nile."),
-    "P5": ("Sail", "📖 Meaning: Represents a sail and is used phonetically for the sound *nfw*. It signifies wind, breath, and air."),
-
-    # ===============================================
-    # Q: Domestic and Funerary Furniture
-    # ===============================================
-    "Q1": ("Seat or Stool", "📖 Meaning: A phonetic sign for *p*. It represents a simple reed stool, a common piece of furniture."),
-    "Q3": ("Throne or Chair", "📖 Meaning: Represents a throne and is a determinative for 'seat'. Phonetically, it stands for *ws*."),
-    "Q6": ("Headrest", "📖 Meaning: Represents a headrest, a common funerary item placed in tombs to support the deceased's head, magically protecting them in the afterlife."),
-
-    # ===============================================
-    # R: Temple Furniture and Sacred Emblems
-    # ===============================================
-    "R4": ("Offering Table", "📖 Meaning: Represents a table with loaves of bread, symbolizing an offering. It is used as a determinative for 'offering' and the phonetic value *ḥtp* (hetep), meaning 'peace' or 'to be satisfied'."),
-    "R8": ("Standard of a God (Neter)", "📖 Meaning: Represents divinity. The flag-like symbol is a determinative for the word 'god' (*nṯr*) and for the names of specific deities."),
-    "R11": ("Was Scepter", "📖 Meaning: Symbol of power, control, and dominion. Frequently shown in the hands of kings and gods as a tool of cosmic authority and a sign of their divine power."),
-    "R12": ("Shen Ring", "📖 Meaning: A circle of rope representing eternity and protection. The cartouche, which encircled royal names, was an elongated version of the Shen ring, offering eternal protection to the pharaoh's name."),
-    "R1": ("Ra (Sun God)", "📖 Meaning: The Sun God and one of the greatest deities of Egypt. Represents creation, light, and warmth. Often depicted with a falcon head and a solar disk."),
-    # ===============================================
-    # S: Crowns, Dress, Staves
-    # ===============================================
-    "S1": ("White Crown (Hedjet)", "📖 Meaning: The crown of Upper Egypt (southern Egypt). It symbolized the pharaoh's rule over this region."),
-    "S3": ("Red Crown (Deshret)", "📖 Meaning: The crown of Lower Egypt (the northern Nile Delta). It symbolized the pharaoh's rule over this region."),
-    "S5": ("Double Crown (Pschent)", "📖 Meaning: The combined White and Red Crowns, symbolizing the unification of Upper and Lower Egypt and the pharaoh's rule over the entire country."),
-    "S29": ("Folded Cloth", "📖 Meaning: A phonetic sign for the sound *s*. It represents a folded piece of linen, a key textile in ancient Egypt."),
-    "S34": ("Sandal (🩴)", "📖 Meaning: A phonetic sign for *b*. Sandals were a sign of status, and the right to wear them was often restricted to royalty and high officials."),
-    "S40": ("Was Scepter", "📖 Meaning: Symbol of power, control, and dominion. Frequently shown in the hands of kings and gods as a tool of cosmic authority."),
-    "S42": ("Crook & Flail", "📖 Meaning: Royal authority symbols. The crook represents care and guardianship (the king as shepherd), while the flail represents discipline and the fertility of the land."),
-
-    # ===============================================
-    # T: Warfare, Hunting, Butchery
-    # ===============================================
-    "T3": ("Mace (Hedj)", "📖 Meaning: A pear-shaped mace, symbolizing power and authority. It was an early symbol of kingship and appears on some of the oldest artifacts, like the Narmer Palette."),
-    "T7": ("Bow", "📖 Meaning: Represents a bow and is a determinative for words related to archery, warfare, and foreign peoples (who were often depicted as archers)."),
-    "T11": ("Arrow (→)", "📖 Meaning: Represents an arrow and is a determinative for words related to shooting and projectiles."),
-    "T14": ("Dagger", "📖 Meaning: Represents a dagger or knife. It is a determinative for sharp objects and cutting."),
-
-    # ===============================================
-    # U: Agriculture, Crafts, Professions
-    # ===============================================
-    "U1": ("Sickle", "📖 Meaning: A phonetic sign for *mꜣ*. It represents a sickle used for harvesting grain, a fundamental activity for Egyptian civilization."),
-    "U6": ("Hoe", "📖 Meaning: A phonetic sign for *mr*. The hoe was an essential tool for breaking up earth and preparing fields for planting."),
-    "U13": ("Plough", "📖 Meaning: Represents a plough and is a determinative for 'ploughing' and 'cultivating'."),
-    "U23": ("Adze", "📖 Meaning: A woodworking tool, used as a determinative for 'carpenter' and 'craft'. It was also used in the 'Opening of the Mouth' ceremony to reanimate the deceased."),
-    "U30": ("Kiln", "📖 Meaning: Represents a potter's kiln and is used phonetically for *tꜣ*. It signifies heat, baking, and creation."),
-
-    # ===============================================
-    # V: Rope, Fiber, Baskets
-    # ===============================================
-    "V1": ("Coil of Rope", "📖 Meaning: Represents a coil of rope and is a phonetic sign for the number 100."),
-    "V13": ("Wick of Twisted Flax", "📖 Meaning: A phonetic sign for the sound *h*. It represents the wick of an oil lamp."),
-    "V28": ("Flax / Rope", "📖 Meaning: A phonetic sign for the sound *ḥ*. It represents a hank of flax fiber, crucial for making linen and rope."),
-    "V30": ("Basket", "📖 Meaning: A phonetic sign for the sound *k*. It represents a simple basket."),
-    "V31": ("Basket with Handle", "📖 Meaning: A phonetic sign for the sound *nb*. It means 'lord' or 'master' and is also used for the word 'all'."),
-
-    # ===============================================
-    # W: Vessels of Stone and Earthenware
-    # ===============================================
-    "W9": ("Alabaster Basin", "📖 Meaning: Represents a ceremonial basin and is used phonetically for *ḥb*, as in *ḥb-sd* (Heb Sed festival)."),
-    "W11": ("Cup", "📖 Meaning: A phonetic sign for *ḥnt*. It represents a small stone or ceramic cup."),
-    "W24": ("Water Pot", "📖 Meaning: A phonetic sign for *nw*. When repeated three times, it can stand for the primordial waters of 'Nu' or 'Nun'."),
-
-    # ===============================================
-    # X: Loaves and Cakes
-    # ===============================================
-    "X1": ("Bread Loaf", "📖 Meaning: A phonetic sign for the sound *t*. It also serves as a determinative for bread and offerings."),
-    "X4": ("Offering Slice of Bread", "📖 Meaning: A phonetic sign for *d*. It often appears in the offering formula 'hetep-di-nesu' ('an offering which the king gives')."),
-    "X8": ("Offering Cake on a Mat", "📖 Meaning: Represents an offering and is the phonetic sign for *ḥtp* (hetep), meaning 'peace', 'offering', or 'to be content'."),
-
-    # ===============================================
-    # Y: Writings, Games, Music
-    # ===============================================
-    "Y1": ("Papyrus Scroll, Tied", "📖 Meaning: A determinative for abstract concepts, writing, and documents. It signifies knowledge, records, and the intellectual world."),
-    "Y5": ("Scribe's Kit", "📖 Meaning: Represents the tools of a scribe (palette, water pot, and reed pens). It is a determinative for 'scribe', 'writing', and 'to write'."),
-
-    # ===============================================
-    # Z: Strokes, Geometrical Figures
-    # ===============================================
-    "Z1": ("Single Stroke", "📖 Meaning: A determinative used to indicate that a sign should be read for its literal meaning (logogram) rather than its phonetic sound."),
-    "Z2": ("Plural Strokes", "📖 Meaning: Three vertical strokes used to indicate the plural form of a noun. It transforms a singular concept into a multiple one (e.g., 'god' becomes 'gods')."),
-    "Z4": ("Diagonal Strokes", "📖 Meaning: A determinative used for dual nouns (indicating two of something) and sometimes as a phonetic complement."),
-    "Z7": ("Enclosure", "📖 Meaning: Represents an enclosure, like a town or a fortified area. Often seen in the names of cities."),
-
-    # ===============================================
-    # Aa: Unclassified
-    # ===============================================
-    "Aa1": ("Pedestal or Support", "📖 Meaning: A phonetic sign for *mꜣꜥ* (as in Ma'at). It represents a pedestal or support, symbolizing foundation, stability, and order."),
-    "Aa11": ("Heart and Windpipe", "📖 Meaning: A phonetic sign for *nfr* (nefer), meaning 'beautiful', 'good', or 'perfect'. It is one of the most recognizable and positive symbols in Egyptian writing."),
-    "Aa15": ("Spine and Ribs", "📖 Meaning: Represents the back or spine. Used as a determinative for words related to the back."),
-}
 # ===============================================
 # 4. HELPER FUNCTION (Your original code)
 # ===============================================
 
-def predict_image(img_path):
+# One cache shared by all sessions of this app process
+@st.cache_resource
+def get_prediction_cache():
+    # Each model variant gets its own disk tier, so switching backends never serves stale predictions
+    cache_dir = None
+    if PREDICTION_CACHE_DIR:
+        cache_dir = os.path.join(PREDICTION_CACHE_DIR, MODEL_NAME, MODEL_VERSION or "default")
+    return PredictionCache(PREDICTION_CACHE_SIZE, cache_dir)
+
+prediction_cache = get_prediction_cache()
+
+
+# Gallery thumbnails are decoded and downsized once per process, not on every rerun
+@st.cache_resource
+def get_thumbnail_cache():
+    return ThumbnailCache()
+
+thumbnail_cache = get_thumbnail_cache()
+
+
+def load_thumbnail(img_path):
+    """
+    Returns the cached display-sized JPEG bytes of a gallery asset, or None if it
+    cannot be found or decoded. Also tries the asset's name under `assets/` and
+    the path relative to the parent directory (when run from `pages/`).
+    """
+    possible_paths = [
+        img_path,
+        os.path.join("assets", os.path.basename(img_path)),
+        os.path.join("..", img_path),
+    ]
+    for path in possible_paths:
+        if os.path.isfile(path):
+            try:
+                return thumbnail_cache.get(path)
+            except Exception:
+                return None
+    return None
+
+
+# Number of catalogue signs listed under the museum gallery for a search
+MAX_SIGN_RESULTS = 10
+
+
+# Search indexes are built once per process; reruns (every keystroke) only query them
+@st.cache_resource
+def get_search_index(kind, items, include_signs=False):
+    entries = gallery_entries(kind, items)
+    if include_signs:
+        entries += catalogue_entries()
+    return SearchIndex(entries)
+
+
+def show_gallery_image(img_path, caption=""):
+    """
+    Shows a gallery asset, preferably from its content-hashed static URL so the
+    browser caches it across visits; otherwise sends the cached thumbnail bytes.
+    Returns False if the image could not be found or decoded.
+    """
+    url = asset_manifest.url(img_path)
+    if url is not None:
+        st.markdown(f'<img src="{url}" alt="{caption}" style="width:100%">', unsafe_allow_html=True)
+        return True
+    thumbnail = load_thumbnail(img_path)
+    if thumbnail is None:
+        return False
+    st.image(thumbnail, use_column_width=True)
+    return True
+
+
+def predict_probs(img_source):
+    """
+    Returns the calibrated class probabilities for an image, from a single forward pass.
+    Repeat uploads of the same bytes are answered from `prediction_cache`.
+    """
+    # 1. Return the cached softmax vector for identical image bytes
+    data = read_image_bytes(img_source)
+    key = PredictionCache.key_for(data)
+    cached = prediction_cache.get(key)
+    if cached is not None:
+        return calibrate(cached[0], temperature)
+
+    # 2. Preprocess the image and get AI model's prediction
+    img_array = np.expand_dims(preprocess_image(data, draft=True), axis=0)
+    preds = model_loader.get().predict(img_array)[0]
+
+    # 3. Cache the raw softmax vector alongside the resolved top-1 result
+    probs = calibrate(preds, temperature)
+    prediction_cache.put(key, preds, top_k_predictions(probs, k=1)[0])
+    return probs
+
+
+def predict_image(img_source):
     """
     Analyzes a hieroglyph image and returns its identification, description, and confidence.
-    
-    This function implements a robust fallback system:
-    1. Tries to find a specific symbol match in `code_to_info`.
-    2. If not found, it uses the symbol's Gardiner code prefix to identify its category.
-    3. If the category or code is completely unknown, it returns a "Mystery Symbol" message.
+    `img_source` is anything accepted by `hieroglyphs.preprocessing.preprocess_image`:
+    a path or the uploaded bytes.
+    See `hieroglyphs.catalogue.resolve_prediction` for how the predicted class is turned into a name and description.
+    """
+    return predict_top_k(img_source, k=1)[0]
+
+
+def predict_top_k(img_source, k=TOP_K):
+    """
+    Returns the `k` most likely `(code, name, desc, confidence)` tuples for an image, best first.
+    Confidences are temperature-calibrated when `model/calibration.json` has a temperature for the served model.
     """
     try:
-        # 1. Preprocess the image for the model
-        img = load_img(img_path, target_size=(299, 299))
-        img_array = img_to_array(img) / 255.0
-        img_array = np.expand_dims(img_array, axis=0)
-
-        # 2. Get AI model's prediction
-        preds = model.predict(img_array, verbose=0)
-        class_idx = np.argmax(preds)
-        confidence = np.max(preds)
-        
-        # 3. Map prediction index to a Gardiner code
-        code = label_map.get(class_idx)
-
-        # 4. Determine the symbol's name and description with fallbacks
-        if code and code in code_to_info:
-            # Case 1: Perfect Match - The symbol is fully recognized.
-            name, desc = code_to_info[code]
-        
-        elif code:
-            # Case 2: Category Match - The symbol's code is valid but not in our detailed list.
-            # We infer its meaning from the general Gardiner category.
-            prefix = ''.join(filter(str.isalpha, code))
-            category = gardiner_categories.get(prefix)
-            
-            if category:
-                name = code  # Display the code itself as the name
-                desc = f"📖 Meaning: A hieroglyph from the '{category}' category. While this specific symbol is not in our detailed database, it belongs to signs representing '{category.lower()}'."
-            else:
-                # Fallback 1: The code's prefix is not a known Gardiner category.
-                name = "Mystery Symbol"
-                code = "Unclassified"
-                desc = "📖 Meaning: A rare or unclassified hieroglyph. Its category is not recognized in the standard Gardiner system."
-        
-        else:
-            # Fallback 2: The model's output doesn't map to any known hieroglyph code.
-            name = "Mystery Symbol"
-            code = "Unknown"
-            desc = "📖 Meaning: A rare or unidentified hieroglyph from ancient Egypt. Our AI could not match it to a known symbol."
-            
-        return code, name, desc, confidence
-    
+        if inference_client is not None:
+            return inference_client.predict_top_k(read_image_bytes(img_source), k)
+        return top_k_predictions(predict_probs(img_source), k)
+
     except Exception as e:
         # General error handling for issues like corrupted image files
-        return "Error", f"Prediction Error: {str(e)}", "", 0.0
+        return [("Error", f"Prediction Error: {str(e)}", "", 0.0)]
+
+
+def format_alternatives(candidates):
+    """Formats runner-up candidates as e.g. `G17 (12.0%), D21 (4.5%)` for the batch table."""
+    return ", ".join(f"{code} ({confidence:.1%})" for code, _, _, confidence in candidates)
+
+
+def predict_batch_remote(uploaded_files, batch_size=BATCH_SIZE, k=TOP_K):
+    """
+    Sends up to `batch_size` uploads to the inference server concurrently, so its
+    dynamic batcher can fuse them into shared forward passes.
+    Returns the same rows as `predict_batch`.
+    """
+    def predict_row(uploaded):
+        candidates = predict_top_k(uploaded.getbuffer(), k)
+        code, name, _, confidence = candidates[0]
+        return {"File": uploaded.name, "Code": code, "Name": name, "Confidence": confidence,
+                "Alternatives": format_alternatives(candidates[1:])}
+
+    with ThreadPoolExecutor(max_workers=batch_size) as pool:
+        return list(pool.map(predict_row, uploaded_files))
+
+
+def predict_batch(uploaded_files, batch_size=BATCH_SIZE, k=TOP_K):
+    """
+    Classifies many uploaded images with one forward pass per `batch_size` images.
+
+    Images are decoded one batch at a time so memory stays bounded by the batch,
+    not by the number of uploads. Images already in `prediction_cache` skip the
+    model entirely. Files that fail to decode are reported as errors and do not
+    stop the rest of the batch.
+    Returns one row dict (file, code, name, confidence, alternatives) per uploaded
+    file, in upload order.
+    """
+    if inference_client is not None:
+        return predict_batch_remote(uploaded_files, batch_size, k)
+
+    rows = []
+    for start in range(0, len(uploaded_files), batch_size):
+        chunk = uploaded_files[start:start + batch_size]
+
+        # 1. Answer cached images and decode the rest straight into the batch buffer,
+        #    keeping track of which ones succeeded
+        batch, pending = np.empty((len(chunk), *MODEL_INPUT_SHAPE), dtype=np.float32), []
+        chunk_rows = []
+        for uploaded in chunk:
+            row = {"File": uploaded.name, "Code": "Error", "Name": "", "Confidence": 0.0, "Alternatives": ""}
+            try:
+                data = bytes(uploaded.getbuffer())
+                key = PredictionCache.key_for(data)
+                cached = prediction_cache.get(key)
+                if cached is not None:
+                    candidates = top_k_predictions(calibrate(cached[0], temperature), k)
+                    row.update({"Code": candidates[0][0], "Name": candidates[0][1], "Confidence": candidates[0][3],
+                                "Alternatives": format_alternatives(candidates[1:])})
+                else:
+                    preprocess_image(data, draft=True, out=batch[len(pending)])
+                    pending.append((row, key))
+            except Exception as e:
+                row["Name"] = f"Prediction Error: {str(e)}"
+            chunk_rows.append(row)
+
+        # 2. One forward pass for the uncached part of the chunk
+        if pending:
+            preds = model_loader.get().predict(batch[:len(pending)])
+            for (row, key), raw_probs in zip(pending, preds):
+                candidates = top_k_predictions(calibrate(raw_probs, temperature), k)
+                prediction_cache.put(key, raw_probs, candidates[0])
+                row.update({"Code": candidates[0][0], "Name": candidates[0][1], "Confidence": candidates[0][3],
+                            "Alternatives": format_alternatives(candidates[1:])})
+
+        rows.extend(chunk_rows)
+    return rows
+
+
+def predict_inscription(uploaded_file, direction, batch_size=BATCH_SIZE, k=TOP_K):
+    """
+    Finds every sign in a photo of a wall or stela and classifies them in batched
+    forward passes (see hieroglyphs.inscription).
+    Returns the photo annotated with numbered boxes and one row dict per sign, in reading order.
+    """
+    photo = load_photo(uploaded_file.getbuffer())
+    signs = read_inscription(photo, model_loader.get().predict, direction, batch_size, k, temperature)
+    rows = [
+        {"#": number, "Code": sign["code"], "Name": sign["name"], "Confidence": sign["confidence"],
+         "Alternatives": format_alternatives(sign["candidates"]), "Box": ", ".join(map(str, sign["box"]))}
+        for number, sign in enumerate(signs, start=1)
+    ]
+    return annotate(photo, signs), rows
+
+
+# Labels of hieroglyphs.inscription.READING_DIRECTIONS in the inscription mode
+READING_DIRECTION_LABELS = {
+    "rows-ltr": "Rows, left to right",
+    "rows-rtl": "Rows, right to left",
+    "columns-ltr": "Columns, left to right",
+    "columns-rtl": "Columns, right to left",
+}
 
 # ===============================================
 # 5. UI LAYOUT & SECTIONS
@@ -504,9 +375,11 @@ A digital gateway to explore the beauty, mystery, and science of the symbols tha
 """)
 st.markdown('<hr class="section-divider">', unsafe_allow_html=True)
 
+# Everything above is sent to the browser without waiting for the model
+first_paint_seconds = time.perf_counter() - PAGE_START
+
 
 import os
-from PIL import Image
 
 # --- PHARAOHS SECTION ---
 st.markdown('<div class="section">', unsafe_allow_html=True)
@@ -520,13 +393,15 @@ pharaohs = {
     "Khufu": ("assets/74965d3d9b77c730df05ea241c841a54.jpg", "👑 Khufu (Cheops, 2589–2566 BC)\n\nFamous for commissioning the Great Pyramid of Giza, one of the Seven Wonders of the Ancient World. His reign was marked by major construction projects and centralized administration.")
 }
 import os
-from PIL import Image
 
 # ... (الكود السابق: التعريفات وقاموس الفراعنة) ...
 
 # شريط البحث
 search_pharaoh = st.text_input("🔍 Search for a Pharaoh (e.g., Tutankhamun, Ramses II):", key="pharaoh_search").strip().lower()
-filtered_pharaohs = {k: v for k, v in pharaohs.items() if search_pharaoh in k.lower()} if search_pharaoh else pharaohs
+pharaoh_index = get_search_index("pharaoh", pharaohs)
+filtered_pharaohs = {
+    entry.key: pharaohs[entry.key] for entry, _ in pharaoh_index.search(search_pharaoh, kind="pharaoh")
+} if search_pharaoh else pharaohs
 cols = st.columns(3)
 
 for idx, (name, (img_path, desc)) in enumerate(filtered_pharaohs.items()):
@@ -543,31 +418,9 @@ for idx, (name, (img_path, desc)) in enumerate(filtered_pharaohs.items()):
             continue
 
         # -----------------------------
-        # 2️⃣ محاولة تحميل الصورة بأمان
+        # 2️⃣ العرض الآمن
         # -----------------------------
-        image_obj = None
-
-        possible_paths = [
-            img_path,                            # assets/xxx.jpg
-            os.path.join("assets", os.path.basename(img_path)),  # تأمين إضافي
-            os.path.join("..", img_path),        # عند التشغيل من pages
-        ]
-
-        for path in possible_paths:
-            if os.path.isfile(path):
-                try:
-                    image_obj = Image.open(path)
-                    image_obj = image_obj.convert("RGB")  # مهم جدًا
-                    break
-                except Exception as e:
-                    image_obj = None
-
-        # -----------------------------
-        # 3️⃣ العرض الآمن
-        # -----------------------------
-        if image_obj is not None:
-            st.image(image_obj, use_column_width=True)
-        else:
+        if not show_gallery_image(img_path, name):
             st.warning(f"⚠️ Image not found for {name}")
 
         st.markdown(f"<h4 style='text-align:center'>{name}</h4>", unsafe_allow_html=True)
@@ -582,24 +435,148 @@ st.markdown('<div class="section">', unsafe_allow_html=True)
 st.subheader("📸 AI Hieroglyph Translator")
 st.write("Upload a photo of a hieroglyph, and our AI model will predict its meaning.")
 
-uploaded_file = st.file_uploader("Upload a hieroglyph image", type=["jpg", "jpeg", "png"], key="file_uploader", label_visibility="collapsed")
-
-if uploaded_file is not None:
-    st.image(uploaded_file, caption="Uploaded Hieroglyph", use_column_width=True)
-    temp_path = "temp_hieroglyph.jpg"
-    with open(temp_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    
-    with st.spinner("🔮 Analyzing hieroglyph..."):
-        code, name, desc, confidence = predict_image(temp_path)
-    
-    if code != "Error":
-        st.markdown(f"### 🔮 Prediction: **{name}** ({code})")
-        st.progress(int(confidence * 100))
-        st.markdown(f"**Confidence:** {confidence:.2%}")
-        st.info(desc)
+@st.fragment(run_every=1.0)
+def model_warming_notice():
+    """Polls the background loader and reruns the page as soon as the model is ready."""
+    if model_loader.ready:
+        st.rerun()
+    st.info("⏳ The AI model is warming up — the uploader will appear here in a moment.")
+
+
+# The inference server warms its own model up before it starts accepting requests
+model_ready = inference_client is not None or (model_loader.ready and model_loader.error is None)
+
+if inference_client is None and not model_loader.ready:
+    model_warming_notice()
+elif not model_ready:
+    st.error(f"❌ The AI model failed to load: {model_loader.error}")
+    # A failed loader is not kept in the cache (a download may just have been interrupted):
+    # the next run of the page starts a fresh one
+    get_model_loader.clear()
+    if st.button("Retry loading the model", key="retry_model_load"):
+        st.rerun()
+else:
+    translate_mode = st.radio(
+        "Translation mode",
+        # Inscription mode classifies its crops in-process, so it needs the local model
+        ["Single image", "Batch (multiple images)"] + ([] if inference_client else ["Inscription (wall or stela photo)"]),
+        key="translate_mode",
+        horizontal=True,
+        label_visibility="collapsed"
+    )
+
+    if translate_mode == "Single image":
+        uploaded_file = st.file_uploader("Upload a hieroglyph image", type=["jpg", "jpeg", "png"], key="file_uploader", label_visibility="collapsed")
+
+        if uploaded_file is not None:
+            st.image(uploaded_file, caption="Uploaded Hieroglyph", use_column_width=True)
+
+            with st.spinner("🔮 Analyzing hieroglyph..."):
+                candidates = predict_top_k(uploaded_file.getbuffer())
+            code, name, desc, confidence = candidates[0]
+
+            if code != "Error":
+                st.markdown(f"### 🔮 Prediction: **{name}** ({code})")
+                st.progress(int(confidence * 100))
+                st.markdown(f"**Confidence:** {confidence:.2%}")
+                st.info(desc)
+
+                # Show the runner-up signs so ambiguous glyphs can be checked without re-uploading
+                if len(candidates) > 1:
+                    with st.expander("🔎 Other possible signs"):
+                        for alt_code, alt_name, alt_desc, alt_confidence in candidates[1:]:
+                            st.markdown(f"**{alt_name}** ({alt_code}) — {alt_confidence:.2%}")
+                            st.caption(alt_desc)
+            else:
+                st.error(f"❌ {name}")
+
+    elif translate_mode == "Batch (multiple images)":
+        uploaded_files = st.file_uploader(
+            "Upload hieroglyph images",
+            type=["jpg", "jpeg", "png"],
+            accept_multiple_files=True,
+            key="batch_file_uploader",
+            label_visibility="collapsed"
+        )
+
+        if uploaded_files:
+            with st.spinner(f"🔮 Analyzing {len(uploaded_files)} hieroglyphs..."):
+                batch_rows = predict_batch(uploaded_files)
+
+            # st.dataframe lets users sort by any column by clicking its header
+            st.dataframe(
+                pd.DataFrame(batch_rows, columns=["File", "Code", "Name", "Confidence", "Alternatives"]),
+                column_config={
+                    "Confidence": st.column_config.ProgressColumn("Confidence", format="%.2f", min_value=0.0, max_value=1.0)
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+
     else:
-        st.error(f"❌ {name}")
+        inscription_file = st.file_uploader(
+            "Upload a photo of an inscription",
+            type=["jpg", "jpeg", "png"],
+            key="inscription_file_uploader",
+            label_visibility="collapsed"
+        )
+        reading_direction = st.selectbox(
+            "Reading direction",
+            READING_DIRECTIONS,
+            format_func=READING_DIRECTION_LABELS.get,
+            key="reading_direction"
+        )
+
+        if inscription_file is not None:
+            try:
+                with st.spinner("🔮 Locating and reading every sign..."):
+                    annotated, inscription_rows = predict_inscription(inscription_file, reading_direction)
+            except Exception as e:
+                st.error(f"❌ Prediction Error: {str(e)}")
+            else:
+                st.image(annotated, caption=f"{len(inscription_rows)} signs found", use_column_width=True)
+                st.dataframe(
+                    pd.DataFrame(inscription_rows, columns=["#", "Code", "Name", "Confidence", "Alternatives", "Box"]),
+                    column_config={
+                        "Confidence": st.column_config.ProgressColumn("Confidence", format="%.2f", min_value=0.0, max_value=1.0)
+                    },
+                    hide_index=True,
+                    use_container_width=True
+                )
+
+if inference_client is not None:
+    try:
+        server_metrics = inference_client.metrics()
+        st.caption(
+            f"🛰️ Inference server ({server_metrics['model']}): {server_metrics['images_per_second']:.1f} img/s · "
+            f"queue depth {server_metrics['queue_depth']} · mean batch {server_metrics['mean_batch_size']:.1f} · "
+            f"cache {server_metrics['cache']['hits']} hits / {server_metrics['cache']['misses']} misses"
+        )
+    except OSError:
+        st.caption(f"🛰️ Inference server at {INFERENCE_URL} is not reachable")
+else:
+    cache_stats = prediction_cache.stats()
+    st.caption(f"⚡ Prediction cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses · {cache_stats['size']} stored")
+    # HIEROGLYPH_MODEL_NAME=cascade serves a confidence-gated cascade (hieroglyphs.cascade)
+    if model_loader.model is not None and model_loader.model.name == "cascade":
+        cascade_stats = model_loader.model.stats()
+        if cascade_stats["images"]:
+            st.caption(
+                f"🪜 Cascade: {cascade_stats['answered_by_stage'][0] / cascade_stats['images']:.0%} answered by the "
+                f"first model" + (f" · {cascade_stats['compute_saved']:.0%} compute saved"
+                                  if "compute_saved" in cascade_stats else "")
+            )
+
+if model_loader is None:
+    st.caption(f"⏱️ First paint: {first_paint_seconds:.2f}s")
+elif model_loader.timings:
+    st.caption(
+        f"⏱️ First paint: {first_paint_seconds:.2f}s · "
+        f"Model ready: {model_loader.timings['ready']:.1f}s "
+        f"(load {model_loader.timings['load']:.1f}s, warm-up {model_loader.timings['warmup']:.1f}s)"
+    )
+else:
+    st.caption(f"⏱️ First paint: {first_paint_seconds:.2f}s · Model warming up...")
 st.markdown('</div>', unsafe_allow_html=True)
 
 
@@ -622,13 +599,12 @@ search_gallery = st.text_input(
     key="gallery_search"
 ).strip().lower()
 
+gallery_index = get_search_index("gallery", gallery, include_signs=True)
 filtered_gallery = {
-    k: v for k, v in gallery.items()
-    if search_gallery in k.lower()
+    entry.key: gallery[entry.key] for entry, _ in gallery_index.search(search_gallery, kind="gallery")
 } if search_gallery else gallery
 
 import os
-from PIL import Image
 
 cols = st.columns(3)
 
@@ -637,10 +613,7 @@ for idx, (name, (path, desc)) in enumerate(filtered_gallery.items()):
 
         # عرض الصورة بشكل آمن
         if isinstance(path, str) and os.path.isfile(path):
-            try:
-                img = Image.open(path).convert("RGB")
-                st.image(img, use_column_width=True)
-            except Exception:
+            if not show_gallery_image(path, name):
                 st.warning("⚠️ Failed to load image")
         else:
             st.warning("⚠️ Image not found")
@@ -656,6 +629,17 @@ for idx, (name, (path, desc)) in enumerate(filtered_gallery.items()):
         ):
             st.info(desc)
 
+# The rest of the Gardiner catalogue is searchable too: codes, names, meanings, phonetic values, categories
+if search_gallery:
+    sign_results = gallery_index.search(search_gallery, kind="sign", limit=MAX_SIGN_RESULTS)
+    if sign_results:
+        st.markdown("#### 📜 Matching signs in the Gardiner catalogue")
+        for entry, _ in sign_results:
+            with st.expander(f"{entry.key} — {entry.fields['name']}"):
+                st.info(entry.fields["meaning"])
+    elif not filtered_gallery:
+        st.info("No hieroglyphs match your search.")
+
 st.markdown('</div>', unsafe_allow_html=True)
 
 # --- TRIVIA SECTION ---
@@ -672,9 +656,3 @@ st.markdown('</div>', unsafe_allow_html=True)
 
 # Close the main container
 st.markdown('</div>', unsafe_allow_html=True)
-
-# --- CLEANUP (Your original code) ---
-if os.path.exists("temp_hieroglyph.jpg"):
-    os.remove("temp_hieroglyph.jpg")
-
-
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from hieroglyphs.artifacts import ArtifactError, ModelRegistry, published_digest, sha256_of
+
+CONTENT = os.urandom(200_000)
+
+
+class FakeHost:
+    """Serves CONTENT like a Hugging Face resolve URL: HEAD publishes the digest, GET supports ranges."""
+
+    def __init__(self):
+        self.published = hashlib.sha256(CONTENT).hexdigest()
+        self.truncate_to = None
+        host = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self.send_response(302)
+                self.send_header("Location", "/cdn/model.h5")
+                if host.published:
+                    self.send_header("X-Linked-Etag", f'"{host.published}"')
+                    self.send_header("X-Linked-Size", str(len(CONTENT)))
+                self.end_headers()
+
+            def do_GET(self):
+                start = 0
+                if self.headers.get("Range"):
+                    start = int(self.headers["Range"].split("=")[1].rstrip("-"))
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{len(CONTENT) - 1}/{len(CONTENT)}")
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Length", str(len(CONTENT) - start))
+                self.end_headers()
+                # A truncated response announces the full length, then the connection drops
+                self.wfile.write(CONTENT[start:host.truncate_to])
+                self.close_connection = True
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/resolve/main/model.h5"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def host():
+    fake = FakeHost()
+    yield fake
+    fake.server.shutdown()
+
+
+def write_manifest(root, **entry):
+    entry = {"file": "model.h5", "url": None, "sha256": None, "size": None, **entry}
+    with open(os.path.join(root, "manifest.json"), "w") as f:
+        json.dump({"M": {"default": "v1", "versions": {"v1": entry}}}, f)
+
+
+def pinned(registry):
+    return registry.resolve("M")[1]["sha256"]
+
+
+def test_published_digest_is_read_without_following_the_redirect(host):
+    assert published_digest(host.url) == (hashlib.sha256(CONTENT).hexdigest(), len(CONTENT))
+    host.published = None
+    assert published_digest(host.url) == (None, None)
+
+
+def test_download_is_verified_against_the_published_digest_and_pinned(tmp_path, host):
+    write_manifest(tmp_path, url=host.url)
+    registry = ModelRegistry(str(tmp_path), offline=False)
+    path = registry.ensure("M")
+    with open(path, "rb") as f:
+        assert f.read() == CONTENT
+    assert pinned(registry) == hashlib.sha256(CONTENT).hexdigest()
+
+
+def test_download_not_matching_the_published_digest_is_rejected(tmp_path, host):
+    host.published = "0" * 64
+    write_manifest(tmp_path, url=host.url)
+    registry = ModelRegistry(str(tmp_path), offline=False)
+    with pytest.raises(ArtifactError, match="Checksum mismatch"):
+        registry.ensure("M")
+    assert pinned(registry) is None
+    assert not os.listdir(tmp_path / "M" / "v1")
+
+
+def test_nothing_is_downloaded_without_a_known_digest(tmp_path, host):
+    host.published = None
+    write_manifest(tmp_path, url=host.url)
+    registry = ModelRegistry(str(tmp_path), offline=False)
+    with pytest.raises(ArtifactError, match="Refusing to download"):
+        registry.ensure("M")
+    assert pinned(registry) is None
+
+
+def test_short_download_is_kept_for_resume_and_never_pinned(tmp_path, host):
+    host.truncate_to = 50_000
+    write_manifest(tmp_path, url=host.url)
+    registry = ModelRegistry(str(tmp_path), offline=False)
+    with pytest.raises(ArtifactError, match="stopped after 50000"):
+        registry.ensure("M")
+    part_path = tmp_path / "M" / "v1" / "model.h5.part"
+    assert part_path.stat().st_size == 50_000
+    assert pinned(registry) is None
+
+    host.truncate_to = None
+    path = registry.ensure("M")
+    assert sha256_of(path) == hashlib.sha256(CONTENT).hexdigest()
+    assert not part_path.exists()
+
+
+def test_legacy_file_without_a_known_digest_is_not_adopted(tmp_path):
+    write_manifest(tmp_path)
+    (tmp_path / "model.h5").write_bytes(CONTENT[:1000])
+    registry = ModelRegistry(str(tmp_path), offline=True)
+    with pytest.raises(ArtifactError):
+        registry.ensure("M")
+    assert (tmp_path / "model.h5").exists()
+    assert pinned(registry) is None
+
+
+def test_corrupt_legacy_file_is_quarantined(tmp_path):
+    write_manifest(tmp_path, sha256=hashlib.sha256(CONTENT).hexdigest(), size=len(CONTENT))
+    (tmp_path / "model.h5").write_bytes(CONTENT[:1000])
+    with pytest.raises(ArtifactError, match="Size mismatch"):
+        ModelRegistry(str(tmp_path), offline=True).ensure("M")
+    assert (tmp_path / "model.h5.corrupt").exists()
+
+
+def test_matching_legacy_file_is_moved_into_the_versioned_layout(tmp_path):
+    write_manifest(tmp_path, sha256=hashlib.sha256(CONTENT).hexdigest())
+    (tmp_path / "model.h5").write_bytes(CONTENT)
+    path = ModelRegistry(str(tmp_path), offline=True).ensure("M")
+    assert path == os.path.join(str(tmp_path), "M", "v1", "model.h5")
+    assert not (tmp_path / "model.h5").exists()
+
+
+def test_registered_file_is_pinned_and_served_offline(tmp_path):
+    source = tmp_path / "trained.h5"
+    source.write_bytes(CONTENT)
+    registry = ModelRegistry(str(tmp_path / "model"), offline=True)
+    path = registry.register("N", "v2", str(source))
+    assert registry.ensure("N", "v2") == path
+    assert registry.resolve("N", "v2")[1]["size"] == len(CONTENT)
+
+
+def test_verified_file_is_not_hashed_again_until_it_changes(tmp_path, monkeypatch):
+    import hieroglyphs.artifacts as artifacts
+
+    write_manifest(tmp_path, sha256=hashlib.sha256(CONTENT).hexdigest())
+    (tmp_path / "model.h5").write_bytes(CONTENT)
+    path = ModelRegistry(str(tmp_path), offline=True).ensure("M")
+
+    hashed = []
+    monkeypatch.setattr(artifacts, "sha256_of", lambda p: hashed.append(p) or sha256_of(p))
+    assert ModelRegistry(str(tmp_path), offline=True).ensure("M") == path
+    assert hashed == []
+
+    with open(path, "r+b") as f:
+        f.write(b"corrupted")
+    os.utime(path, ns=(0, 0))
+    with pytest.raises(ArtifactError, match="Checksum mismatch"):
+        ModelRegistry(str(tmp_path), offline=True).ensure("M")
+    assert hashed == [path]
+
+
+def test_registries_on_one_directory_do_not_lose_each_others_entries(tmp_path):
+    source = tmp_path / "trained.h5"
+    source.write_bytes(b"weights")
+    root = str(tmp_path / "model")
+
+    def register(version):
+        ModelRegistry(root, offline=True).register("N", version, str(source))
+
+    threads = [threading.Thread(target=register, args=(f"v{i}",)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(ModelRegistry(root).load_manifest()["N"]["versions"]) == sorted(f"v{i}" for i in range(16))
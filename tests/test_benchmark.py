@@ -0,0 +1,45 @@
+import json
+import os
+
+import keras
+import pytest
+
+from hieroglyphs.artifacts import ModelRegistry
+from hieroglyphs.benchmark import run, synthetic_images
+from hieroglyphs.catalogue import NUM_CLASSES
+from hieroglyphs.preprocessing import MODEL_INPUT_SHAPE
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    # The benchmark processes resolve models from ./model, like the app
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("HIEROGLYPH_MODEL_DIR", raising=False)
+    registry = ModelRegistry("model", offline=True)
+    for name, width in (("Tiny", 4), ("Wider", 16)):
+        inputs = keras.Input(MODEL_INPUT_SHAPE)
+        x = keras.layers.Conv2D(width, 3, strides=8)(inputs)
+        outputs = keras.layers.Dense(NUM_CLASSES, activation="softmax")(keras.layers.GlobalAveragePooling2D()(x))
+        keras.Model(inputs, outputs).save(f"{name}.h5")
+        registry.register(name, "v1", f"{name}.h5")
+    with open(os.path.join("model", "cascade.json"), "w") as f:
+        json.dump({"stages": [{"model": "Tiny"}, {"model": "Wider"}], "thresholds": [0.5]}, f)
+    return registry
+
+
+def test_each_variant_is_benchmarked_in_its_own_process(model_dir):
+    report = run(["Tiny", "cascade"], images=synthetic_images(2, (64, 48)), batch_sizes=(1, 4), latency_runs=3,
+                 min_seconds=0.01)
+    tiny, cascade = report["results"]
+    assert report["environment"]["images"] == 2
+
+    assert (tiny["model"], tiny["backend"], tiny["model_file"]) == ("Tiny", "keras", "Tiny.h5")
+    assert tiny["model_size_mb"] * 2 ** 20 == os.path.getsize(model_dir.ensure("Tiny"))
+    assert [row["batch_size"] for row in tiny["throughput"]] == [1, 4]
+    assert all(row["images_per_second"] > 0 for row in tiny["throughput"])
+    assert tiny["cold_start_s"]["total"] >= tiny["cold_start_s"]["load"] > 0
+    assert set(tiny["latency_ms"]) >= {"p50", "p95"}
+
+    # A cascade is as large as the stages it loads, not its JSON description
+    stages = sum(os.path.getsize(model_dir.ensure(name)) for name in ("Tiny", "Wider"))
+    assert cascade["model_size_mb"] * 2 ** 20 == stages
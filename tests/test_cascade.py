@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from hieroglyphs.cascade import CascadeBackend, gate_scores, pick_thresholds, run_cascade, simulate
+
+LABELS = np.array([0, 1, 2, 0, 1, 2, 0, 1, 2, 0])
+
+# The cheap stage is sure and right on the first six images, unsure and wrong on the rest
+CHEAP = np.array([[0.95, 0.03, 0.02], [0.02, 0.96, 0.02], [0.01, 0.02, 0.97]] * 2
+                 + [[0.3, 0.5, 0.2], [0.45, 0.4, 0.15], [0.2, 0.45, 0.35], [0.35, 0.4, 0.25]], dtype=np.float32)
+# The heavy stage is right on everything
+HEAVY = np.eye(3, dtype=np.float32)[LABELS] * 0.8 + 0.2 / 3
+COSTS = [1.0, 9.0]
+
+
+class FakeBackend:
+    input_shape = (None, 1)
+
+    def __init__(self, probs):
+        self.probs = probs
+        self.seen = []
+
+    def predict(self, batch):
+        indices = batch[:, 0].astype(int)
+        self.seen.extend(indices.tolist())
+        return self.probs[indices]
+
+
+def test_gate_scores():
+    probs = np.array([[0.6, 0.3, 0.1], [0.2, 0.35, 0.45]])
+    np.testing.assert_allclose(gate_scores(probs), [0.6, 0.45])
+    np.testing.assert_allclose(gate_scores(probs, "margin"), [0.3, 0.1])
+
+
+def test_run_cascade_only_passes_unsure_images_on():
+    calls = []
+
+    def stage(probs):
+        def predict(indices):
+            calls.append(indices.tolist())
+            return probs[indices]
+        return predict
+
+    probs, reached = run_cascade([stage(CHEAP), stage(HEAVY)], len(LABELS), [0.9])
+    assert calls == [list(range(10)), [6, 7, 8, 9]]
+    assert reached.tolist() == [0] * 6 + [1] * 4
+    np.testing.assert_allclose(probs[:6], CHEAP[:6])
+    np.testing.assert_allclose(probs[6:], HEAVY[6:])
+
+    with pytest.raises(ValueError):
+        run_cascade([stage(CHEAP)], len(LABELS), [], score="entropy")
+
+
+def test_ensemble_averages_the_stages_an_image_reached():
+    probs, _ = run_cascade([lambda idx: CHEAP[idx], lambda idx: HEAVY[idx]], len(LABELS), [0.9], ensemble=True)
+    np.testing.assert_allclose(probs[:6], CHEAP[:6])
+    np.testing.assert_allclose(probs[6:], (CHEAP[6:] + HEAVY[6:]) / 2, rtol=1e-6)
+
+
+def test_simulate_reports_accuracy_cost_and_stage_usage():
+    result = simulate([CHEAP, HEAVY], LABELS, [0.9], COSTS)
+    assert result["accuracy"] == 1.0
+    assert result["stage_fractions"] == [0.6, 0.4]
+    assert result["mean_cost"] == pytest.approx(0.6 * 1 + 0.4 * 10)
+    assert result["compute_saved"] == pytest.approx(1 - 4.6 / 9)
+
+    cheap_only = simulate([CHEAP, HEAVY], LABELS, [0.0], COSTS)
+    assert cheap_only["accuracy"] == 0.6
+    assert cheap_only["stage_fractions"] == [1.0, 0.0]
+
+
+def test_pick_thresholds_finds_the_cheapest_cascade_meeting_the_target():
+    result = pick_thresholds([CHEAP, HEAVY], LABELS, COSTS, target_accuracy=1.0)
+    assert result["accuracy"] == 1.0
+    assert result["stage_fractions"] == [0.6, 0.4]  # not every image sent to the heavy stage
+
+    # 0.7 only needs one of the unsure images escalated, and the cheapest such threshold wins
+    result = pick_thresholds([CHEAP, HEAVY], LABELS, COSTS, target_accuracy=0.7)
+    assert result["accuracy"] == 0.7
+    assert result["stage_fractions"] == [0.9, 0.1]
+
+
+def test_pick_thresholds_falls_back_to_the_cheapest_most_accurate_cascade():
+    wrong_heavy = np.roll(HEAVY, 1, axis=1)
+    result = pick_thresholds([CHEAP, wrong_heavy], LABELS, COSTS, target_accuracy=0.99)
+    assert result["accuracy"] == 0.6
+    assert result["stage_fractions"] == [1.0, 0.0]
+
+
+def test_cascade_backend_counts_the_stages_that_answered():
+    cheap, heavy = FakeBackend(CHEAP), FakeBackend(HEAVY)
+    backend = CascadeBackend([cheap, heavy], [0.9], costs=COSTS)
+    batch = np.arange(10, dtype=np.float32)[:, None]
+    probs = backend.predict(batch)
+    assert probs.argmax(axis=1).tolist() == LABELS.tolist()
+    assert heavy.seen == [6, 7, 8, 9]
+    stats = backend.stats()
+    assert stats["images"] == 10
+    assert stats["answered_by_stage"] == [6, 4]
+    assert stats["compute_saved"] == pytest.approx(1 - 4.6 / 9)
+
+    with pytest.raises(ValueError):
+        CascadeBackend([cheap, heavy], [0.9, 0.5])
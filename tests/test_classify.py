@@ -0,0 +1,96 @@
+import csv
+import json
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from hieroglyphs.catalogue import NUM_CLASSES
+from hieroglyphs.classify import ResultWriter, classify_tree, completed_paths, find_images
+from hieroglyphs.inference import TOP_K
+
+
+class FakeModel:
+    def __init__(self):
+        self.images = 0
+
+    def predict(self, batch):
+        self.images += len(batch)
+        probs = np.full((len(batch), NUM_CLASSES), 0.2 / (NUM_CLASSES - 1), dtype=np.float32)
+        probs[:, 0] = 0.8
+        return probs
+
+
+def row(path):
+    return {"path": path, "code": "A1", "name": "", "confidence": 0.8, "alternatives": [], "error": None}
+
+
+@pytest.fixture
+def photos(tmp_path):
+    root = tmp_path / "photos"
+    (root / "b").mkdir(parents=True)
+    (root / "a").mkdir()
+    for path in ("b/2.png", "a/1.jpg", "a/0.PNG", "3.png"):
+        Image.new("L", (40, 40), 128).save(root / path, format="PNG")
+    (root / "a" / "broken.jpg").write_bytes(b"not an image")
+    (root / "notes.txt").write_text("not an image either")
+    return str(root)
+
+
+def test_find_images_is_sorted_and_relative(photos):
+    assert find_images(photos) == ["3.png", "a/0.PNG", "a/1.jpg", "a/broken.jpg", "b/2.png"]
+
+
+@pytest.mark.parametrize("name", ["out.jsonl", "out.csv"])
+def test_completed_paths_drops_a_row_cut_off_by_a_crash(tmp_path, name):
+    output = str(tmp_path / name)
+    assert completed_paths(output) == set()
+    writer = ResultWriter(output)
+    writer.write([row("a.png"), row("b.png")])
+    writer.close()
+    with open(output, "a") as f:
+        f.write('{"path": "c.pn' if name.endswith(".jsonl") else "c.png,A1,Seated")
+
+    assert completed_paths(output) == {"a.png", "b.png"}
+    # The file is well-formed again, so appending continues cleanly
+    writer = ResultWriter(output)
+    writer.write([row("c.png")])
+    writer.close()
+    assert completed_paths(output) == {"a.png", "b.png", "c.png"}
+
+
+def test_csv_header_is_written_once(tmp_path):
+    output = str(tmp_path / "out.csv")
+    for path in ("a.png", "b.png"):
+        writer = ResultWriter(output)
+        writer.write([{**row(path), "alternatives": [{"code": "A2", "confidence": 0.1}]}])
+        writer.close()
+    with open(output, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["path"] for r in rows] == ["a.png", "b.png"]
+    assert rows[0]["alternatives"] == "A2:0.1000"
+
+
+def test_classify_tree_records_errors_and_resumes(photos, tmp_path):
+    output = str(tmp_path / "out.jsonl")
+    model = FakeModel()
+    summary = classify_tree(photos, output, model, batch_size=2, workers=1, log=lambda message: None)
+    assert (summary["classified"], summary["errors"], summary["skipped"]) == (4, 1, 0)
+    assert model.images == 4
+
+    with open(output) as f:
+        rows = {r["path"]: r for r in map(json.loads, f)}
+    assert set(rows) == set(find_images(photos))
+    assert rows["a/broken.jpg"]["code"] == "Error" and rows["a/broken.jpg"]["error"]
+    assert rows["3.png"]["confidence"] == pytest.approx(0.8) and rows["3.png"]["error"] is None
+    assert len(rows["3.png"]["alternatives"]) == TOP_K - 1
+
+    # A crash that cut off the last row: only that image is classified again
+    with open(output, "rb+") as f:
+        data = f.read()
+        f.truncate(len(data) - 10)
+    model = FakeModel()
+    summary = classify_tree(photos, output, model, batch_size=2, workers=1, log=lambda message: None)
+    assert summary["skipped"] == 4
+    assert summary["classified"] + summary["errors"] == 1
+    assert sorted(completed_paths(output)) == find_images(photos)
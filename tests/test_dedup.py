@@ -0,0 +1,68 @@
+import random
+
+import numpy as np
+from PIL import Image
+
+from hieroglyphs.dedup import BKTree, find_duplicates, hamming, image_hashes
+
+
+def test_bktree_query_matches_brute_force():
+    rng = random.Random(0)
+    values = [rng.getrandbits(64) for _ in range(300)]
+    values += [value ^ (1 << bit) for value, bit in zip(values[:50], range(50))]  # close neighbours
+    tree = BKTree()
+    for index, value in enumerate(values):
+        tree.add(value, index)
+    assert len(tree) == len(values)
+
+    for probe in values[:20] + [rng.getrandbits(64) for _ in range(20)]:
+        for radius in (0, 3, 20):
+            expected = sorted((hamming(probe, value), index) for index, value in enumerate(values)
+                              if hamming(probe, value) <= radius)
+            assert sorted(tree.query(probe, radius)) == expected
+
+
+def test_bktree_keeps_every_item_of_an_exact_duplicate_hash():
+    tree = BKTree()
+    assert tree.query(0, 64) == []
+    tree.add(0b1011, "a")
+    tree.add(0b1011, "b")
+    tree.add(0b0011, "c")
+    assert len(tree) == 3
+    assert sorted(tree.query(0b1011, 0)) == [(0, "a"), (0, "b")]
+    assert sorted(tree.query(0b1011, 1)) == [(0, "a"), (0, "b"), (1, "c")]
+
+
+def test_find_duplicates_clusters_transitively_and_keeps_the_first():
+    hashes = [[0b0000], [0xFFFF], [0b0011], [0b1111], [0xFFFF0000]]
+    # 0-2 and 2-3 are 2 bits apart, 0-3 are 4: one cluster through the chain
+    assert find_duplicates([None] * 5, radius=2, hashes=hashes) == [[0, 2, 3]]
+    assert find_duplicates([None] * 5, radius=1, hashes=hashes) == []
+
+
+def test_image_hashes_survive_reencoding_but_not_other_images(tmp_path):
+    rng = np.random.default_rng(0)
+    pixels = (rng.random((8, 8)) * 255).astype(np.uint8)
+    glyph = Image.fromarray(pixels).resize((120, 120), Image.BILINEAR)
+    glyph.save(tmp_path / "glyph.png")
+    glyph.resize((90, 90)).save(tmp_path / "smaller.jpg", quality=70)
+    Image.fromarray(255 - pixels).resize((120, 120), Image.BILINEAR).save(tmp_path / "other.png")
+
+    own, = image_hashes(tmp_path / "glyph.png")
+    copy, = image_hashes(tmp_path / "smaller.jpg")
+    other, = image_hashes(tmp_path / "other.png")
+    assert hamming(own, copy) <= 4
+    assert hamming(own, other) > 16
+
+
+def test_dihedral_hashes_include_the_mirrored_image(tmp_path):
+    rng = np.random.default_rng(1)
+    glyph = Image.fromarray((rng.random((8, 8)) * 255).astype(np.uint8)).resize((64, 64), Image.BILINEAR)
+    glyph.save(tmp_path / "glyph.png")
+    glyph.transpose(Image.FLIP_LEFT_RIGHT).save(tmp_path / "mirrored.png")
+
+    variants = image_hashes(tmp_path / "glyph.png", dihedral=True)
+    mirrored, = image_hashes(tmp_path / "mirrored.png")
+    assert len(variants) == 8
+    assert variants[0] == image_hashes(tmp_path / "glyph.png")[0]
+    assert min(hamming(variant, mirrored) for variant in variants) <= 2
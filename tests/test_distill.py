@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from hieroglyphs.distill import build_student, distill, distillation_loss, distillation_targets
+from hieroglyphs.inference import calibrate
+
+keras = pytest.importorskip("keras")
+
+
+def teacher_probs(n=6, n_classes=3, seed=0):
+    logits = np.random.default_rng(seed).normal(size=(n, n_classes)) * 3
+    probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return (probs / probs.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+def test_targets_are_one_hot_labels_next_to_softened_teacher_probabilities():
+    probs = teacher_probs()
+    labels = np.array([0, 1, 2, 0, 1, 2])
+    targets = distillation_targets(labels, probs, temperature=4.0)
+    assert targets.shape == (6, 6)
+    np.testing.assert_array_equal(targets[:, :3].argmax(axis=1), labels)
+    np.testing.assert_allclose(targets[:, 3:], calibrate(probs, 4.0), rtol=1e-6)
+    # Softened: same ranking, less confident
+    np.testing.assert_array_equal(targets[:, 3:].argmax(axis=1), probs.argmax(axis=1))
+    assert (targets[:, 3:].max(axis=1) <= probs.max(axis=1)).all()
+
+
+def test_soft_loss_is_smallest_at_the_teachers_logits():
+    probs = teacher_probs()
+    targets = distillation_targets(np.zeros(6, dtype=int), probs, temperature=4.0)
+    loss = distillation_loss(3, temperature=4.0, alpha=0.0)
+    teacher_logits = np.log(probs)
+    at_teacher = np.asarray(loss(targets, teacher_logits))
+    elsewhere = np.asarray(loss(targets, teacher_logits + np.random.default_rng(1).normal(size=(6, 3)) * 2))
+    assert (at_teacher < elsewhere).all()
+
+
+@pytest.mark.parametrize("arch", ["SmallCNN", "MobileNetV2"])
+def test_student_is_a_drop_in_for_the_serving_input(arch):
+    student = build_student(arch, n_classes=5, input_size=32)
+    assert student.input_shape == (None, 299, 299, 3)
+    probs = np.asarray(student.predict_on_batch(np.random.rand(2, 299, 299, 3).astype(np.float32)))
+    assert probs.shape == (2, 5)
+    np.testing.assert_allclose(probs.sum(axis=1), 1.0, rtol=1e-5)
+    assert student.get_layer("logits").units == 5
+
+
+def test_distill_trains_on_a_shard_cache_and_saves_a_servable_model(tmp_path):
+    from hieroglyphs.backends import load_backend
+    from hieroglyphs.shards import ShardedSplit, build_cache
+
+    for label, shade in (("A1", 40), ("B1", 200)):
+        (tmp_path / "split" / label).mkdir(parents=True)
+        for index in range(3):
+            Image.new("L", (20, 20), shade + index).save(tmp_path / "split" / label / f"{index}.png")
+    build_cache(str(tmp_path / "split"), str(tmp_path / "cache"), workers=1)
+    split = ShardedSplit(str(tmp_path / "cache"))
+
+    probs = np.where(np.eye(2)[split.labels] > 0, 0.9, 0.1).astype(np.float32)
+    student = build_student("SmallCNN", n_classes=2, input_size=32)
+    history = distill(student, split, probs, (split, probs), epochs=2, batch_size=3)
+    assert {"loss", "accuracy", "val_loss"} <= set(history.history)
+
+    student.save(str(tmp_path / "student.h5"))
+    backend = load_backend(str(tmp_path / "student.h5"))
+    assert backend.predict(np.zeros((1, 299, 299, 3), dtype=np.float32)).shape == (1, 2)
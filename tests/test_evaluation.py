@@ -0,0 +1,71 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+from hieroglyphs.evaluation import Evaluation, evaluate_model, load_evaluations
+
+keras = pytest.importorskip("keras")
+
+
+class FakeSplit:
+    """The part of a ShardedSplit the evaluation harness uses."""
+
+    def __init__(self, n=12, n_classes=3, seed=0):
+        rng = np.random.default_rng(seed)
+        self.images = rng.integers(0, 256, (n, 4, 4, 1), dtype=np.uint8)
+        self.labels = np.arange(n) % n_classes
+        self.classes = [f"C{i}" for i in range(n_classes)]
+        self.fingerprint = hashlib.sha256(self.images.tobytes() + self.labels.tobytes()).hexdigest()
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, index):
+        return self.images[index]
+
+
+def tiny_model(n_classes=3, seed=0):
+    keras.utils.set_random_seed(seed)
+    inputs = keras.Input((4, 4, 1))
+    outputs = keras.layers.Dense(n_classes, activation="softmax")(keras.layers.Flatten()(inputs))
+    return keras.Model(inputs, outputs)
+
+
+def test_stored_outputs_are_reused_for_the_same_weights(tmp_path):
+    split, model = FakeSplit(), tiny_model()
+    first = evaluate_model("m", model, split, str(tmp_path), batch_size=5)
+    again = evaluate_model("m", model, split, str(tmp_path), batch_size=5)
+    # Reused from disk: even the timings are the stored ones
+    np.testing.assert_array_equal(first.batch_seconds, again.batch_seconds)
+    assert first.probs.shape == (12, 3) and list(first.batch_sizes) == [5, 5, 2]
+
+
+def test_retrained_in_memory_model_is_evaluated_again(tmp_path):
+    split, model = FakeSplit(), tiny_model()
+    first = evaluate_model("m", model, split, str(tmp_path))
+    dense = model.layers[-1]
+    kernel, bias = dense.get_weights()
+    dense.set_weights([-kernel, bias])
+    retrained = evaluate_model("m", model, split, str(tmp_path))
+    assert retrained.model_key != first.model_key
+    assert not np.allclose(retrained.probs, first.probs)
+
+
+def test_changed_split_is_evaluated_again(tmp_path):
+    model = tiny_model()
+    first = evaluate_model("m", model, FakeSplit(seed=0), str(tmp_path))
+    other = evaluate_model("m", model, FakeSplit(seed=1), str(tmp_path))
+    assert other.split_fingerprint != first.split_fingerprint
+
+
+def test_metrics_come_from_the_stored_outputs(tmp_path):
+    probs = np.array([[0.8, 0.1, 0.1], [0.2, 0.7, 0.1], [0.6, 0.3, 0.1], [0.1, 0.1, 0.8]], dtype=np.float32)
+    evaluation = Evaluation("e", probs, np.array([0, 1, 1, 2]), ["A", "B", "C"], np.array([0.02, 0.01]),
+                            np.array([2, 2]), np.array([0.005, 0.006, 0.007]))
+    evaluation.save(str(tmp_path / "e.npz"))
+    loaded = load_evaluations(str(tmp_path))["e"]
+    assert loaded.accuracy == 0.75
+    np.testing.assert_array_equal(loaded.confusion_matrix(), [[1, 0, 0], [1, 1, 0], [0, 0, 1]])
+    metrics = loaded.metrics()
+    assert metrics["images"] == 4 and metrics["images_per_second"] == pytest.approx(4 / 0.03)
@@ -0,0 +1,77 @@
+import json
+import os
+
+import numpy as np
+
+from hieroglyphs.artifacts import ModelRegistry
+from hieroglyphs.inference import PredictionCache, calibrate, load_temperature, save_temperature
+
+
+def test_temperature_is_keyed_by_model_and_version(tmp_path):
+    path = str(tmp_path / "calibration.json")
+    registry = ModelRegistry(str(tmp_path))
+    save_temperature("InceptionV3", "v1", 1.5, path)
+    save_temperature("InceptionV3-student", "v1", 2.0, path)
+
+    assert load_temperature("InceptionV3", None, path, registry) == 1.5  # default version is v1
+    assert load_temperature("InceptionV3", "v1", path, registry) == 1.5
+    assert load_temperature("InceptionV3", "v2", path, registry) == 1.0
+    assert load_temperature("InceptionV3-student", "v1", path, registry) == 2.0
+    assert load_temperature("InceptionV3-int8", "v1", path, registry) == 1.0
+    assert load_temperature("cascade", None, path, registry) == 1.0
+
+
+def test_missing_calibration_file_means_no_calibration(tmp_path):
+    assert load_temperature("InceptionV3", None, str(tmp_path / "absent.json"), ModelRegistry(str(tmp_path))) == 1.0
+
+
+def test_legacy_file_only_applies_to_the_model_file_it_names(tmp_path):
+    path = tmp_path / "calibration.json"
+    path.write_text(json.dumps({"model": "InceptionV3_model.h5", "temperature": 1.7}))
+    registry = ModelRegistry(str(tmp_path))
+    assert load_temperature("InceptionV3", None, str(path), registry) == 1.7
+    assert load_temperature("cascade", None, str(path), registry) == 1.0
+
+
+def test_calibrate_preserves_ranking_and_normalization():
+    probs = np.array([[0.7, 0.2, 0.1]], dtype=np.float32)
+    assert np.allclose(calibrate(probs, 1.0), probs)
+    softened = calibrate(probs, 2.0)
+    assert np.allclose(softened.sum(), 1.0)
+    assert softened.argmax() == 0 and softened[0, 0] < probs[0, 0]
+
+
+RESULT = ("A1", "Seated man", "Man sitting on the ground", 0.9)
+
+
+def test_prediction_cache_evicts_the_least_recently_used():
+    cache = PredictionCache(max_entries=2)
+    probs = np.array([0.9, 0.1])
+    cache.put("a", probs, RESULT)
+    cache.put("b", probs, RESULT)
+    assert cache.get("a") is not None  # "a" is now the most recent
+    cache.put("c", probs, RESULT)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats() == {"hits": 3, "misses": 1, "size": 2}
+
+
+def test_prediction_cache_disk_tier_survives_a_restart(tmp_path):
+    key = PredictionCache.key_for(b"image bytes")
+    assert key != PredictionCache.key_for(b"other bytes")
+    PredictionCache(cache_dir=str(tmp_path)).put(key, [0.25, 0.75], RESULT)
+
+    restarted = PredictionCache(cache_dir=str(tmp_path))
+    probs, result = restarted.get(key)
+    np.testing.assert_allclose(probs, [0.25, 0.75])
+    assert result == RESULT
+    assert restarted.stats() == {"hits": 1, "misses": 0, "size": 1}
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+
+def test_prediction_cache_treats_a_corrupt_entry_as_a_miss(tmp_path):
+    key = PredictionCache.key_for(b"image bytes")
+    (tmp_path / f"{key}.npz").write_bytes(b"truncated")
+    cache = PredictionCache(cache_dir=str(tmp_path))
+    assert cache.get(key) is None
+    assert cache.stats()["misses"] == 1
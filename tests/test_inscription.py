@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from hieroglyphs.catalogue import NUM_CLASSES
+from hieroglyphs.inscription import propose_regions, read_inscription, reading_order, suppress_nested
+from hieroglyphs.preprocessing import MODEL_INPUT_SHAPE
+
+# A 2x3 grid of 40px signs, listed out of order and slightly misaligned like real carving
+GRID = np.array([
+    [210, 112, 250, 152],  # row 1, col 3
+    [12, 8, 52, 48],       # row 0, col 1
+    [108, 110, 148, 150],  # row 1, col 2
+    [110, 14, 150, 54],    # row 0, col 2
+    [10, 106, 50, 146],    # row 1, col 1
+    [212, 10, 252, 50],    # row 0, col 3
+])
+
+
+def test_reading_order_rows():
+    assert reading_order(GRID, "rows-ltr").tolist() == [1, 3, 5, 4, 2, 0]
+    assert reading_order(GRID, "rows-rtl").tolist() == [5, 3, 1, 0, 2, 4]
+
+
+def test_reading_order_columns():
+    assert reading_order(GRID, "columns-ltr").tolist() == [1, 4, 3, 2, 5, 0]
+    assert reading_order(GRID, "columns-rtl").tolist() == [4, 1, 2, 3, 0, 5]
+
+
+def test_reading_order_edge_cases():
+    assert reading_order(np.zeros((0, 4)), "rows-ltr").tolist() == []
+    with pytest.raises(ValueError):
+        reading_order(GRID, "boustrophedon")
+
+
+def test_suppress_nested_drops_boxes_mostly_inside_a_larger_one():
+    boxes = np.array([
+        [0, 0, 100, 100],     # cartouche
+        [10, 10, 30, 30],     # sign fully inside it
+        [90, 40, 120, 60],    # sign a third inside it: kept
+        [200, 0, 240, 40],    # unrelated sign
+        [200, 0, 240, 40],    # exact duplicate of it: only the first is kept
+        [201, 1, 241, 41],    # near-duplicate of the same area: dropped too
+    ])
+    assert suppress_nested(boxes).tolist() == [0, 2, 3]
+    assert suppress_nested(boxes, overlap=0.3).tolist() == [0, 3]
+    assert suppress_nested(np.zeros((0, 4))).tolist() == []
+
+
+def test_suppress_nested_in_blocks_matches_the_full_comparison():
+    rng = np.random.default_rng(0)
+    corners = rng.integers(0, 400, size=(700, 2))
+    boxes = np.concatenate([corners, corners + rng.integers(2, 60, size=(700, 2))], axis=1)
+    boxes = np.concatenate([boxes, boxes[:50]])  # exact duplicates
+    x0, y0, x1, y1 = boxes.T
+    area = (x1 - x0) * (y1 - y0)
+    inter_w = np.clip(np.minimum(x1[:, None], x1[None, :]) - np.maximum(x0[:, None], x0[None, :]), 0, None)
+    inter_h = np.clip(np.minimum(y1[:, None], y1[None, :]) - np.maximum(y0[:, None], y0[None, :]), 0, None)
+    covered = inter_w * inter_h / area[:, None]
+    index = np.arange(len(boxes))
+    larger = (area[None, :] > area[:, None]) | ((area[None, :] == area[:, None]) & (index[None, :] < index[:, None]))
+    expected = np.flatnonzero(np.where(larger, covered, 0).max(axis=1) <= 0.7)
+
+    assert suppress_nested(boxes, block_size=64).tolist() == expected.tolist()
+    assert suppress_nested(boxes).tolist() == expected.tolist()
+    assert not set(range(700, 750)) & set(expected.tolist())
+
+
+def stela(tmp_path):
+    photo = np.full((300, 400), 200, dtype=np.uint8)
+    for x0, y0, x1, y1 in GRID + [60, 60, 60, 60]:
+        photo[y0:y1, x0:x1] = 40
+    path = tmp_path / "stela.png"
+    Image.fromarray(photo).save(path)
+    return path
+
+
+def test_propose_regions_finds_each_sign(tmp_path):
+    photo = np.asarray(Image.open(stela(tmp_path)))
+    boxes = propose_regions(photo)
+    assert len(boxes) == len(GRID)
+    expected = GRID + [60, 60, 60, 60]
+    for box in boxes:
+        assert np.abs(expected - box).max(axis=1).min() <= 3, box
+
+
+def test_read_inscription_classifies_in_reading_order(tmp_path):
+    batches = []
+
+    def predict(batch):
+        batches.append(batch.shape)
+        probs = np.full((len(batch), NUM_CLASSES), 0.1 / (NUM_CLASSES - 1), dtype=np.float32)
+        probs[:, 0] = 0.9
+        return probs
+
+    signs = read_inscription(str(stela(tmp_path)), predict, direction="rows-ltr", batch_size=4)
+    assert [shape[0] for shape in batches] == [4, 2]
+    assert all(shape[1:] == MODEL_INPUT_SHAPE for shape in batches)
+    expected = (GRID + [60, 60, 60, 60])[[1, 3, 5, 4, 2, 0]]
+    assert np.abs(np.array([sign["box"] for sign in signs]) - expected).max() <= 3
+    assert all(sign["confidence"] == pytest.approx(0.9) for sign in signs)
+
+    assert read_inscription(str(stela(tmp_path)), predict, min_confidence=0.95) == []
+
+
+def test_a_decoded_photo_is_read_and_annotated_without_decoding_again(tmp_path, monkeypatch):
+    import hieroglyphs.inscription as inscription
+
+    photo = inscription.load_photo(str(stela(tmp_path)))
+    assert inscription.load_photo(photo) is photo
+    monkeypatch.setattr(inscription, "open_image", None)  # any further decode would fail
+
+    predict = lambda batch: np.full((len(batch), NUM_CLASSES), 1 / NUM_CLASSES, dtype=np.float32)
+    signs = read_inscription(photo, predict)
+    assert len(signs) == len(GRID)
+    annotated = inscription.annotate(photo, signs)
+    assert annotated.shape == photo.shape and not np.array_equal(annotated, photo)
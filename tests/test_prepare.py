@@ -0,0 +1,91 @@
+import os
+import shutil
+from collections import Counter, defaultdict
+
+import pytest
+from PIL import Image
+
+from hieroglyphs.prepare import _split_counts, min_groups, plan_dataset, prepare_dataset
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    # Planning only lists files, so empty placeholders are enough
+    for originals in (1, 2, 3, 5, 7, 8, 12, 25, 40):
+        folder = tmp_path / f"C{originals:02d}"
+        folder.mkdir()
+        for index in range(originals):
+            (folder / f"{index}.jpg").touch()
+    return str(tmp_path)
+
+
+def split_counts_by_class(tasks):
+    counts = defaultdict(Counter)
+    for split, label, *_ in tasks:
+        counts[label][split] += 1
+    return counts
+
+
+def test_split_counts_round_like_train_test_split():
+    assert _split_counts(25, 0.15, 0.15) == (17, 4, 4)
+    assert _split_counts(100, 0.15, 0.15) == (70, 15, 15)
+
+
+def test_every_class_gets_roughly_70_15_15_even_with_few_originals(data_dir):
+    counts = split_counts_by_class(plan_dataset(data_dir, target_count=25))
+    assert len(counts) == 9
+    for label, per_split in counts.items():
+        total = sum(per_split.values())
+        assert total == 25, label
+        assert per_split["train"] / total >= 0.65, (label, per_split)
+        for split in ("val", "test"):
+            assert 0.1 <= per_split[split] / total <= 0.2, (label, per_split)
+
+
+def test_augmented_copies_stay_with_their_original_when_there_are_enough_originals(data_dir):
+    splits_of = defaultdict(set)
+    for split, label, source, *_ in plan_dataset(data_dir, target_count=25):
+        splits_of[(label, source)].add(split)
+    for (label, source), splits in splits_of.items():
+        if int(label[1:]) >= min_groups(0.15, 0.15):
+            assert len(splits) == 1, (label, source, splits)
+
+
+def test_large_classes_are_downsampled_without_augmentation(data_dir):
+    tasks = [task for task in plan_dataset(data_dir, target_count=25) if task[1] == "C40"]
+    assert len(tasks) == 25
+    assert not any(name.startswith("aug_") or mirror or rotation for _, _, _, name, mirror, rotation in tasks)
+
+
+def test_plan_is_deterministic_for_a_seed_and_excludes_sources(data_dir):
+    assert plan_dataset(data_dir, seed=7) == plan_dataset(data_dir, seed=7)
+    assert plan_dataset(data_dir, seed=7) != plan_dataset(data_dir, seed=8)
+    excluded = os.path.join(data_dir, "C03", "0.jpg")
+    assert all(task[2] != excluded for task in plan_dataset(data_dir, exclude={excluded}))
+
+
+def test_planning_matches_extensions_like_dedup_does(tmp_path):
+    folder = tmp_path / "A1"
+    folder.mkdir()
+    for name in ("IMG_001.JPG", "b.Png", "c.jpg", "notes.txt"):
+        (folder / name).touch()
+    planned = {os.path.basename(task[2]) for task in plan_dataset(str(tmp_path), target_count=3)}
+    assert planned == {"IMG_001.JPG", "b.Png", "c.jpg"}
+
+
+def test_moving_the_raw_dataset_keeps_a_prepared_output_resumable(tmp_path):
+    raw = tmp_path / "raw"
+    for label in ("A1", "B2"):
+        (raw / label).mkdir(parents=True)
+        for index in range(7):
+            Image.new("L", (20, 20), index * 30).save(raw / label / f"{index}.png")
+    output = str(tmp_path / "prepared")
+    first = prepare_dataset(str(raw), output, target_count=8, size=16, workers=1, log=lambda message: None)
+    assert first["written"] == 16
+
+    moved = shutil.move(str(raw), str(tmp_path / "mounted" / "raw"))
+    again = prepare_dataset(moved, output, target_count=8, size=16, workers=1, log=lambda message: None)
+    assert (again["written"], again["skipped"]) == (0, 16)
+
+    with pytest.raises(RuntimeError):
+        prepare_dataset(moved, output, target_count=8, size=24, workers=1, log=lambda message: None)
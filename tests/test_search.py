@@ -0,0 +1,58 @@
+from hieroglyphs.search import SearchEntry, SearchIndex, catalogue_entries, tokenize
+
+ENTRIES = [
+    SearchEntry("pharaoh", "Tutankhamun", {"name": "Tutankhamun", "meaning": "Young king with a golden tomb"}),
+    SearchEntry("pharaoh", "Ramses II", {"name": "Ramses II", "meaning": "Builder of Abu Simbel"}),
+    SearchEntry("sign", "N5", {"code": "N5", "name": "Sun disk", "meaning": "Ra, the sun god"}),
+    SearchEntry("sign", "D21", {"code": "D21", "name": "Mouth", "meaning": "a phonetic sign for r"}),
+]
+
+
+def keys(results):
+    return [entry.key for entry, _ in results]
+
+
+def test_tokenize_folds_case_and_accents():
+    assert tokenize("Ramsès II, Déjà-vu") == ["ramses", "ii", "deja", "vu"]
+
+
+def test_exact_prefix_and_typo_matches():
+    index = SearchIndex(ENTRIES)
+    assert keys(index.search("tutankhamun")) == ["Tutankhamun"]
+    assert keys(index.search("tut")) == ["Tutankhamun"]
+    assert keys(index.search("ramsis"))[0] == "Ramses II"
+
+
+def test_every_query_token_must_match():
+    index = SearchIndex(ENTRIES)
+    assert keys(index.search("sun disk")) == ["N5"]
+    assert index.search("sun pyramid") == []
+    assert index.search("") == []
+
+
+def test_exact_beats_prefix_and_heavier_fields_rank_first():
+    index = SearchIndex(ENTRIES + [SearchEntry("sign", "X", {"meaning": "sunny"})])
+    ranked = index.search("sun")
+    assert keys(ranked)[0] == "N5"
+    assert ranked[0][1] > ranked[-1][1]
+
+
+def test_kind_filter_and_limit():
+    index = SearchIndex(ENTRIES)
+    assert {entry.kind for entry, _ in index.search("s", kind="sign")} == {"sign"}
+    assert len(index.search("s", limit=1)) == 1
+
+
+def test_catalogue_codes_are_searchable():
+    index = SearchIndex(catalogue_entries())
+    assert keys(index.search("A1"))[0] == "A1"
+
+
+def test_short_prefixes_reach_every_matching_entry():
+    # Hundreds of tokens sort before the one wanted; a short prefix must still find it
+    filler = [SearchEntry("sign", f"X{i}", {"name": f"ra{i:03d}"}) for i in range(300)]
+    index = SearchIndex(filler + [SearchEntry("pharaoh", "Rz", {"name": "Rzzz"})])
+    assert "Rz" in keys(index.search("r"))
+    assert keys(index.search("r", kind="pharaoh")) == ["Rz"]
+    assert len(index.search("ra")) == 300
+    assert len(index.search("r", limit=5)) == 5
@@ -0,0 +1,114 @@
+import http.client
+import io
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from hieroglyphs.catalogue import NUM_CLASSES
+from hieroglyphs.server import DynamicBatcher, InferenceHTTPServer, InferenceService, make_handler
+
+
+class FakeModel:
+    """Predicts class `round(mean pixel * 10)` and records the size of every batch."""
+
+    name = "fake"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batch_sizes = []
+
+    def predict(self, batch):
+        time.sleep(self.delay)
+        self.batch_sizes.append(len(batch))
+        probs = np.full((len(batch), NUM_CLASSES), 1e-3, dtype=np.float32)
+        probs[np.arange(len(batch)), np.round(batch.mean(axis=(1, 2, 3)) * 10).astype(int)] = 1.0
+        return probs / probs.sum(axis=1, keepdims=True)
+
+
+def test_batcher_fuses_concurrent_requests_and_keeps_results_in_order():
+    model = FakeModel(delay=0.05)
+    batcher = DynamicBatcher(model, max_batch_size=8, max_wait_ms=50)
+    images = [np.full((4, 4, 3), label / 10, dtype=np.float32) for label in range(8)]
+    futures = [batcher.submit(image) for image in images]
+    assert [int(f.result(timeout=5).argmax()) for f in futures] == list(range(8))
+    assert max(model.batch_sizes) > 1
+    assert batcher.metrics()["images"] == 8
+
+
+def test_batcher_never_exceeds_the_max_batch_size():
+    model = FakeModel(delay=0.02)
+    batcher = DynamicBatcher(model, max_batch_size=3, max_wait_ms=50)
+    futures = [batcher.submit(np.zeros((4, 4, 3), dtype=np.float32)) for _ in range(10)]
+    for future in futures:
+        future.result(timeout=5)
+    assert max(model.batch_sizes) <= 3 and sum(model.batch_sizes) == 10
+
+
+def test_model_errors_fail_every_request_of_the_batch():
+    class Broken:
+        def predict(self, batch):
+            raise RuntimeError("boom")
+
+    batcher = DynamicBatcher(Broken(), max_wait_ms=20)
+    futures = [batcher.submit(np.zeros((4, 4, 3), dtype=np.float32)) for _ in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="boom"):
+            future.result(timeout=5)
+
+
+@pytest.fixture
+def server_url():
+    model = FakeModel()
+    service = InferenceService(model, DynamicBatcher(model, max_wait_ms=1))
+    server = InferenceHTTPServer(("127.0.0.1", 0), make_handler(service))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def post(url, body):
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/octet-stream"})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), (77, 77, 77)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_predict_returns_k_candidates(server_url):
+    status, payload = post(f"{server_url}/predict?k=4", png_bytes())
+    assert status == 200 and len(payload["predictions"]) == 4
+
+
+@pytest.mark.parametrize("k", ["abc", "0", "-2", str(NUM_CLASSES + 1), "1.5"])
+def test_invalid_k_is_a_json_400(server_url, k):
+    status, payload = post(f"{server_url}/predict?k={k}", png_bytes())
+    assert status == 400 and "k must be" in payload["error"]
+
+
+def test_undecodable_body_is_a_json_error(server_url):
+    status, payload = post(f"{server_url}/predict", b"not an image")
+    assert status == 422 and payload["error"]
+
+
+@pytest.mark.parametrize("length, status", [("abc", 400), ("-5", 400), ("0", 400), (str(2 ** 40), 413)])
+def test_bad_content_length_is_a_json_error(server_url, length, status):
+    connection = http.client.HTTPConnection(server_url.removeprefix("http://"), timeout=10)
+    connection.putrequest("POST", "/predict")
+    connection.putheader("Content-Length", length)
+    connection.endheaders()
+    response = connection.getresponse()
+    assert response.status == status and "at most" in json.load(response)["error"]
+    connection.close()
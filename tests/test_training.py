@@ -0,0 +1,42 @@
+from collections import Counter
+
+import numpy as np
+
+from hieroglyphs.training import class_weights, split_dataset
+
+
+def make_data_dir(root, sizes):
+    # Splitting only lists files, so empty placeholders are enough
+    for index, size in enumerate(sizes):
+        folder = root / f"C{index:02d}"
+        folder.mkdir()
+        for image in range(size):
+            (folder / f"{image}.{'JPG' if image % 2 else 'png'}").touch()
+    return str(root)
+
+
+def test_split_dataset_puts_every_class_in_val_and_test(tmp_path):
+    sizes = [7, 9, 10, 13, 20, 31, 55, 120]
+    (train, train_labels), (val, val_labels), (test, test_labels) = split_dataset(make_data_dir(tmp_path, sizes))
+
+    assert len(set(train) | set(val) | set(test)) == len(train) + len(val) + len(test) == sum(sizes)
+    for label, size in enumerate(sizes):
+        assert label in set(val_labels.tolist()), label
+        assert label in set(test_labels.tolist()), label
+    # Stratified: the large class is split close to 70/15/15
+    assert Counter(val_labels.tolist())[7] in (17, 18, 19)
+    assert Counter(test_labels.tolist())[7] in (17, 18, 19)
+
+
+def test_split_dataset_keeps_tiny_classes_out_of_val_and_test(tmp_path):
+    (train, train_labels), (val, val_labels), (test, test_labels) = split_dataset(
+        make_data_dir(tmp_path, [2, 3, 20, 20]))
+    assert Counter(train_labels.tolist())[0] == 2
+    assert 0 not in set(val_labels.tolist()) | set(test_labels.tolist())
+    assert sum(len(split) for split in (train, val, test)) == 45
+
+
+def test_class_weights_balance_the_classes():
+    weights = class_weights(np.array([0, 0, 0, 1]), n_classes=3)
+    assert weights[0] * 3 == weights[1]
+    assert weights[2] == 4 / 3  # absent classes are weighted as if they had one image